@@ -1,5 +1,8 @@
+import argparse
 import sqlite3
 
+import shards
+
 def view_all_data(db_path):
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
@@ -27,4 +30,7 @@ def view_all_data(db_path):
     conn.close()
 
 if __name__ == "__main__":
-    view_all_data("database/journal.db")
+    parser = argparse.ArgumentParser(description="Prints every table of a journal database.")
+    parser.add_argument('--user', help="show this user's database instead of the single-user one")
+    args = parser.parse_args()
+    view_all_data(shards.shard_path(args.user))
@@ -1,3 +1,18 @@
+"""
+Converts the Emotion splits ("text;emotion" lines) into text,mood CSV files
+({split}_converted.csv) read by the mood model and nlp/evaluation.py.
+
+Lines are streamed and written with the csv module, so quoting is always
+valid and memory use does not depend on the file size.
+
+Usage: python Datasets/Emotion/convert.py [train val test]
+"""
+import argparse
+import csv
+import os
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
 # Define the emotion mapping
 emotion_to_mood = {
     "joy": "positive",
@@ -18,22 +33,31 @@ emotion_to_mood = {
     "calm": "neutral"
 }
 
-# Read and convert the dataset
-input_file = "train.txt"  # Your original dataset
-output_file = "converted_dataset.csv"   # Output file
-
-with open(input_file, "r", encoding="utf-8") as fin, open(output_file, "w", encoding="utf-8") as fout:
-    fout.write("text,mood\n")  # CSV header
-
-    for line in fin:
-        line = line.strip()
-        if not line or ";" not in line:
-            continue
-        
-        text, emotion = line.rsplit(";", 1)
-        mood = emotion_to_mood.get(emotion.strip().lower())
-
-        if mood:  # Only include if mapping exists
-            # Escape commas in text to not break CSV
-            safe_text = text.replace('"', '""')
-            fout.write(f'"{safe_text}",{mood}\n')
+
+def convert(split, directory=HERE):
+    """Writes {split}_converted.csv from {split}.txt; returns (rows written, lines skipped)."""
+    input_file = os.path.join(directory, f"{split}.txt")
+    output_file = os.path.join(directory, f"{split}_converted.csv")
+    written = skipped = 0
+    with open(input_file, "r", encoding="utf-8") as fin, \
+            open(output_file, "w", encoding="utf-8", newline="") as fout:
+        writer = csv.writer(fout, lineterminator="\n")
+        writer.writerow(["text", "mood"])
+        for line in fin:
+            text, _, emotion = line.strip().rpartition(";")
+            mood = emotion_to_mood.get(emotion.strip().lower())
+            if text and mood:  # Only include if mapping exists
+                writer.writerow([text, mood])
+                written += 1
+            elif line.strip():
+                skipped += 1
+    return written, skipped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert Emotion splits to text,mood CSV.")
+    parser.add_argument('splits', nargs='*', default=['train', 'val', 'test'])
+    args = parser.parse_args()
+    for split in args.splits:
+        written, skipped = convert(split)
+        print(f"{split}: {written} rows written, {skipped} lines without a mood mapping")
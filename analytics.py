@@ -0,0 +1,286 @@
+"""
+Columnar analytics behind the insights page.
+
+The journal is held in memory as NumPy arrays: per-entry columns (day, mood
+score, productivity, word count) and the document-term matrix in coordinate
+form (entry row, term column, count) read from the term_postings index. A
+period is a mask over the entry rows. TF-IDF, per-topic averages, the
+mood/productivity correlation of each topic and its weekly mood and
+productivity trends are computed with bincount reductions rather than one
+query per topic.
+
+The frame is refreshed when meta.entries_version changes: entry columns are
+reloaded, but postings are only read for entries added since the last load
+(entry text is never edited, so existing postings stay valid) and dropped
+for deleted entries. Each database (user shard) has its own frame.
+"""
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from db import MAX_OPEN_POOLS, connection, current_path, MOOD_SCORE_SQL
+
+# Days covered by each period; 'all' has no start date. Dates are in UTC,
+# like SQLite's date('now').
+PERIOD_DAYS = {
+    "weekly": 7,
+    "monthly": 30,
+}
+TOP_TOPICS = 10
+# Day of entries whose date doesn't parse (kept from before migration 2);
+# they are left out of every period, like rollups.UNKNOWN_BUCKET
+UNKNOWN_DAY = -1
+
+
+def porter_stems(terms):
+    """
+    Stems `terms` with the porter tokenizer entries_fts uses, read back
+    through an fts5vocab table, so topic mentions are counted the way a
+    full-text query for the topic would match them.
+    """
+    mem = sqlite3.connect(':memory:')
+    try:
+        mem.execute("CREATE VIRTUAL TABLE stems USING fts5(term, tokenize='porter unicode61')")
+        mem.execute("CREATE VIRTUAL TABLE stems_vocab USING fts5vocab(stems, instance)")
+        mem.executemany("INSERT INTO stems (rowid, term) VALUES (?, ?)",
+                        ((i + 1, term) for i, term in enumerate(terms)))
+        stems = list(terms)
+        for stem, rowid in mem.execute("SELECT term, doc FROM stems_vocab WHERE offset = 0"):
+            stems[rowid - 1] = stem
+        return stems
+    finally:
+        mem.close()
+
+
+class JournalFrame:
+
+    def __init__(self):
+        self.version = None
+        self.max_id = 0
+        # Held while refreshing or reading the arrays, which a refresh replaces
+        self.lock = threading.Lock()
+        # Entry columns, ordered by id
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.day = np.zeros(0, dtype=np.int64)           # days since 1970-01-01, or UNKNOWN_DAY
+        self.mood = np.zeros(0)                           # +1 / 0 / -1
+        self.productivity = np.zeros(0)                   # NaN while unanalyzed
+        self.word_count = np.zeros(0)
+        # Vocabulary: column j is terms[j]; columns sharing a porter stem
+        # count as the same topic
+        self.terms = []
+        self.term_ids = {}
+        self.stems = []
+        # Document-term matrix, one item per posting
+        self.posting_entries = np.zeros(0, dtype=np.int64)
+        self.cols = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0)
+        self.rows = np.zeros(0, dtype=np.int64)
+
+    def refresh(self, conn, version):
+        """Reloads from conn, which must read one snapshot (see get_frame)."""
+        old_ids = self.ids
+        # Each entry column arrives as one comma-separated string; group_concat
+        # skips NULLs, so every column needs a value on every row
+        columns = conn.execute(f'''SELECT group_concat(id),
+                                          group_concat(IFNULL(CAST(julianday(date) - 2440587.5 AS INTEGER), {UNKNOWN_DAY})),
+                                          group_concat({MOOD_SCORE_SQL}), group_concat(IFNULL(productivity, 'nan')),
+                                          group_concat(IFNULL(NULLIF(word_count, 0), 1))
+                                   FROM (SELECT id, date, mood, productivity, word_count
+                                         FROM entries ORDER BY id)''').fetchone()
+        ids, day, mood, productivity, word_count = (
+            np.fromstring(column or '', sep=',', dtype=np.float64) for column in columns)
+        self.ids = ids.astype(np.int64)
+        self.day = day.astype(np.int64)
+        self.mood = mood
+        self.productivity = productivity
+        self.word_count = word_count
+
+        # Postings come back one row per term with the entry ids and counts
+        # concatenated, which NumPy parses without a Python object per posting.
+        # The first load walks the whole table in primary key (term) order;
+        # later ones only read new entries' postings.
+        new_only = "INDEXED BY idx_postings_entry WHERE entry_id > ?" if self.max_id else ""
+        groups = conn.execute(f'''SELECT term, group_concat(entry_id), group_concat(count)
+                                  FROM term_postings {new_only}
+                                  GROUP BY term''', (self.max_id,) if self.max_id else ()).fetchall()
+        known_postings = len(self.posting_entries)
+        if groups:
+            known = len(self.terms)
+            cols = np.array([self.term_ids.setdefault(term, len(self.term_ids)) for term, _, _ in groups],
+                            dtype=np.int64)
+            self.terms.extend(list(self.term_ids)[known:])
+            self.stems.extend(porter_stems(self.terms[known:]))
+            entry_ids = np.fromstring(','.join(g[1] for g in groups), sep=',', dtype=np.int64)
+            counts = np.fromstring(','.join(g[2] for g in groups), sep=',', dtype=np.float64)
+            lengths = [g[1].count(',') + 1 for g in groups]
+            self.posting_entries = np.concatenate([self.posting_entries, entry_ids])
+            self.cols = np.concatenate([self.cols, np.repeat(cols, lengths)])
+            self.counts = np.concatenate([self.counts, counts])
+
+        if len(old_ids) <= len(self.ids) and np.array_equal(self.ids[:len(old_ids)], old_ids):
+            # Entries were only added: existing postings keep their rows
+            new_rows = np.searchsorted(self.ids, self.posting_entries[known_postings:])
+            self.rows = np.concatenate([self.rows, new_rows])
+        else:
+            # Map postings to entry rows again, dropping those of deleted entries
+            rows = np.searchsorted(self.ids, self.posting_entries)
+            alive = rows < len(self.ids)
+            alive[alive] = self.ids[rows[alive]] == self.posting_entries[alive]
+            if not alive.all():
+                self.posting_entries, self.cols, self.counts = (
+                    self.posting_entries[alive], self.cols[alive], self.counts[alive])
+            self.rows = rows[alive]
+        self.max_id = int(self.ids[-1]) if len(self.ids) else self.max_id
+        self.version = version
+
+
+def period_start(period, today=None):
+    days = PERIOD_DAYS.get(period)
+    if days is None:
+        return None
+    today = today or datetime.now(timezone.utc).date()
+    return (today - timedelta(days=days)).isoformat()
+
+
+def _slope(n, sum_x, sum_y, sum_xx, sum_xy):
+    denominator = n * sum_xx - sum_x ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 1e-12, (n * sum_xy - sum_x * sum_y) / denominator, np.nan)
+
+
+def topic_stats(frame, rows, topic, k):
+    """
+    Per-topic reductions over (entry row, topic slot) pairs: entry count,
+    average mood and productivity, Pearson correlation of mood and
+    productivity, and least-squares mood/productivity trends per week.
+    Arrays of length k; NaN where undefined.
+    """
+    def sums(weights):
+        return np.bincount(topic, weights=weights, minlength=k)
+
+    mood = frame.mood[rows]
+    prod = frame.productivity[rows]
+    scored = ~np.isnan(prod)
+    prod = np.where(scored, prod, 0.0)
+    weeks = (frame.day[rows] - frame.day[rows].min()) / 7.0 if len(rows) else np.zeros(0)
+    mood_s, weeks_s = mood * scored, weeks * scored
+
+    count = sums(None)
+    n_scored = sums(scored.astype(np.float64))
+    mood_sum, prod_sum, week_sum = sums(mood), sums(prod), sums(weeks)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_mood = mood_sum / count
+        avg_prod = prod_sum / n_scored
+        # Correlation over entries that have both a mood and a productivity score
+        sm = sums(mood_s)
+        cov = n_scored * sums(mood_s * prod) - sm * prod_sum
+        var = (n_scored * sums(mood_s * mood) - sm ** 2) * (n_scored * sums(prod * prod) - prod_sum ** 2)
+        correlation = np.where(var > 1e-12, cov / np.sqrt(np.maximum(var, 1e-300)), np.nan)
+
+    mood_trend = _slope(count, week_sum, mood_sum, sums(weeks * weeks), sums(weeks * mood))
+    prod_trend = _slope(n_scored, sums(weeks_s), prod_sum, sums(weeks_s * weeks), sums(weeks_s * prod))
+    return count, avg_mood, avg_prod, correlation, mood_trend, prod_trend
+
+
+def _value(x, digits=3):
+    return None if np.isnan(x) else round(float(x), digits)
+
+
+def compute_insights(frame, start_date=None, top_n=TOP_TOPICS):
+    """Insight dicts for the top TF-IDF topics of dated entries on/after start_date."""
+    in_period = frame.day != UNKNOWN_DAY
+    if start_date:
+        in_period &= frame.day >= np.datetime64(start_date, 'D').astype(np.int64)
+    doc_count = int(in_period.sum())
+    if doc_count == len(frame.ids):
+        rows, cols, counts = frame.rows, frame.cols, frame.counts
+    else:
+        selected = in_period[frame.rows]
+        rows, cols, counts = frame.rows[selected], frame.cols[selected], frame.counts[selected]
+    if doc_count < 2:  # TF-IDF needs at least 2 documents to work well
+        return []
+
+    n_terms = len(frame.terms)
+    tf = counts / frame.word_count[rows]
+    tf_sum = np.bincount(cols, weights=tf, minlength=n_terms)
+    df = np.bincount(cols, minlength=n_terms)
+    with np.errstate(divide='ignore'):
+        scores = np.where(df > 0, tf_sum * np.log(doc_count / (1 + df)), -np.inf)
+
+    # Highest score first, alphabetical among equal scores
+    present = np.count_nonzero(df)
+    if present == 0:
+        return []
+    cutoff = np.partition(scores, -min(top_n, present))[-min(top_n, present)]
+    candidates = np.nonzero(scores >= cutoff)[0]
+    top = sorted(candidates, key=lambda col: (-scores[col], frame.terms[col]))[:top_n]
+
+    # Each topic covers every term with the same stem; an entry containing
+    # several of them is still one mention.
+    slot_of_stem = {frame.stems[col]: i for i, col in enumerate(top)}
+    slot = np.array([slot_of_stem.get(stem, -1) for stem in frame.stems], dtype=np.int64)
+    topic = slot[cols]
+    hit = topic >= 0
+    mentions = np.zeros((len(top), len(frame.ids)), dtype=bool)
+    mentions[topic[hit], rows[hit]] = True
+    topic_index, entry_rows = np.nonzero(mentions)
+    count, avg_mood, avg_prod, correlation, mood_trend, prod_trend = topic_stats(
+        frame, entry_rows, topic_index, len(top))
+
+    insights = []
+    for i, col in enumerate(top):
+        if count[i] < 2 and len(top) > 1:  # Be a bit more lenient if only one topic found
+            continue
+        insights.append({
+            'topic': frame.terms[col],
+            'count': int(count[i]),
+            'avg_mood': 0 if np.isnan(avg_mood[i]) else float(avg_mood[i]),
+            'avg_prod': 0 if np.isnan(avg_prod[i]) else float(avg_prod[i]),
+            'mood_prod_corr': _value(correlation[i]),
+            'mood_trend': _value(mood_trend[i]),
+            'prod_trend': _value(prod_trend[i]),
+        })
+    return insights
+
+
+VERSION_SQL = "SELECT value FROM meta WHERE key = 'entries_version'"
+
+# Frames by database path, for the most recently used databases
+_frames = OrderedDict()
+_frames_lock = threading.Lock()
+
+
+def get_frame():
+    """The current database's frame, refreshed if entries changed since it was last read."""
+    db_path = current_path()
+    with _frames_lock:
+        frame = _frames.get(db_path)
+        if frame is None:
+            frame = _frames[db_path] = JournalFrame()
+            if len(_frames) > MAX_OPEN_POOLS:
+                _frames.popitem(last=False)
+        _frames.move_to_end(db_path)
+    with connection(db_path) as conn:
+        version = conn.execute(VERSION_SQL).fetchone()[0]
+        if frame.version == version:
+            return frame
+        with frame.lock:
+            # The version, entries and postings are read in one transaction,
+            # so a commit in between can't leave postings without their entry
+            conn.execute('BEGIN')
+            try:
+                version = conn.execute(VERSION_SQL).fetchone()[0]
+                if frame.version != version:
+                    frame.refresh(conn, version)
+            finally:
+                conn.rollback()
+            return frame
+
+
+def insights_for_period(period="all"):
+    frame = get_frame()
+    with frame.lock:  # a concurrent refresh replaces the arrays
+        return compute_insights(frame, period_start(period))
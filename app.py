@@ -1,124 +1,185 @@
-from flask import Flask, render_template, request, jsonify
-from nlp.analysis import analyze_text
-from nlp.task_extractor import extract_tasks
-from scorer import custom_productivity_score
-import sqlite3
-from datetime import datetime
+from flask import Flask, render_template, request, jsonify, g, Response, stream_with_context
+import argparse
 import os
+import time
+from datetime import datetime
 from collections import defaultdict
 from flask import redirect, url_for
-from insights import generate_insights
-from prompts import generate_prompt
+from search import search_entries
+from db import init_db, connection, transaction, current_path, set_current_path, MOOD_SCORE_SQL
+import deletion
+import listing
+import rollups
+import shards
+import store
+import tasks
+from http_cache import cached_view
+import metrics
+import warmup
+
+# The NLP stack (ingest, nlp.*, scorer) and the NumPy-based insights and
+# prompts modules are imported inside the routes that use them, so importing
+# this module stays cheap; see warmup.py for loading them ahead of time.
 
 app = Flask(__name__)
+# When enabled, submissions are stored immediately and analyzed in the background
+app.config['ASYNC_INGEST'] = os.environ.get('MINDSYNC_ASYNC_INGEST') == '1'
+# Fraction of requests to profile with cProfile (0 = off); dumps go to PROFILE_DIR
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('MINDSYNC_PROFILE_SAMPLE_RATE', 0))
+app.config['PROFILE_DIR'] = os.environ.get('MINDSYNC_PROFILE_DIR', 'profiles')
+
+render_template = metrics.timed('render_template')(render_template)
+profiler = metrics.RequestProfiler()
+
+# Number of days shown per page of the dashboard's day list.
+DAYS_PER_PAGE = 30
+# Template fragments buffered per chunk of a streamed page
+STREAM_BUFFER = 32
+# Buckets returned per chart / task statistics period
+CHART_LIMITS = {"daily": 30, "weekly": 12, "monthly": 12}
+# Dashboard queries; benchmarks/query_plans.py checks their plans
+DAYS_SQL = f"""SELECT date, COUNT(*), AVG({MOOD_SCORE_SQL}), AVG(productivity)
+               FROM entries
+               {{where}}
+               GROUP BY date
+               ORDER BY date DESC
+               LIMIT ?"""
+DAY_TASKS_SQL = """SELECT entries.date, entries.id, tasks.task_text
+                   FROM entries JOIN tasks ON tasks.entry_id = entries.id
+                   WHERE entries.date BETWEEN ? AND ?
+                   ORDER BY entries.id, tasks.id"""
+# One row per open task, with how many later entries repeated it
+PENDING_TASKS_SQL = """SELECT id, task_text,
+                              (SELECT COUNT(*) FROM tasks d WHERE d.canonical_id = tasks.id AND d.status = 'pending')
+                       FROM tasks WHERE canonical_id IS NULL AND status = 'pending'"""
+RECENT_TASKS_SQL = """SELECT task_text, date(entries.date) FROM tasks JOIN entries ON tasks.entry_id = entries.id
+                      ORDER BY tasks.id DESC LIMIT 5"""
+COMPLETED_TASKS_SQL = """SELECT task_text, date(completed_at) FROM tasks WHERE status = 'done'
+                         ORDER BY completed_at DESC LIMIT 5"""
+# Where a request names its user (and so its database shard, see shards.py)
+USER_HEADER = 'X-Mindsync-User'
+USER_COOKIE = 'mindsync_user'
+
+def stream_page(template_name, **context):
+    """Renders a template incrementally, for pages whose size grows with the journal."""
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(STREAM_BUFFER)
+    return Response(stream_with_context(stream), mimetype='text/html')
+
+def stream_entries(**filters):
+    # The pooled connection is held only while the response is being sent;
+    # the shard is picked now, while the view runs
+    db_path = current_path()
+
+    def generate():
+        with connection(db_path) as conn:
+            yield from listing.iter_entries(conn, **filters)
+    return generate()
+
+@app.before_request
+def start_request_timing():
+    g.request_start = time.perf_counter()
+    metrics.begin_request()
+    g.profile = profiler.start(app.config['PROFILE_SAMPLE_RATE'])
+
+@app.before_request
+def route_to_shard():
+    # Requests without a user read and write the single-user database; users
+    # get a shard through `python shards.py --create`, never from a request
+    user_id = request.headers.get(USER_HEADER) or request.cookies.get(USER_COOKIE)
+    try:
+        shards.route(user_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+
+@app.teardown_request
+def reset_shard(exc):
+    set_current_path(None)
+
+@app.after_request
+def finish_request_timing(response):
+    elapsed = time.perf_counter() - g.request_start
+    metrics.observe('mindsync_request_seconds', elapsed, endpoint=request.endpoint or 'unknown')
+    # Per-request breakdown, visible in the browser's network panel
+    spans = metrics.end_request()
+    spans['total'] = elapsed
+    response.headers['Server-Timing'] = ', '.join(f'{name};dur={seconds * 1000:.2f}'
+                                                  for name, seconds in spans.items())
+    return response
+
+@app.teardown_request
+def finish_profile(exc):
+    # In teardown rather than after_request so a failing view still releases the profiler
+    if g.get('profile') is not None:
+        profiler.stop(g.profile, app.config['PROFILE_DIR'], request.endpoint or 'unknown')
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
 
-def init_db():
-    if not os.path.exists('database'):
-        os.makedirs('database')
-
-    conn = sqlite3.connect('database/journal.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS entries (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    date TEXT,
-                    text TEXT,
-                    mood TEXT,
-                    productivity REAL
-                )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS tasks (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    entry_id INTEGER,
-                    task_text TEXT,
-                    status TEXT DEFAULT 'pending',
-                    completed INTEGER DEFAULT 0,
-                    FOREIGN KEY(entry_id) REFERENCES entries(id)
-                )''')
-    conn.commit()
-    conn.close()
 @app.route("/", methods=["GET"])
+@cached_view
 def index():
-    conn = sqlite3.connect('database/journal.db')
-    c = conn.cursor()
-
-    # Fetch journal entries
-    c.execute("SELECT date, text, mood, productivity FROM entries ORDER BY date ASC")
-    raw_entries = c.fetchall()
-
-    # Fetch pending tasks
-    c.execute("SELECT id, task_text FROM tasks WHERE status = 'pending' AND completed = 0")
-    pending_tasks = c.fetchall()
-
-    # Fetch recent and completed tasks
-    c.execute("SELECT task_text, date(entries.date) FROM tasks JOIN entries ON tasks.entry_id = entries.id ORDER BY tasks.id DESC LIMIT 5")
-    recent_tasks = c.fetchall()
-
-    c.execute("SELECT task_text, date(entries.date) FROM tasks JOIN entries ON tasks.entry_id = entries.id WHERE tasks.completed = 1 ORDER BY tasks.id DESC LIMIT 5")
-    completed_tasks = c.fetchall()
-
-    # Fetch chart data for mood/productivity
-    c.execute('''SELECT date, 
-                        AVG(productivity), 
-                        AVG(CASE mood 
-                            WHEN 'positive' THEN 1 
-                            WHEN 'neutral' THEN 0 
-                            WHEN 'negative' THEN -1 
-                            ELSE 0 END)
-                 FROM entries 
-                 GROUP BY date 
-                 ORDER BY date DESC 
-                 LIMIT 30''')
-    chart_data = c.fetchall()
-
-    # Now, no need to close here. We'll do it after gathering all data.
-    grouped = defaultdict(list)
-    for entry in raw_entries:
-        grouped[entry[0]].append(entry)
+    # Day list is paged with a keyset on date: ?before=YYYY-MM-DD shows the
+    # DAYS_PER_PAGE days older than that date.
+    before = request.args.get('before')
+
+    with connection() as conn:
+        c = conn.cursor()
+
+        # Per-day aggregates for the visible window, computed in SQL
+        params = (before, DAYS_PER_PAGE + 1) if before else (DAYS_PER_PAGE + 1,)
+        c.execute(DAYS_SQL.format(where='WHERE date < ?' if before else ''), params)
+        day_rows = c.fetchall()
+        older_before = None
+        if len(day_rows) > DAYS_PER_PAGE:
+            day_rows = day_rows[:DAYS_PER_PAGE]
+            older_before = day_rows[-1][0]
+        day_rows.reverse()
+
+        # Tasks for every entry in the window, fetched in one pass
+        tasks_by_day = defaultdict(lambda: defaultdict(list))
+        if day_rows:
+            c.execute(DAY_TASKS_SQL, (day_rows[0][0], day_rows[-1][0]))
+            for date, entry_id, task_text in c.fetchall():
+                tasks_by_day[date][entry_id].append(task_text)
+
+        # Fetch pending tasks
+        c.execute(PENDING_TASKS_SQL)
+        pending_tasks = c.fetchall()
+
+        # Fetch recent and completed tasks
+        c.execute(RECENT_TASKS_SQL)
+        recent_tasks = c.fetchall()
+
+        c.execute(COMPLETED_TASKS_SQL)
+        completed_tasks = c.fetchall()
+
+        # Fetch chart data for mood/productivity
+        chart_data = rollups.chart_rows(conn, 'daily', 30)
 
     entries_by_day = []
-    mood_score_map = {"negative": -1, "neutral": 0, "positive": 1}
-
-    # Fetch tasks for each journal entry
-    for date, items in grouped.items():
-        moods = [e[2] for e in items]
-        prod_scores = [e[3] for e in items]
-        mood_numeric = [mood_score_map.get(m, 0) for m in moods]
-
-        avg_mood_score = sum(mood_numeric) / len(mood_numeric)
-        avg_prod_score = sum(prod_scores) / len(prod_scores)
-
-        numbered_entries = list(enumerate(items, start=1))
-
-        # Fetch tasks for each entry on the day
-        tasks_for_day = []
-        for entry in items:
-            entry_id = entry[0]  # Assuming entry ID is the first element
-            c.execute("SELECT task_text FROM tasks WHERE entry_id = ?", (entry_id,))
-            tasks = c.fetchall()
-            tasks_for_day.append({
-                "entry_id": entry_id,
-                "tasks": [task[0] for task in tasks]  # List of tasks for this entry
-            })
-
+    weekly_mood = {}
+    for date, entry_count, avg_mood_score, avg_prod_score in day_rows:
         entries_by_day.append({
             "date": date,
             "avg_mood_score": round(avg_mood_score, 2),
-            "avg_productivity": round(avg_prod_score, 2),
-            "entries": numbered_entries,
-            "tasks_for_day": tasks_for_day  # Add tasks for each entry
+            "avg_productivity": round(avg_prod_score or 0, 2),
+            "entry_count": entry_count,
+            "tasks_for_day": [
+                {"entry_id": entry_id, "tasks": tasks}
+                for entry_id, tasks in tasks_by_day[date].items()
+            ]
         })
-
-    entries_by_day.sort(key=lambda x: x["date"])
-
-    weekly_mood = {}
-    for week, items in grouped.items():
-        moods = [e[2] for e in items]
-        mood_numeric = [mood_score_map.get(m, 0) for m in moods]
-        weekly_mood[week] = round(sum(mood_numeric) / len(mood_numeric), 2)
-
-    conn.close()  # Close the connection after all database queries are completed.
+        weekly_mood[date] = round(avg_mood_score, 2)
 
     return render_template("index.html",
                            entries_by_day=entries_by_day,
+                           older_before=older_before,
+                           before=before,
                            pending_tasks=pending_tasks,
                            recent_tasks=recent_tasks,
                            completed_tasks=completed_tasks,
@@ -127,94 +188,93 @@ def index():
 
 @app.route("/submit_journal_ajax", methods=["POST"])
 def submit_journal_ajax():
+    import ingest
+
     data = request.get_json()
     text = data["journal"]
-    analysis = analyze_text(text)
 
-    # Use your custom productivity calculation here
-    prod_score = custom_productivity_score(text)
+    if data.get("async", app.config['ASYNC_INGEST']):
+        # Analysis runs on the ingest workers; the client polls /api/entry_status/<id>
+        entry_id = ingest.pipeline.submit(text)
+        return jsonify({
+            "entry_id": entry_id,
+            "status": "pending",
+            "date": datetime.now().strftime('%Y-%m-%d')
+        }), 202
 
-    conn = sqlite3.connect('database/journal.db')
-    c = conn.cursor()
-    c.execute("INSERT INTO entries (date, text, mood, productivity) VALUES (?, ?, ?, ?)",
-              (datetime.now().date(), text, analysis['mood'], prod_score))
-    entry_id = c.lastrowid
+    # Sentiment, the custom productivity score and task extraction
+    mood, prod_score, tasks = ingest.analyze_entry(text)
 
-    tasks = extract_tasks(text)
-    for task in tasks:
-        c.execute("INSERT INTO tasks (entry_id, task_text) VALUES (?, ?)", (entry_id, task))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        entry_id = store.add_entry(conn, text, mood, prod_score, tasks)
 
     return jsonify({
-        "mood": analysis['mood'],
+        "entry_id": entry_id,
+        "status": "done",
+        "mood": mood,
         "productivity": prod_score,
         "date": datetime.now().strftime('%Y-%m-%d'),
         "tasks": tasks
     })
 
+@app.route('/api/entry_status/<int:entry_id>')
+def entry_status(entry_id):
+    import ingest
+
+    status = ingest.entry_status(entry_id)
+    if status is None:
+        return jsonify({"error": "Entry not found"}), 404
+    return jsonify(status)
+
 @app.route('/complete_task/<int:task_id>', methods=['POST'])
 def complete_task(task_id):
-    conn = sqlite3.connect('database/journal.db')
-    c = conn.cursor()
-    c.execute("UPDATE tasks SET completed=1 WHERE id=?", (task_id,))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        tasks.complete(conn, [task_id])
     return '', 204
 
+@app.route('/api/tasks/status', methods=['POST'])
+def task_status_api():
+    # {"ids": [...], "status": "done" | "pending"}: completes or reopens
+    # every listed task in one transaction
+    data = request.get_json(silent=True) or {}
+    task_ids = data.get('ids')
+    if not isinstance(task_ids, list):
+        return jsonify({"error": "ids must be a list of task ids"}), 400
+    try:
+        with transaction() as conn:
+            updated = tasks.set_status(conn, task_ids, data.get('status', tasks.DONE))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"updated": updated})
+
+@app.route('/api/tasks/stats')
+@cached_view
+def task_stats_api():
+    # Pending count, per-bucket completion rate (?period=daily|weekly|monthly)
+    # and completions per day over the last 30 days
+    period = request.args.get('period', 'weekly')
+    if period not in CHART_LIMITS:
+        return jsonify({"error": "Invalid period"}), 400
+    with connection() as conn:
+        pending = tasks.pending_count(conn)
+        rates = tasks.completion_rates(conn, period, CHART_LIMITS[period])
+        by_day = tasks.completions_by_day(conn)
+    return jsonify({
+        "pending": pending,
+        "completion": [{"label": label, "tasks": count, "completed": completed, "rate": rate}
+                       for label, count, completed, rate in rates],
+        "completed_by_day": [{"date": day, "completed": count} for day, count in by_day]
+    })
+
 @app.route("/api/chart_data/<period>")
+@cached_view
 def chart_data(period):
-    conn = sqlite3.connect('database/journal.db')
-    c = conn.cursor()
-
-    if period == "daily":
-        query = '''
-            SELECT date, 
-                   AVG(productivity), 
-                   AVG(CASE mood 
-                       WHEN 'positive' THEN 1 
-                       WHEN 'neutral' THEN 0 
-                       WHEN 'negative' THEN -1 
-                       ELSE 0 END)
-            FROM entries 
-            GROUP BY date 
-            ORDER BY date DESC 
-            LIMIT 30
-        '''
-    elif period == "weekly":
-        query = '''
-            SELECT strftime('%Y-W%W', date), 
-                   AVG(productivity), 
-                   AVG(CASE mood 
-                       WHEN 'positive' THEN 1 
-                       WHEN 'neutral' THEN 0 
-                       WHEN 'negative' THEN -1 
-                       ELSE 0 END)
-            FROM entries 
-            GROUP BY strftime('%Y-W%W', date) 
-            ORDER BY date DESC 
-            LIMIT 12
-        '''
-    elif period == "monthly":
-        query = '''
-            SELECT strftime('%Y-%m', date), 
-                   AVG(productivity), 
-                   AVG(CASE mood 
-                       WHEN 'positive' THEN 1 
-                       WHEN 'neutral' THEN 0 
-                       WHEN 'negative' THEN -1 
-                       ELSE 0 END)
-            FROM entries 
-            GROUP BY strftime('%Y-%m', date) 
-            ORDER BY date DESC 
-            LIMIT 12
-        '''
-    else:
+    # Served from the precomputed rollups table (see rollups.py)
+    if period not in CHART_LIMITS:
         return jsonify({"error": "Invalid period"}), 400
 
-    c.execute(query)
-    results = c.fetchall()
-    conn.close()
+    with connection() as conn:
+        results = rollups.chart_rows(conn, period, CHART_LIMITS[period])
 
     return jsonify([{
         "label": row[0],
@@ -223,35 +283,36 @@ def chart_data(period):
     } for row in results])
 
 @app.route('/day_view/<date>')
+@cached_view
 def day_view(date):
-    conn = sqlite3.connect('database/journal.db')
-    cursor = conn.cursor()
-
-    # Get all entries for the date
-    cursor.execute("SELECT id, text, mood, productivity FROM entries WHERE date = ?", (date,))
-    rows = cursor.fetchall()
-
-    entries = []
-    for row in rows:
-        entry_id, journal_text, mood, productivity = row
-
-        # Get tasks for this entry
-        cursor.execute("SELECT task_text, status, completed FROM tasks WHERE entry_id = ?", (entry_id,))
-        tasks = cursor.fetchall()
-
-        entries.append({
-            'journal_text': journal_text,
-            'mood': mood,
-            'productivity': productivity,
-            'tasks': tasks
-        })
-
-    conn.close()
-
-    return render_template('day_view.html', date=date, entries=entries)
+    # Streamed in batches (tasks loaded per batch), so a very busy day
+    # starts rendering straight away
+    entries = stream_entries(start_date=date, end_date=date, newest_first=False)
+    return stream_page('day_view.html', title=f"Entries for {date}", entries=entries, show_date=False)
+
+@app.route('/history')
+@cached_view
+def history():
+    # Every entry, newest first, optionally limited with ?from=&to=
+    start_date, end_date = request.args.get('from'), request.args.get('to')
+    entries = stream_entries(start_date=start_date, end_date=end_date)
+    return stream_page('day_view.html', title="Journal history", entries=entries, show_date=True)
+
+@app.route('/api/entries')
+def entries_api():
+    # Keyset-paged listing: pass the returned next_cursor back as ?cursor=
+    try:
+        limit = int(request.args.get('limit', 50))
+        with connection() as conn:
+            entries, next_cursor = listing.list_entries(conn,
+                                                        cursor=request.args.get('cursor'),
+                                                        limit=limit,
+                                                        start_date=request.args.get('from'),
+                                                        end_date=request.args.get('to'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"entries": entries, "next_cursor": next_cursor})
 
-    from flask import request, redirect, url_for, flash
-from flask import request, redirect, url_for
 
 @app.route('/delete_entries', methods=['POST'])
 def delete_entries():
@@ -259,24 +320,38 @@ def delete_entries():
     entry_ids = request.form.getlist('entry_ids')
     date = request.form.get('date')  # date passed in hidden input
     
+    # Non-numeric ids can only come from a tampered form; they are skipped
+    entry_ids = [int(entry_id) for entry_id in entry_ids if entry_id.strip().isdigit()]
     if entry_ids:
-        conn = sqlite3.connect('database/journal.db')
-        cursor = conn.cursor()
-        
-        # Use a parameterized query with placeholders for safety
-        query = f"DELETE FROM entries WHERE id IN ({','.join(['?']*len(entry_ids))})"
-        cursor.execute(query, entry_ids)
-        
-        # Also delete associated tasks for deleted entries
-        query_tasks = f"DELETE FROM tasks WHERE entry_id IN ({','.join(['?']*len(entry_ids))})"
-        cursor.execute(query_tasks, entry_ids)
-        
-        conn.commit()
-        conn.close()
+        # Removes the entries, their tasks and their term index postings
+        deletion.delete_ids(entry_ids)
 
     # Redirect back to the day view page of the same date
     return redirect(url_for('day_view', date=date))
 
+@app.route('/api/delete_entries', methods=['POST'])
+def delete_entries_api():
+    # One of {"ids": [...]}, {"from": ..., "to": ...} or {"older_than_days": N};
+    # "vacuum"/"analyze" compact the database afterwards.
+    data = request.get_json(silent=True) or {}
+    start = time.perf_counter()
+    try:
+        if 'ids' in data:
+            if not isinstance(data['ids'], list) or not data['ids']:
+                return jsonify({"error": "ids must be a non-empty list of entry ids"}), 400
+            deleted = deletion.delete_ids(data['ids'])
+        elif data.get('older_than_days') is not None:
+            deleted = deletion.delete_older_than(int(data['older_than_days']))
+        else:
+            deleted = deletion.delete_range(data.get('from'), data.get('to'))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    result = {"deleted": deleted, "seconds": round(time.perf_counter() - start, 3)}
+    if data.get('vacuum') or data.get('analyze'):
+        timings = deletion.compact(bool(data.get('vacuum')), bool(data.get('analyze')))
+        result.update({f"{step}_seconds": round(seconds, 3) for step, seconds in timings.items()})
+    return jsonify(result)
+
 
 #From here insights and prompt feature code starts
 # insights feature includes insights.py file and insights.html
@@ -290,22 +365,70 @@ def insights_redirect():
 
 
 @app.route('/insights/<period>')
+@cached_view
 def insights_page(period):
     # Check for valid periods to be safe
     if period not in ['weekly', 'monthly', 'all']:
         return "Invalid period selected.", 404
 
+    from insights import generate_insights
+
     # Pass the period from the URL to our upgraded function
     insights_list = generate_insights(period=period)
     
     # Also pass the period to the template so we can display it in the title
     return render_template('insights.html', insights=insights_list, period=period)
 
+@app.route('/api/search')
+def search_api():
+    # ?q=words&from=YYYY-MM-DD&to=YYYY-MM-DD&mood=positive&page=1&per_page=20
+    query = request.args.get('q', '')
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+
+    with connection() as conn:
+        results, total = search_entries(conn, query,
+                                        start_date=request.args.get('from'),
+                                        end_date=request.args.get('to'),
+                                        mood=request.args.get('mood'),
+                                        page=page, per_page=per_page)
+    return jsonify({
+        "query": query,
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "results": results
+    })
+
 @app.route('/api/get_prompt')
 def get_prompt_api():
+    from prompts import generate_prompt
+
     prompt_text = generate_prompt()
     return jsonify({'prompt': prompt_text})
 
+# Pre-fork servers import this module once in the master process
+# (gunicorn --preload); MINDSYNC_PRELOAD=1 loads the models there so the
+# workers share them copy-on-write instead of each loading its own.
+if os.environ.get('MINDSYNC_PRELOAD') == '1':
+    init_db()
+    warmup.preload_for_fork()
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the Mind-Sync development server.")
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--preload', action='store_true',
+                        help="load the NLP stack before serving instead of in the background")
+    args = parser.parse_args()
+
     init_db()
-    app.run(debug=True)
+    # With the debug reloader only the child process (WERKZEUG_RUN_MAIN) serves requests
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        if args.preload:
+            print(f"Preloaded the NLP stack in {warmup.preload():.2f}s")
+        else:
+            warmup.preload_in_background(port=args.port)
+        import ingest
+        for db_path in shards.all_paths():
+            ingest.pipeline.resume(db_path)
+    app.run(debug=True, port=args.port)
@@ -0,0 +1,108 @@
+"""
+Concurrent load test: dashboard-style reads while submissions are written.
+
+Runs the same workload twice against a scratch database:
+  legacy - a new default (rollback journal) connection per operation,
+           the way the routes used to connect
+  pooled - db.connection()/db.transaction() with WAL and pooled connections
+and reports reader latency, which stalls behind writers in legacy mode.
+
+Usage: python -m benchmarks.concurrency [--readers 4] [--writers 2] [--seconds 5]
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import db
+
+READ_SQL = """SELECT date, COUNT(*), AVG(productivity) FROM entries
+              GROUP BY date ORDER BY date DESC LIMIT 30"""
+TEXT = "Finished the report and need to review the slides. " * 20
+
+
+@contextmanager
+def legacy_connection(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def run(db_path, open_conn, readers, writers, seconds):
+    stop = threading.Event()
+    read_ms = []
+    writes = [0]
+    lock = threading.Lock()
+
+    def reader():
+        while not stop.is_set():
+            start = time.perf_counter()
+            with open_conn(db_path) as conn:
+                conn.execute(READ_SQL).fetchall()
+            with lock:
+                read_ms.append((time.perf_counter() - start) * 1000)
+
+    def writer():
+        day = 0
+        while not stop.is_set():
+            day += 1
+            with open_conn(db_path) as conn:
+                cur = conn.execute("INSERT INTO entries (date, text, mood, productivity) VALUES (?, ?, ?, ?)",
+                                   (f"2024-{day % 12 + 1:02d}-{day % 28 + 1:02d}", TEXT, 'neutral', 0.5))
+                conn.executemany("INSERT INTO tasks (entry_id, task_text) VALUES (?, ?)",
+                                 [(cur.lastrowid, 'review the slides')] * 3)
+            with lock:
+                writes[0] += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    read_ms.sort()
+    return {
+        'reads': len(read_ms),
+        'writes': writes[0],
+        'read_p50_ms': statistics.median(read_ms),
+        'read_p99_ms': read_ms[int(len(read_ms) * 0.99) - 1],
+        'read_max_ms': read_ms[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    modes = {
+        'legacy': lambda path: legacy_connection(path),
+        'pooled': lambda path: db.transaction(path),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, open_conn in modes.items():
+            db_path = os.path.join(tmp, f'{name}.db')
+            conn = sqlite3.connect(db_path)
+            db.migrate(conn)
+            conn.close()
+            stats = run(db_path, open_conn, args.readers, args.writers, args.seconds)
+            print(f"{name:>6}: {stats['reads']} reads, {stats['writes']} writes | "
+                  f"read p50 {stats['read_p50_ms']:.2f} ms  p99 {stats['read_p99_ms']:.2f} ms  "
+                  f"max {stats['read_max_ms']:.2f} ms")
+            db.get_pool(db_path).close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Insights on a synthetic journal: the columnar engine in analytics.py against
+the SQL + per-topic full-text implementation (insights.generate_insights_sql).
+
+Reports, per period, the engine's time on a loaded frame, its time right
+after a new entry (incremental refresh), the one-off initial load, and the
+SQL implementation's time; and checks both return the same topics and counts.
+
+Usage: python -m benchmarks.insights_engine [--entries 100000] [--repeat 5]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import db
+import store
+from benchmarks import journal_gen
+
+PERIODS = ('weekly', 'monthly', 'all')
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The insights modules use the default database path, relative to the cwd
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            seconds = journal_gen.generate(db.DB_PATH, args.entries)
+            print(f"Built {args.entries} entries in {seconds:.1f}s")
+
+            import analytics
+            from insights import generate_insights, generate_insights_sql
+
+            start = time.perf_counter()
+            frame = analytics.get_frame()
+            print(f"Initial load: {(time.perf_counter() - start) * 1000:.0f} ms "
+                  f"({len(frame.counts)} postings, {len(frame.terms)} terms)")
+
+            for period in PERIODS:
+                engine_ms, engine = best_of(lambda: generate_insights(period), args.repeat)
+
+                def after_write():
+                    with db.transaction() as conn:
+                        store.add_entry(conn, "Feeling good after the long walk", 'positive', 0.4, [])
+                    return generate_insights(period)
+                refresh_ms, _ = best_of(after_write, args.repeat)
+
+                sql_ms, reference = best_of(lambda: generate_insights_sql(period), args.repeat)
+                engine, reference = generate_insights(period), generate_insights_sql(period)
+                same = ([(i['topic'], i['count']) for i in engine]
+                        == [(i['topic'], i['count']) for i in reference])
+                print(f"{period:>8}: engine {engine_ms:8.2f} ms  after a write {refresh_ms:8.2f} ms  "
+                      f"sql {sql_ms:8.2f} ms  ({sql_ms / engine_ms:5.1f}x)  same topics: {same}")
+            db.get_pool().close_all()
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
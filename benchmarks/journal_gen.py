@@ -0,0 +1,127 @@
+"""
+Synthetic journals for benchmarks.
+
+Entry text is built from Emotion dataset sentences, with the sentence's
+emotion label mapped to the entry's mood the same way Datasets/Emotion/convert.py
+does. Dates end today and go back `days` days: weekdays get more entries than
+weekends and some days are skipped entirely, like a real habit. About 40% of
+entries mention tasks, and older tasks are more likely to be completed.
+
+Everything is written through store.add_entries, so the term index, bigrams,
+FTS table and rollups are maintained exactly as in the app.
+
+Usage: python -m benchmarks.journal_gen journal.db --entries 100000
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+
+import db
+import store
+from scorer import score_many
+
+EMOTION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'Datasets', 'Emotion')
+
+EMOTION_TO_MOOD = {
+    'joy': 'positive', 'love': 'positive',
+    'anger': 'negative', 'sadness': 'negative', 'fear': 'negative',
+    'surprise': 'neutral',
+}
+MOOD_SCORE = {'positive': 1, 'neutral': 0, 'negative': -1}
+
+TASKS = [
+    'call mom', 'finish the report', 'buy groceries', 'book the dentist', 'review the slides',
+    'pay the rent', 'go for a run', 'clean the kitchen', 'reply to emails', 'plan the trip',
+    'fix the bike', 'read a chapter', 'water the plants', 'prepare the presentation',
+    'update my resume', 'meditate for ten minutes', 'renew the passport', 'write the blog post',
+]
+TASK_TEMPLATES = ['I need to {}.', 'I have to {}.', 'Todo: {}.', 'I should {}.', 'Planning to {}.']
+
+CHUNK_SIZE = 5000
+
+
+def load_sentences():
+    """(text, mood) pairs from the Emotion train/val/test files."""
+    sentences = []
+    for name in ('train.txt', 'val.txt', 'test.txt'):
+        with open(os.path.join(EMOTION_DIR, name), encoding='utf-8') as f:
+            for line in f:
+                text, _, label = line.strip().rpartition(';')
+                mood = EMOTION_TO_MOOD.get(label)
+                if text and mood:
+                    sentences.append((text, mood))
+    return sentences
+
+
+def journal_dates(rng, n_entries, days, end=None):
+    """Sorted entry dates spread over the `days` days up to `end` (default today)."""
+    end = end or date.today()
+    calendar = [end - timedelta(days=offset) for offset in range(days)]
+    # Weekdays weigh twice as much as weekends; roughly one day in five is skipped
+    weights = [0 if rng.random() < 0.2 else (2 if day.weekday() < 5 else 1) for day in calendar]
+    weights[0] = weights[0] or 1
+    return sorted(rng.choices(calendar, weights=weights, k=n_entries))
+
+
+def generate_rows(rng, sentences, dates):
+    """store.add_entries rows for the given dates."""
+    rows = []
+    for day in dates:
+        picked = [rng.choice(sentences) for _ in range(rng.randint(1, 4))]
+        tasks = rng.sample(TASKS, rng.randint(1, 3)) if rng.random() < 0.4 else []
+        text = '. '.join(text for text, _ in picked)
+        if tasks:
+            text += '. ' + ' '.join(rng.choice(TASK_TEMPLATES).format(task) for task in tasks)
+        score = sum(MOOD_SCORE[mood] for _, mood in picked)
+        mood = 'positive' if score > 0 else 'negative' if score < 0 else 'neutral'
+        rows.append([day.isoformat(), text, mood, None, tasks])
+    for row, productivity in zip(rows, score_many([row[1] for row in rows])):
+        row[3] = productivity
+    return rows
+
+
+def generate(db_path, n_entries, days=730, seed=7, chunk_size=CHUNK_SIZE, sentences=None):
+    """Writes a synthetic journal of `n_entries` entries to `db_path`; returns seconds taken."""
+    rng = random.Random(seed)
+    sentences = sentences or load_sentences()
+    dates = journal_dates(rng, n_entries, days)
+    today = date.today()
+
+    db.init_db(db_path)
+    start = time.perf_counter()
+    for offset in range(0, n_entries, chunk_size):
+        rows = generate_rows(rng, sentences, dates[offset:offset + chunk_size])
+        with db.transaction(db_path, immediate=True) as conn:
+            entry_ids = store.add_entries(conn, [tuple(row) for row in rows])
+            placeholders = ','.join('?' * len(entry_ids))
+            task_rows = conn.execute(f'''SELECT t.id, e.date FROM tasks t JOIN entries e ON e.id = t.entry_id
+                                         WHERE t.entry_id IN ({placeholders})''', entry_ids).fetchall()
+            # Completion chance grows with the task's age, up to 90% after two months,
+            # and it is completed a few days after it was written down
+            completed = [(f"{min(today, date.fromisoformat(day) + timedelta(days=rng.randint(0, 5)))} 18:00:00", task_id)
+                         for task_id, day in task_rows
+                         if rng.random() < min(0.9, (today - date.fromisoformat(day)).days / 60)]
+            conn.executemany("UPDATE tasks SET status = 'done', completed_at = ? WHERE id = ?", completed)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('db_path')
+    parser.add_argument('--entries', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db_path):
+        parser.error(f"{args.db_path} already exists")
+    seconds = generate(args.db_path, args.entries, args.days, args.seed)
+    print(f"Wrote {args.entries} entries to {args.db_path} in {seconds:.1f}s "
+          f"({args.entries / seconds:.0f} entries/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Checks that the dashboard, chart and day-view queries are answered from
+indexes rather than full table scans.
+
+Usage: python -m benchmarks.query_plans [path/to/journal.db]
+Without a path the check runs against a fresh in-memory database.
+Exits with status 1 if any query falls back to a full scan, or if a
+listing query sorts rows itself (USE TEMP B-TREE) instead of reading them in
+index order.
+"""
+import sqlite3
+import sys
+
+import app
+import listing
+import rollups
+import task_index
+import tasks
+from db import migrate
+
+# The statements the app runs, imported from the modules that run them
+QUERIES = {
+    'dashboard days': (app.DAYS_SQL.format(where='WHERE date < ?'), ('2100-01-01', app.DAYS_PER_PAGE + 1)),
+    'dashboard tasks': (app.DAY_TASKS_SQL, ('2024-01-01', '2024-01-31')),
+    'entries page': (listing.page_query(["date = ?", "id < ?"]), ('2024-01-31', 1000, 51)),
+    'entries next days': (listing.page_query(["date < ?"]), ('2024-01-31', 51)),
+    'page tasks': (listing.PAGE_TASKS_SQL.format(placeholders='?, ?, ?'), (1, 2, 3)),
+    'pending tasks': (app.PENDING_TASKS_SQL, ()),
+    'task lsh lookup': (task_index.CANDIDATES_SQL.format(placeholders='?, ?'), (0, 1, 2)),
+    'recent tasks': (app.RECENT_TASKS_SQL, ()),
+    'completed tasks': (app.COMPLETED_TASKS_SQL, ()),
+    'completions by day': (tasks.COMPLETIONS_BY_DAY_SQL, ('2024-01-01',)),
+    'chart daily': (rollups.CHART_SQL, ('daily', rollups.UNKNOWN_BUCKET, 30)),
+    'day view entries': (listing.page_query(["date >= ?", "date <= ?"], newest_first=False),
+                         ('2024-01-01', '2024-01-01', 200)),
+}
+
+# Scans that stop after LIMIT rows: the newest tasks, read backwards in id order
+BOUNDED_SCANS = {'recent tasks'}
+
+# Paged listings must come out of the index already in order: sorting a
+# busy day on every page makes streaming it quadratic
+NO_SORT = {'entries page', 'entries next days', 'day view entries'}
+
+
+def full_scans(conn, sql, params, allow_sort=True, allow_scan=False):
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    details = [row[-1] for row in plan]
+    scans = [] if allow_scan else [d for d in details if d.startswith('SCAN') and 'INDEX' not in d]
+    if not allow_sort:
+        scans += [d for d in details if d.startswith('USE TEMP B-TREE')]
+    return details, scans
+
+
+def main(db_path=':memory:'):
+    conn = sqlite3.connect(db_path)
+    migrate(conn)
+    conn.execute('ANALYZE')
+
+    failed = False
+    for name, (sql, params) in QUERIES.items():
+        details, scans = full_scans(conn, sql, params, allow_sort=name not in NO_SORT,
+                                    allow_scan=name in BOUNDED_SCANS)
+        status = ('SORT' if any(d.startswith('USE TEMP') for d in scans) else 'FULL SCAN') if scans else 'ok'
+        failed = failed or bool(scans)
+        print(f"{name:<18} {status:<10} {' | '.join(details)}")
+
+    conn.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*sys.argv[1:2]))
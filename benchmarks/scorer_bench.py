@@ -0,0 +1,70 @@
+"""
+Microbenchmark of custom_productivity_score: the old one-str.count-per-keyword
+implementation against the compiled single-pass scorer, on the Emotion texts.
+
+Usage: python -m benchmarks.scorer_bench [--repeat 3]
+"""
+import argparse
+import re
+import time
+
+from scorer import get_scorer
+
+OLD_KEYWORDS = [
+    'complete', 'completed', 'finished', 'done', 'achieved', 'accomplished', 'organized',
+    'planned', 'worked', 'progress', 'improve', 'improved', 'fixed', 'solved', 'resolved',
+    'created', 'built', 'started', 'developed', 'designed', 'reviewed', 'prepared', 'submitted'
+]
+
+
+def old_productivity_score(text):
+    text = text.lower()
+    keyword_count = sum(text.count(word) for word in OLD_KEYWORDS)
+    words = re.findall(r'\w+', text)
+    word_count = len(words)
+    if word_count == 0:
+        return 0.0
+    keyword_density = keyword_count / word_count
+    length_bonus = min(word_count / 100, 0.3)
+    score = min(keyword_density + length_bonus, 1.0)
+    return round(score, 3)
+
+
+def load_texts():
+    texts = []
+    for name in ('train', 'val', 'test'):
+        with open(f'Datasets/Emotion/{name}.txt', encoding='utf-8') as f:
+            texts.extend(line.rsplit(';', 1)[0] for line in f if ';' in line)
+    return texts
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    texts = load_texts()
+    old = best_of(lambda: [old_productivity_score(t) for t in texts], args.repeat)
+    new = best_of(lambda: get_scorer().score_many(texts), args.repeat)
+
+    old_scores = [old_productivity_score(t) for t in texts]
+    new_scores = get_scorer().score_many(texts)
+    changed = sum(1 for a, b in zip(old_scores, new_scores) if a != b)
+
+    print(f"Texts: {len(texts)}")
+    print(f"  old: {old * 1e6 / len(texts):.2f} us/text")
+    print(f"  new: {new * 1e6 / len(texts):.2f} us/text  ({old / new:.1f}x)")
+    print(f"  scores changed by word-boundary matching: {changed}")
+
+
+if __name__ == "__main__":
+    main()
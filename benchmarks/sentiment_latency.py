@@ -0,0 +1,86 @@
+"""
+Per-request latency of analyze_text before and after the shared engine.
+
+"Before" rebuilds TextBlob and SentimentIntensityAnalyzer on every call, the
+way nlp/analysis.py used to; "after" goes through the warm SentimentEngine.
+
+Usage: python -m benchmarks.sentiment_latency [--samples 500]
+"""
+import argparse
+import statistics
+import time
+
+from nlp.analysis import SentimentEngine, NLTK_DATA_DIR
+
+
+def load_texts(path='Datasets/Emotion/test.txt', limit=500):
+    texts = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            text = line.rsplit(';', 1)[0].strip()
+            if text:
+                texts.append(text)
+            if len(texts) >= limit:
+                break
+    return texts
+
+
+def analyze_text_uncached(text):
+    from textblob import TextBlob
+    from nltk.sentiment import SentimentIntensityAnalyzer
+
+    polarity = TextBlob(text).sentiment.polarity
+    try:
+        vader_score = SentimentIntensityAnalyzer().polarity_scores(text)
+    except LookupError:
+        vader_score = None
+    mood = 'positive' if polarity > 0.2 else 'negative' if polarity < -0.2 else 'neutral'
+    return {'polarity': polarity, 'vader': vader_score, 'mood': mood}
+
+
+def measure(fn, texts):
+    timings = []
+    for text in texts:
+        start = time.perf_counter()
+        fn(text)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'mean_ms': statistics.mean(timings),
+        'p50_ms': timings[len(timings) // 2],
+        'p95_ms': timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--samples', type=int, default=500)
+    args = parser.parse_args()
+
+    import nltk
+    if NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+
+    texts = load_texts(limit=args.samples)
+    engine = SentimentEngine()
+
+    start = time.perf_counter()
+    engine.load()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    before = measure(analyze_text_uncached, texts)
+    after = measure(engine.analyze, texts)
+
+    start = time.perf_counter()
+    engine.analyze_many(texts)
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    print(f"Samples: {len(texts)}  (engine warm-up {load_ms:.1f} ms)")
+    for name, stats in (('before', before), ('after', after)):
+        print(f"{name:>6}: mean {stats['mean_ms']:.3f} ms  "
+              f"p50 {stats['p50_ms']:.3f} ms  p95 {stats['p95_ms']:.3f} ms")
+    print(f" batch: {batch_ms / len(texts):.3f} ms per text via analyze_many")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Multi-user load test: one database file for everyone against one shard per
+user (shards.py).
+
+Worker threads submit entries (one write transaction each) and read the
+pending task count for users picked at random, while one heavy user keeps
+importing batches of entries in long transactions. Both modes go through
+shards.use(); in 'single' every user is routed to the same file. Reports
+throughput, the latency of the other users' writes, which wait on the
+heavy user's write lock when they share its file, and how many gave up
+after db.BUSY_TIMEOUT_MS ('database is locked').
+
+Usage: python -m benchmarks.shard_load [--users 50] [--threads 16] [--seconds 5] [--batch 2000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+import db
+import shards
+import store
+import tasks
+
+TEXT = "Finished the report and need to review the slides before the meeting. " * 5
+TASKS = ['review the slides', 'book the meeting room']
+HEAVY_USER = 'heavy'
+# Share of operations that are reads
+READ_SHARE = 0.25
+
+
+def run(users, threads, seconds, batch, shared):
+    route = (lambda user: 'shared') if shared else (lambda user: user)
+    for user in users + [HEAVY_USER]:
+        shards.create(route(user))
+
+    stop = threading.Event()
+    write_ms, read_ms = [], []
+    imported, timeouts = [0], [0]
+    lock = threading.Lock()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        while not stop.is_set():
+            with shards.use(route(rng.choice(users))):
+                start = time.perf_counter()
+                if rng.random() < READ_SHARE:
+                    with db.connection() as conn:
+                        tasks.pending_count(conn)
+                    samples = read_ms
+                else:
+                    try:
+                        with db.transaction(immediate=True) as conn:
+                            store.add_entry(conn, TEXT, 'positive', 0.4, TASKS)
+                    except sqlite3.OperationalError:
+                        with lock:
+                            timeouts[0] += 1
+                        continue
+                    samples = write_ms
+            with lock:
+                samples.append((time.perf_counter() - start) * 1000)
+
+    def heavy():
+        rows = [('2024-05-01', TEXT, 'neutral', 0.2, TASKS)] * batch
+        while not stop.is_set():
+            with shards.use(route(HEAVY_USER)):
+                with db.transaction(immediate=True) as conn:
+                    store.add_entries(conn, rows)
+            imported[0] += batch
+
+    pool = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+    pool.append(threading.Thread(target=heavy))
+    for t in pool:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in pool:
+        t.join()
+
+    write_ms.sort()
+    return {
+        'writes_per_s': len(write_ms) / seconds,
+        'reads_per_s': len(read_ms) / seconds,
+        'heavy_entries_per_s': imported[0] / seconds,
+        'write_p50_ms': statistics.median(write_ms),
+        'write_p99_ms': write_ms[int(len(write_ms) * 0.99) - 1],
+        'read_p50_ms': statistics.median(read_ms),
+        'timeouts': timeouts[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--batch', type=int, default=2000, help="entries per heavy-user transaction")
+    args = parser.parse_args()
+
+    users = [f'user{i}' for i in range(args.users)]
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{args.users} users, {args.threads} threads, heavy user importing {args.batch} entries per commit")
+        for name, shared in (('single', True), ('sharded', False)):
+            shards.SHARD_DIR = os.path.join(tmp, name)
+            stats = run(users, args.threads, args.seconds, args.batch, shared)
+            print(f"{name:>8}: {stats['writes_per_s']:7.0f} writes/s, {stats['reads_per_s']:7.0f} reads/s, "
+                  f"heavy {stats['heavy_entries_per_s']:6.0f} entries/s | "
+                  f"write p50 {stats['write_p50_ms']:.2f} ms  p99 {stats['write_p99_ms']:.2f} ms, "
+                  f"read p50 {stats['read_p50_ms']:.2f} ms, {stats['timeouts']} lock timeouts")
+            for db_path in [shards.shard_path(user) for user in users + [HEAVY_USER, 'shared']]:
+                db.get_pool(db_path).close_all()
+
+
+if __name__ == "__main__":
+    main()
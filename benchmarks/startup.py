@@ -0,0 +1,77 @@
+"""
+Startup latency: time from interpreter start to the first served request.
+
+Each run is a fresh process that imports app.py and sends requests through
+Flask's test client against a synthetic journal. Two modes:
+  lazy    - the default; models load when a request first needs them
+  preload - MINDSYNC_PRELOAD=1, everything is loaded at import time, the
+            way a pre-fork master would before forking its workers
+For each it reports the import time, the first dashboard request, the first
+submission (which needs the sentiment engine) and the first insights page.
+
+Usage: python -m benchmarks.startup [--entries 2000] [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import db
+from benchmarks import journal_gen
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.init_db()
+client = app.app.test_client()
+timings = {'import': imported - start}
+for name, send in (('dashboard', lambda: client.get('/')),
+                   ('submit', lambda: client.post('/submit_journal_ajax', json={'journal': 'Slept well and need to call the bank.'})),
+                   ('insights', lambda: client.get('/insights/monthly'))):
+    request_start = time.perf_counter()
+    assert send().status_code == 200, name
+    timings[name] = time.perf_counter() - request_start
+timings['first_request'] = imported - start + timings['dashboard']
+print(json.dumps(timings))
+'''
+
+MODES = {
+    'lazy': {'MINDSYNC_PRELOAD': '0'},
+    'preload': {'MINDSYNC_PRELOAD': '1'},
+}
+
+
+def run_once(workdir, env):
+    env = dict(os.environ, PYTHONPATH=ROOT, **env)
+    output = subprocess.run([sys.executable, '-c', CHILD], cwd=workdir, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=2000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        journal_gen.generate(os.path.join(tmp, db.DB_PATH), args.entries)
+        db.get_pool(os.path.join(tmp, db.DB_PATH)).close_all()
+        print(f"Median of {args.runs} runs, {args.entries} entries (ms)")
+        print(f"{'mode':>8} {'import':>8} {'dashboard':>10} {'submit':>8} {'insights':>9} {'first req':>10}")
+        for mode, env in MODES.items():
+            runs = [run_once(tmp, env) for _ in range(args.runs)]
+            median = {key: statistics.median(run[key] for run in runs) * 1000 for key in runs[0]}
+            print(f"{mode:>8} {median['import']:8.0f} {median['dashboard']:10.0f} {median['submit']:8.0f} "
+                  f"{median['insights']:9.0f} {median['first_request']:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+End-to-end benchmark suite on a synthetic journal (see journal_gen.py).
+
+Measures, against a fresh scratch database:
+  build         bulk load of the whole journal through store.add_entries
+  ingest_*      full NLP analysis + write, one entry at a time (the submit
+                route's path) and in batches (the importer's path)
+  index         the dashboard page
+  day_view      the busiest day's page (streamed)
+  entries_page  one page of /api/entries
+  chart_*       /api/chart_data for each period
+  insights_*    /insights/<period> for each period
+  prompt        /api/get_prompt, with the candidate pool rebuilt (cold) and reused (warm)
+  delete        deleting entries in batches of 100
+
+Pages are requested through Flask's test client with the response cache
+cleared before every request, so the numbers are for real renders.
+
+Results are printed and written as JSON (--output) together with the git
+commit, so two runs can be compared: --compare previous.json prints the
+ratio of each latency to the previous run's.
+
+Usage: python -m benchmarks.suite [--entries 10000] [--output results.json] [--compare old.json] [--keep]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import journal_gen
+
+PERIODS = ('daily', 'weekly', 'monthly')
+INSIGHT_PERIODS = ('weekly', 'monthly', 'all')
+INGEST_SAMPLE = 200
+DELETE_BATCH = 100
+
+
+def latency_stats(samples):
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        'n': len(ms),
+        'mean_ms': round(statistics.mean(ms), 3),
+        'p50_ms': round(ms[len(ms) // 2], 3),
+        'p95_ms': round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+        'min_ms': round(ms[0], 3),
+    }
+
+
+def measure(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return latency_stats(samples)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    except OSError:
+        return None
+
+
+def run(n_entries, repeat, seed):
+    # The app works on the relative database/journal.db, so the scratch
+    # journal is built at that path inside a temporary working directory.
+    workdir = tempfile.mkdtemp(prefix='mindsync-bench-')
+    os.chdir(workdir)
+
+    import db
+    results = {}
+    sentences = journal_gen.load_sentences()
+    seconds = journal_gen.generate(db.DB_PATH, n_entries, seed=seed, sentences=sentences)
+    results['build'] = {'entries': n_entries, 'seconds': round(seconds, 3),
+                        'entries_per_s': round(n_entries / seconds, 1)}
+
+    import ingest
+    import store
+    import http_cache
+    import prompts
+    from app import app
+
+    texts = [text for text, _ in sentences[:INGEST_SAMPLE]]
+    start = time.perf_counter()
+    for text in texts:
+        mood, productivity, tasks = ingest.analyze_entry(text)
+        with db.transaction() as conn:
+            store.add_entry(conn, text, mood, productivity, tasks)
+    seconds = time.perf_counter() - start
+    results['ingest_single'] = {'entries': len(texts), 'entries_per_s': round(len(texts) / seconds, 1)}
+
+    start = time.perf_counter()
+    today = time.strftime('%Y-%m-%d')
+    analyzed = ingest.analyze_entries(texts)
+    with db.transaction(immediate=True) as conn:
+        store.add_entries(conn, [(today, text, *row) for text, row in zip(texts, analyzed)])
+    seconds = time.perf_counter() - start
+    results['ingest_batch'] = {'entries': len(texts), 'entries_per_s': round(len(texts) / seconds, 1)}
+
+    client = app.test_client()
+
+    def page(url):
+        def fetch():
+            http_cache.cache.clear()
+            response = client.get(url)
+            assert response.status_code == 200, (url, response.status_code)
+        return fetch
+
+    results['index'] = measure(page('/'), repeat)
+    with db.connection() as conn:
+        busiest_day = conn.execute("SELECT date FROM entries GROUP BY date ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+    results['day_view'] = measure(page(f'/day_view/{busiest_day}'), repeat)
+    results['entries_page'] = measure(page('/api/entries?limit=50'), repeat)
+    for period in PERIODS:
+        results[f'chart_{period}'] = measure(page(f'/api/chart_data/{period}'), repeat)
+    for period in INSIGHT_PERIODS:
+        results[f'insights_{period}'] = measure(page(f'/insights/{period}'), repeat)
+
+    def cold_prompt():
+        prompts._pool_cache.pop(db.current_path(), None)
+        client.get('/api/get_prompt')
+    results['prompt_cold'] = measure(cold_prompt, repeat)
+    results['prompt_warm'] = measure(page('/api/get_prompt'), repeat)
+
+    with db.connection() as conn:
+        ids = [row[0] for row in conn.execute("SELECT id FROM entries ORDER BY id LIMIT ?",
+                                              (DELETE_BATCH * repeat,))]
+    batches = iter([ids[i:i + DELETE_BATCH] for i in range(0, len(ids), DELETE_BATCH)])
+
+    def delete_batch():
+        with db.transaction() as conn:
+            store.delete_entries(conn, next(batches))
+    results['delete'] = measure(delete_batch, min(repeat, len(ids) // DELETE_BATCH))
+    results['delete']['entries_per_batch'] = DELETE_BATCH
+
+    db.get_pool().close_all()
+    return workdir, results
+
+
+def compare(results, previous):
+    print(f"\nCompared with {previous.get('commit')} ({previous.get('entries')} entries):")
+    for name, stats in results.items():
+        old = previous['results'].get(name)
+        if not old:
+            continue
+        if 'p50_ms' in stats and old.get('p50_ms'):
+            print(f"  {name:>18}: p50 {stats['p50_ms'] / old['p50_ms']:5.2f}x")
+        elif 'entries_per_s' in stats and old.get('entries_per_s'):
+            print(f"  {name:>18}: throughput {stats['entries_per_s'] / old['entries_per_s']:5.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help="write JSON results to this file")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--keep', action='store_true', help="keep the scratch database")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    previous_path = os.path.abspath(args.compare) if args.compare else None
+    cwd = os.getcwd()
+    sys.path.insert(0, cwd)
+
+    workdir, results = run(args.entries, args.repeat, args.seed)
+    os.chdir(cwd)
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'entries': args.entries,
+        'seed': args.seed,
+        'results': results,
+    }
+
+    for name, stats in results.items():
+        if 'p50_ms' in stats:
+            print(f"{name:>18}: p50 {stats['p50_ms']:9.2f} ms  p95 {stats['p95_ms']:9.2f} ms")
+        else:
+            print(f"{name:>18}: {stats['entries_per_s']:9.1f} entries/s")
+    if args.keep:
+        print(f"Scratch database kept in {workdir}")
+    else:
+        shutil.rmtree(workdir)
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output}")
+    if previous_path:
+        with open(previous_path, encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Completing tasks: one POST /complete_task/<id> per task (a connection
+checkout and commit each) against one POST /api/tasks/status carrying every
+id (one transaction). Both go through the Flask test client on a synthetic
+journal; all tasks are reopened before each run, and the rollups are
+checked against a fresh computation afterwards.
+
+Usage: python -m benchmarks.task_completion [--tasks 10000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import db
+import rollups
+import tasks
+from benchmarks import journal_gen
+
+
+def reopen_all(task_ids):
+    with db.transaction() as conn:
+        tasks.reopen(conn, task_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # app.py uses the default database path, relative to the cwd
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            # About 0.8 tasks per generated entry
+            journal_gen.generate(db.DB_PATH, int(args.tasks * 1.4))
+            with db.connection() as conn:
+                task_ids = [row[0] for row in conn.execute("SELECT id FROM tasks ORDER BY id LIMIT ?",
+                                                           (args.tasks,))]
+            from app import app
+            client = app.test_client()
+
+            reopen_all(task_ids)
+            start = time.perf_counter()
+            for task_id in task_ids:
+                client.post(f'/complete_task/{task_id}')
+            per_task = time.perf_counter() - start
+
+            reopen_all(task_ids)
+            start = time.perf_counter()
+            response = client.post('/api/tasks/status', json={'ids': task_ids, 'status': 'done'})
+            batch = time.perf_counter() - start
+            assert response.get_json()['updated'] == len(task_ids)
+
+            with db.connection() as conn:
+                consistent = not rollups.diff(conn)
+            print(f"{len(task_ids)} tasks")
+            print(f"  per-task route: {per_task:7.3f}s  ({len(task_ids) / per_task:8.0f} tasks/s)")
+            print(f"  batch API:      {batch:7.3f}s  ({len(task_ids) / batch:8.0f} tasks/s)  "
+                  f"{per_task / batch:.0f}x faster")
+            print(f"  rollups consistent: {consistent}")
+            db.get_pool().close_all()
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
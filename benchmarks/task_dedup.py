@@ -0,0 +1,150 @@
+"""
+Task deduplication on a synthetic task set.
+
+Tasks are drawn from a pool of distinct intents ("review quarterly budget")
+with a skewed popularity, each written with small variations: case,
+punctuation, stop words, plurals and the odd dropped letter. They are
+ingested through store.add_entries (three per entry), which links each one
+to a matching open task through the LSH index in task_index.py.
+
+Reports ingestion throughput with and without linking, how well the links
+follow the true intents (precision: linked pairs sharing an intent; recall:
+repeats of an intent that were linked), the cost of a lookup against an
+exact linear scan of all open tasks, and the backfill (rebuild) time.
+
+Usage: python -m benchmarks.task_dedup [--tasks 100000] [--intents 10000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import db
+import store
+import task_index
+
+VERBS = ['review', 'finish', 'call', 'email', 'fix', 'plan', 'book', 'clean', 'update', 'write',
+         'prepare', 'cancel', 'renew', 'order', 'schedule', 'organize', 'submit', 'test', 'pay', 'read']
+QUALIFIERS = ['quarterly', 'weekly', 'new', 'old', 'team', 'family', 'annual', 'monthly', 'personal',
+              'shared', 'draft', 'final', 'urgent', 'garden', 'kitchen', 'school', 'client', 'travel']
+NOUNS = ['budget', 'report', 'dentist', 'slides', 'invoice', 'backup feature', 'passport', 'blog post',
+         'insurance', 'car service', 'presentation', 'resume', 'rent', 'groceries', 'newsletter',
+         'tax return', 'meeting notes', 'project plan', 'birthday gift', 'subscription', 'contract',
+         'photo album', 'bike repair', 'library books', 'website', 'budget sheet', 'lesson plan',
+         'dinner party', 'doctor visit', 'flight tickets']
+FILLERS = ['the', 'my', 'our', 'a']
+ENTRY_CHUNK = 1000
+TASKS_PER_ENTRY = 3
+
+
+def make_intents(rng, count):
+    combos = [f"{v} {q} {n}" for v in VERBS for q in QUALIFIERS for n in NOUNS]
+    return rng.sample(combos, min(count, len(combos)))
+
+
+def vary(rng, intent):
+    words = intent.split()
+    if rng.random() < 0.5:
+        words.insert(1, rng.choice(FILLERS))
+    if rng.random() < 0.2:
+        words[-1] += 's'
+    if rng.random() < 0.1:
+        i = rng.randrange(len(words))
+        if len(words[i]) > 4:
+            j = rng.randrange(1, len(words[i]) - 1)
+            words[i] = words[i][:j] + words[i][j + 1:]
+    text = ' '.join(words)
+    if rng.random() < 0.3:
+        text = text.capitalize()
+    return text + rng.choice(['', '', '.', '!'])
+
+
+def make_tasks(n_tasks, n_intents, seed=7):
+    """[(intent index, task text)] with Zipf-like intent popularity."""
+    rng = random.Random(seed)
+    intents = make_intents(rng, n_intents)
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(len(intents))]
+    picks = rng.choices(range(len(intents)), weights=weights, k=n_tasks)
+    return [(i, vary(rng, intents[i])) for i in picks]
+
+
+def ingest(db_path, tasks, link=True):
+    db.init_db(db_path)
+    start = time.perf_counter()
+    for offset in range(0, len(tasks), ENTRY_CHUNK * TASKS_PER_ENTRY):
+        chunk = [text for _, text in tasks[offset:offset + ENTRY_CHUNK * TASKS_PER_ENTRY]]
+        rows = [('2024-05-01', 'task list', 'neutral', 0.0, chunk[i:i + TASKS_PER_ENTRY] if link else [])
+                for i in range(0, len(chunk), TASKS_PER_ENTRY)]
+        with db.transaction(db_path, immediate=True) as conn:
+            entry_ids = store.add_entries(conn, rows)
+            if not link:
+                conn.executemany("INSERT INTO tasks (entry_id, task_text) VALUES (?, ?)",
+                                 [(entry_id, text) for j, entry_id in enumerate(entry_ids)
+                                  for text in chunk[j * TASKS_PER_ENTRY:(j + 1) * TASKS_PER_ENTRY]])
+    return time.perf_counter() - start
+
+
+def link_quality(conn, tasks):
+    intent_of = {}
+    for (task_id, canonical_id), (intent, _) in zip(
+            conn.execute("SELECT id, canonical_id FROM tasks ORDER BY id"), tasks):
+        intent_of[task_id] = (intent, canonical_id)
+    linked = [(intent, intent_of[canonical][0]) for intent, canonical in intent_of.values() if canonical]
+    precision = sum(a == b for a, b in linked) / len(linked) if linked else 1.0
+    repeats = len(tasks) - len({intent for intent, _ in tasks})
+    recall = sum(a == b for a, b in linked) / repeats if repeats else 1.0
+    return len(intent_of) - len(linked), precision, recall
+
+
+def lookup_cost(conn, tasks, samples=500):
+    """Average ms per task: LSH lookup against exact comparison with every open canonical task."""
+    probes = [text for _, text in tasks[:samples]]
+    start = time.perf_counter()
+    for text in probes:
+        keys = task_index.band_keys([task_index.shingles(text)])[0]
+        task_index._open_candidates(conn, keys)
+    lsh_ms = (time.perf_counter() - start) * 1000 / len(probes)
+
+    canonical = [task_index.shingles(text) for (text,) in conn.execute(
+        "SELECT task_text FROM tasks WHERE canonical_id IS NULL AND status = 'pending'")]
+    start = time.perf_counter()
+    for text in probes[:50]:
+        probe = task_index.shingles(text)
+        max(task_index.jaccard(probe, other) for other in canonical)
+    scan_ms = (time.perf_counter() - start) * 1000 / 50
+    return lsh_ms, scan_ms, len(canonical)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=100000)
+    parser.add_argument('--intents', type=int, default=10000)
+    args = parser.parse_args()
+
+    tasks = make_tasks(args.tasks, args.intents)
+    with tempfile.TemporaryDirectory() as tmp:
+        plain_path, linked_path = os.path.join(tmp, 'plain.db'), os.path.join(tmp, 'linked.db')
+        plain = ingest(plain_path, tasks, link=False)
+        linked = ingest(linked_path, tasks)
+        print(f"{len(tasks)} tasks from {args.intents} intents")
+        print(f"  ingest without linking: {plain:6.2f}s ({len(tasks) / plain:7.0f} tasks/s)")
+        print(f"  ingest with linking:    {linked:6.2f}s ({len(tasks) / linked:7.0f} tasks/s)")
+
+        with db.connection(linked_path) as conn:
+            distinct, precision, recall = link_quality(conn, tasks)
+            print(f"  open tasks shown: {distinct} (was {len(tasks)}), "
+                  f"precision {precision:.3f}, recall {recall:.3f}")
+            lsh_ms, scan_ms, open_count = lookup_cost(conn, tasks)
+            print(f"  lookup: LSH {lsh_ms:.3f} ms, linear scan of {open_count} open tasks {scan_ms:.3f} ms")
+
+        with db.transaction(linked_path) as conn:
+            start = time.perf_counter()
+            total, duplicates = task_index.rebuild(conn)
+            print(f"  backfill: {total} tasks, {duplicates} linked in {time.perf_counter() - start:.2f}s")
+        for path in (plain_path, linked_path):
+            db.get_pool(path).close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Throughput of task extraction on Datasets/Emotion/train.txt: the old
+two-pattern extractor against the compiled single-scan extract_tasks_batch.
+
+Usage: python -m benchmarks.task_extraction [--repeat 3]
+"""
+import argparse
+import re
+import time
+
+from nlp.task_extractor import extract_tasks_batch
+
+
+def old_extract_tasks(text):
+    task_patterns = [
+        r"\b(?:need to|have to|must|should|want to|planning to|plan to|aim to|try to)\s+(.*?)(?:[.!\n]|$)",
+        r"\b(?:to[- ]do|todo)[^\w]*(.*?)(?:[.!\n]|$)"
+    ]
+    tasks = []
+    for pattern in task_patterns:
+        matches = re.findall(pattern, text, re.IGNORECASE)
+        for match in matches:
+            task = match.strip().rstrip('.!')
+            if task:
+                tasks.append(task)
+    return tasks
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with open('Datasets/Emotion/train.txt', encoding='utf-8') as f:
+        texts = [line.rsplit(';', 1)[0] for line in f if ';' in line]
+
+    old = best_of(lambda: [old_extract_tasks(t) for t in texts], args.repeat)
+    new = best_of(lambda: extract_tasks_batch(texts), args.repeat)
+    spans = best_of(lambda: extract_tasks_batch(texts, spans=True), args.repeat)
+
+    old_total = sum(len(old_extract_tasks(t)) for t in texts)
+    new_total = sum(len(tasks) for tasks in extract_tasks_batch(texts))
+
+    print(f"Texts: {len(texts)}")
+    print(f"  old:          {len(texts) / old:,.0f} texts/s  ({old_total} tasks)")
+    print(f"  new:          {len(texts) / new:,.0f} texts/s  ({new_total} tasks after dedup)")
+    print(f"  new w/ spans: {len(texts) / spans:,.0f} texts/s")
+
+
+if __name__ == "__main__":
+    main()
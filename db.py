@@ -0,0 +1,698 @@
+import contextvars
+import os
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+import metrics
+import rollups
+import task_index
+import term_index
+
+DB_PATH = 'database/journal.db'
+
+# Connection tuning shared by every pooled connection
+POOL_SIZE = 8
+# Database files (per-user shards, see shards.py) with a pool kept open;
+# the least recently used pool is closed beyond this
+MAX_OPEN_POOLS = 64
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256
+# Values per IN (...) list (see in_batches), well under SQLite's
+# bound-variable limit with room for a statement's other parameters
+IN_BATCH_SIZE = 400
+
+# Numeric mood score used by every mood average
+MOOD_SCORE_SQL = """CASE mood
+                        WHEN 'positive' THEN 1
+                        WHEN 'neutral' THEN 0
+                        WHEN 'negative' THEN -1
+                        ELSE 0 END"""
+
+
+def in_batches(values, size=IN_BATCH_SIZE):
+    """Splits values for IN (...) lists: yields (batch, its placeholders)."""
+    values = list(values)
+    for start in range(0, len(values), size):
+        batch = values[start:start + size]
+        yield batch, ','.join('?' * len(batch))
+
+
+# --- Schema migrations ---
+# Each migration upgrades the schema by one version. The applied version is
+# tracked in PRAGMA user_version, so existing databases are upgraded in place
+# and new migrations must only ever be appended to MIGRATIONS. A migration's
+# SQL is written out in full, never taken from the modules it serves, so it
+# does the same thing however those modules change later. Derived data is
+# refilled by live code instead: a migration returns the names of the
+# REBUILDS it needs, and they run once against the final schema.
+
+def _create_base_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    date TEXT,
+                    text TEXT,
+                    mood TEXT,
+                    productivity REAL
+                )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    entry_id INTEGER,
+                    task_text TEXT,
+                    status TEXT DEFAULT 'pending',
+                    completed INTEGER DEFAULT 0,
+                    FOREIGN KEY(entry_id) REFERENCES entries(id)
+                )''')
+
+
+def _add_indexes_and_normalize_dates(conn):
+    # Dates are stored as ISO 'YYYY-MM-DD' text so they sort and range-scan
+    # correctly; older rows may hold timestamps or other date() input.
+    conn.execute('''UPDATE entries SET date = date(date)
+                    WHERE date(date) IS NOT NULL AND date != date(date)''')
+    # Covers the per-day dashboard aggregates and chart queries
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_date ON entries(date, mood, productivity)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_entry ON tasks(entry_id, task_text)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_open ON tasks(completed, status)')
+
+
+def _add_term_index(conn):
+    conn.execute('ALTER TABLE entries ADD COLUMN word_count INTEGER')
+    conn.execute('''CREATE TABLE term_postings (
+                    term TEXT NOT NULL,
+                    entry_id INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (term, entry_id)
+                ) WITHOUT ROWID''')
+    conn.execute('CREATE INDEX idx_postings_entry ON term_postings(entry_id)')
+    conn.execute('''CREATE TABLE term_stats (
+                    term TEXT PRIMARY KEY,
+                    df INTEGER NOT NULL,
+                    tf_sum REAL NOT NULL
+                ) WITHOUT ROWID''')
+    return {'term_index'}
+
+
+def _add_rollups(conn):
+    # Daily / weekly / monthly chart aggregates kept current by triggers (see rollups.py)
+    conn.execute('''CREATE TABLE rollups (
+                    period TEXT NOT NULL,
+                    bucket TEXT NOT NULL,
+                    entry_count INTEGER NOT NULL DEFAULT 0,
+                    productivity_sum REAL NOT NULL DEFAULT 0,
+                    mood_sum REAL NOT NULL DEFAULT 0,
+                    task_count INTEGER NOT NULL DEFAULT 0,
+                    tasks_completed INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (period, bucket)
+                ) WITHOUT ROWID''')
+    conn.execute('''CREATE TRIGGER rollups_entry_insert AFTER INSERT ON entries WHEN NEW.mood IS NOT NULL
+                    BEGIN
+                        INSERT INTO rollups (period, bucket, entry_count, productivity_sum, mood_sum) VALUES
+                            ('daily', NEW.date, +1, +IFNULL(NEW.productivity, 0), +(CASE NEW.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END)),
+                            ('weekly', strftime('%Y-W%W', NEW.date), +1, +IFNULL(NEW.productivity, 0), +(CASE NEW.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END)),
+                            ('monthly', strftime('%Y-%m', NEW.date), +1, +IFNULL(NEW.productivity, 0), +(CASE NEW.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END))
+                        ON CONFLICT(period, bucket) DO UPDATE SET
+                            entry_count = entry_count + excluded.entry_count,
+                            productivity_sum = productivity_sum + excluded.productivity_sum,
+                            mood_sum = mood_sum + excluded.mood_sum;
+                    END''')
+    conn.execute('''CREATE TRIGGER rollups_entry_delete AFTER DELETE ON entries WHEN OLD.mood IS NOT NULL
+                    BEGIN
+                        INSERT INTO rollups (period, bucket, entry_count, productivity_sum, mood_sum) VALUES
+                            ('daily', OLD.date, -1, -IFNULL(OLD.productivity, 0), -(CASE OLD.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END)),
+                            ('weekly', strftime('%Y-W%W', OLD.date), -1, -IFNULL(OLD.productivity, 0), -(CASE OLD.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END)),
+                            ('monthly', strftime('%Y-%m', OLD.date), -1, -IFNULL(OLD.productivity, 0), -(CASE OLD.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END))
+                        ON CONFLICT(period, bucket) DO UPDATE SET
+                            entry_count = entry_count + excluded.entry_count,
+                            productivity_sum = productivity_sum + excluded.productivity_sum,
+                            mood_sum = mood_sum + excluded.mood_sum;
+                    END''')
+    conn.execute('''CREATE TRIGGER rollups_entry_update_old AFTER UPDATE OF date, mood, productivity ON entries WHEN OLD.mood IS NOT NULL
+                    BEGIN
+                        INSERT INTO rollups (period, bucket, entry_count, productivity_sum, mood_sum) VALUES
+                            ('daily', OLD.date, -1, -IFNULL(OLD.productivity, 0), -(CASE OLD.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END)),
+                            ('weekly', strftime('%Y-W%W', OLD.date), -1, -IFNULL(OLD.productivity, 0), -(CASE OLD.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END)),
+                            ('monthly', strftime('%Y-%m', OLD.date), -1, -IFNULL(OLD.productivity, 0), -(CASE OLD.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END))
+                        ON CONFLICT(period, bucket) DO UPDATE SET
+                            entry_count = entry_count + excluded.entry_count,
+                            productivity_sum = productivity_sum + excluded.productivity_sum,
+                            mood_sum = mood_sum + excluded.mood_sum;
+                    END''')
+    conn.execute('''CREATE TRIGGER rollups_entry_update_new AFTER UPDATE OF date, mood, productivity ON entries WHEN NEW.mood IS NOT NULL
+                    BEGIN
+                        INSERT INTO rollups (period, bucket, entry_count, productivity_sum, mood_sum) VALUES
+                            ('daily', NEW.date, +1, +IFNULL(NEW.productivity, 0), +(CASE NEW.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END)),
+                            ('weekly', strftime('%Y-W%W', NEW.date), +1, +IFNULL(NEW.productivity, 0), +(CASE NEW.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END)),
+                            ('monthly', strftime('%Y-%m', NEW.date), +1, +IFNULL(NEW.productivity, 0), +(CASE NEW.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END))
+                        ON CONFLICT(period, bucket) DO UPDATE SET
+                            entry_count = entry_count + excluded.entry_count,
+                            productivity_sum = productivity_sum + excluded.productivity_sum,
+                            mood_sum = mood_sum + excluded.mood_sum;
+                    END''')
+    conn.execute('''CREATE TRIGGER rollups_task_insert AFTER INSERT ON tasks WHEN NEW.entry_id IN (SELECT id FROM entries)
+                    BEGIN
+                        INSERT INTO rollups (period, bucket, task_count, tasks_completed) VALUES
+                            ('daily', (SELECT date FROM entries WHERE id = NEW.entry_id), +1, +IFNULL(NEW.completed, 0)),
+                            ('weekly', strftime('%Y-W%W', (SELECT date FROM entries WHERE id = NEW.entry_id)), +1, +IFNULL(NEW.completed, 0)),
+                            ('monthly', strftime('%Y-%m', (SELECT date FROM entries WHERE id = NEW.entry_id)), +1, +IFNULL(NEW.completed, 0))
+                        ON CONFLICT(period, bucket) DO UPDATE SET
+                            task_count = task_count + excluded.task_count,
+                            tasks_completed = tasks_completed + excluded.tasks_completed;
+                    END''')
+    conn.execute('''CREATE TRIGGER rollups_task_delete AFTER DELETE ON tasks WHEN OLD.entry_id IN (SELECT id FROM entries)
+                    BEGIN
+                        INSERT INTO rollups (period, bucket, task_count, tasks_completed) VALUES
+                            ('daily', (SELECT date FROM entries WHERE id = OLD.entry_id), -1, -IFNULL(OLD.completed, 0)),
+                            ('weekly', strftime('%Y-W%W', (SELECT date FROM entries WHERE id = OLD.entry_id)), -1, -IFNULL(OLD.completed, 0)),
+                            ('monthly', strftime('%Y-%m', (SELECT date FROM entries WHERE id = OLD.entry_id)), -1, -IFNULL(OLD.completed, 0))
+                        ON CONFLICT(period, bucket) DO UPDATE SET
+                            task_count = task_count + excluded.task_count,
+                            tasks_completed = tasks_completed + excluded.tasks_completed;
+                    END''')
+    conn.execute('''CREATE TRIGGER rollups_task_complete AFTER UPDATE OF completed ON tasks WHEN NEW.entry_id IN (SELECT id FROM entries)
+                    BEGIN
+                        INSERT INTO rollups (period, bucket, tasks_completed) VALUES
+                            ('daily', (SELECT date FROM entries WHERE id = NEW.entry_id), IFNULL(NEW.completed, 0) - IFNULL(OLD.completed, 0)),
+                            ('weekly', strftime('%Y-W%W', (SELECT date FROM entries WHERE id = NEW.entry_id)), IFNULL(NEW.completed, 0) - IFNULL(OLD.completed, 0)),
+                            ('monthly', strftime('%Y-%m', (SELECT date FROM entries WHERE id = NEW.entry_id)), IFNULL(NEW.completed, 0) - IFNULL(OLD.completed, 0))
+                        ON CONFLICT(period, bucket) DO UPDATE SET
+                            tasks_completed = tasks_completed + excluded.tasks_completed;
+                    END''')
+    return {'rollups'}
+
+
+def _add_analysis_status(conn):
+    # 'pending' until the ingestion workers have scored the entry, then 'done'
+    # (or 'failed'). Existing entries were analyzed synchronously.
+    conn.execute("ALTER TABLE entries ADD COLUMN analysis_status TEXT NOT NULL DEFAULT 'done'")
+    conn.execute("CREATE INDEX idx_entries_unanalyzed ON entries(id) WHERE analysis_status != 'done'")
+
+
+def _add_import_progress(conn):
+    # Records committed per source file by import_journal.py, for resuming
+    conn.execute('''CREATE TABLE import_progress (
+                    source TEXT PRIMARY KEY,
+                    offset INTEGER NOT NULL
+                )''')
+
+
+def _add_bigram_index(conn):
+    conn.execute('ALTER TABLE entries ADD COLUMN token_count INTEGER')
+    conn.execute('''CREATE TABLE entry_bigrams (
+                    entry_id INTEGER NOT NULL,
+                    phrase TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (entry_id, phrase)
+                ) WITHOUT ROWID''')
+
+    # entries_version changes on every insert, update and delete of an entry,
+    # so in-process caches can tell whether the journal changed with one lookup.
+    conn.execute('''CREATE TABLE meta (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                ) WITHOUT ROWID''')
+    conn.execute("INSERT INTO meta (key, value) VALUES ('entries_version', 0)")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(f'''CREATE TRIGGER entries_version_{event.lower()} AFTER {event} ON entries
+                         BEGIN
+                             UPDATE meta SET value = value + 1 WHERE key = 'entries_version';
+                         END''')
+    return {'term_index'}
+
+
+def _add_full_text_search(conn):
+    # External-content FTS5 index over entries.text; the triggers keep it in
+    # sync (updates only matter when the text itself changes).
+    conn.execute('''CREATE VIRTUAL TABLE entries_fts USING fts5(
+                    text, content='entries', content_rowid='id', tokenize='porter unicode61'
+                )''')
+    conn.execute('''CREATE TRIGGER entries_fts_insert AFTER INSERT ON entries BEGIN
+                    INSERT INTO entries_fts (rowid, text) VALUES (NEW.id, NEW.text);
+                END''')
+    conn.execute('''CREATE TRIGGER entries_fts_delete AFTER DELETE ON entries BEGIN
+                    INSERT INTO entries_fts (entries_fts, rowid, text) VALUES ('delete', OLD.id, OLD.text);
+                END''')
+    conn.execute('''CREATE TRIGGER entries_fts_update AFTER UPDATE OF text ON entries BEGIN
+                    INSERT INTO entries_fts (entries_fts, rowid, text) VALUES ('delete', OLD.id, OLD.text);
+                    INSERT INTO entries_fts (rowid, text) VALUES (NEW.id, NEW.text);
+                END''')
+    conn.execute("INSERT INTO entries_fts (entries_fts) VALUES ('rebuild')")
+
+
+def _add_tasks_version(conn):
+    # Companion to entries_version for task changes; together they form the
+    # data version the HTTP response cache is keyed on (see http_cache.py).
+    conn.execute("INSERT INTO meta (key, value) VALUES ('tasks_version', 0)")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(f'''CREATE TRIGGER tasks_version_{event.lower()} AFTER {event} ON tasks
+                         BEGIN
+                             UPDATE meta SET value = value + 1 WHERE key = 'tasks_version';
+                         END''')
+
+
+def _rebuild_tasks(conn, create_sql, copy_sql, replaced=()):
+    """
+    Replaces tasks with the table created by create_sql (named tasks_new) and
+    filled by copy_sql; SQLite can't alter a column or a foreign key. Triggers
+    on tasks, and rollups_entry_tasks_delete which reads it, would block the
+    rename, so they are dropped first and re-created from their stored SQL
+    afterwards, except those in `replaced`. The caller re-creates the indexes.
+    """
+    triggers = conn.execute('''SELECT name, sql FROM sqlite_master
+                               WHERE type = 'trigger' AND (tbl_name = 'tasks' OR name = 'rollups_entry_tasks_delete')''').fetchall()
+    for name, _ in triggers:
+        conn.execute(f"DROP TRIGGER {name}")
+    conn.execute(create_sql)
+    conn.execute(copy_sql)
+    conn.execute("DROP TABLE tasks")
+    conn.execute("ALTER TABLE tasks_new RENAME TO tasks")
+    for name, sql in triggers:
+        if name not in replaced:
+            conn.execute(sql)
+
+
+def _add_task_cascade(conn):
+    # tasks is rebuilt with ON DELETE CASCADE; connect() turns foreign key
+    # enforcement on. Orphaned tasks (their entry already gone) would violate
+    # the key and are left out.
+    _rebuild_tasks(conn,
+                   '''CREATE TABLE tasks_new (
+                          id INTEGER PRIMARY KEY AUTOINCREMENT,
+                          entry_id INTEGER NOT NULL REFERENCES entries(id) ON DELETE CASCADE,
+                          task_text TEXT,
+                          status TEXT DEFAULT 'pending',
+                          completed INTEGER DEFAULT 0
+                      )''',
+                   '''INSERT INTO tasks_new (id, entry_id, task_text, status, completed)
+                      SELECT id, entry_id, task_text, status, completed FROM tasks
+                      WHERE entry_id IN (SELECT id FROM entries)''')
+    conn.execute('CREATE INDEX idx_tasks_entry ON tasks(entry_id, task_text)')
+    conn.execute('CREATE INDEX idx_tasks_open ON tasks(completed, status)')
+    # Cascaded task deletes run after their entry is gone, when the task
+    # triggers can no longer find its date, so the entry's tasks are taken
+    # out of the rollups just before the entry itself is deleted.
+    conn.execute('''CREATE TRIGGER rollups_entry_tasks_delete BEFORE DELETE ON entries WHEN EXISTS (SELECT 1 FROM tasks WHERE entry_id = OLD.id)
+                    BEGIN
+                        INSERT INTO rollups (period, bucket, task_count, tasks_completed) VALUES
+                            ('daily', OLD.date, -(SELECT COUNT(*) FROM tasks WHERE entry_id = OLD.id), -(SELECT IFNULL(SUM(completed), 0) FROM tasks WHERE entry_id = OLD.id)),
+                            ('weekly', strftime('%Y-W%W', OLD.date), -(SELECT COUNT(*) FROM tasks WHERE entry_id = OLD.id), -(SELECT IFNULL(SUM(completed), 0) FROM tasks WHERE entry_id = OLD.id)),
+                            ('monthly', strftime('%Y-%m', OLD.date), -(SELECT COUNT(*) FROM tasks WHERE entry_id = OLD.id), -(SELECT IFNULL(SUM(completed), 0) FROM tasks WHERE entry_id = OLD.id))
+                        ON CONFLICT(period, bucket) DO UPDATE SET
+                            task_count = task_count + excluded.task_count,
+                            tasks_completed = tasks_completed + excluded.tasks_completed;
+                    END''')
+    # Drops rollups left stale by earlier deletes
+    return {'rollups'}
+
+
+def _add_task_lifecycle(conn):
+    # `status` ('pending' or 'done') becomes the only task state, with the
+    # completion time in completed_at; the old `completed` flag could
+    # disagree with it. Tasks completed before this get their entry's date,
+    # the best time known for them. The rollup triggers reading `completed`
+    # are replaced.
+    _rebuild_tasks(conn,
+                   '''CREATE TABLE tasks_new (
+                          id INTEGER PRIMARY KEY AUTOINCREMENT,
+                          entry_id INTEGER NOT NULL REFERENCES entries(id) ON DELETE CASCADE,
+                          task_text TEXT,
+                          status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'done')),
+                          completed_at TEXT
+                      )''',
+                   '''INSERT INTO tasks_new (id, entry_id, task_text, status, completed_at)
+                      SELECT t.id, t.entry_id, t.task_text,
+                             CASE WHEN t.completed = 1 OR t.status = 'done' THEN 'done' ELSE 'pending' END,
+                             CASE WHEN t.completed = 1 OR t.status = 'done' THEN e.date END
+                      FROM tasks t JOIN entries e ON e.id = t.entry_id''',
+                   replaced=('rollups_entry_tasks_delete', 'rollups_task_insert',
+                             'rollups_task_delete', 'rollups_task_complete'))
+    conn.execute('CREATE INDEX idx_tasks_entry ON tasks(entry_id, task_text)')
+    # Pending lists and counts, and completions ordered or grouped by time
+    conn.execute('CREATE INDEX idx_tasks_status ON tasks(status, completed_at)')
+    conn.execute('''CREATE TRIGGER rollups_entry_tasks_delete BEFORE DELETE ON entries WHEN EXISTS (SELECT 1 FROM tasks WHERE entry_id = OLD.id)
+                    BEGIN
+                        INSERT INTO rollups (period, bucket, task_count, tasks_completed) VALUES
+                            ('daily', OLD.date, -(SELECT COUNT(*) FROM tasks WHERE entry_id = OLD.id), -(SELECT IFNULL(SUM(status = 'done'), 0) FROM tasks WHERE entry_id = OLD.id)),
+                            ('weekly', strftime('%Y-W%W', OLD.date), -(SELECT COUNT(*) FROM tasks WHERE entry_id = OLD.id), -(SELECT IFNULL(SUM(status = 'done'), 0) FROM tasks WHERE entry_id = OLD.id)),
+                            ('monthly', strftime('%Y-%m', OLD.date), -(SELECT COUNT(*) FROM tasks WHERE entry_id = OLD.id), -(SELECT IFNULL(SUM(status = 'done'), 0) FROM tasks WHERE entry_id = OLD.id))
+                        ON CONFLICT(period, bucket) DO UPDATE SET
+                            task_count = task_count + excluded.task_count,
+                            tasks_completed = tasks_completed + excluded.tasks_completed;
+                    END''')
+    conn.execute('''CREATE TRIGGER rollups_task_insert AFTER INSERT ON tasks WHEN NEW.entry_id IN (SELECT id FROM entries)
+                    BEGIN
+                        INSERT INTO rollups (period, bucket, task_count, tasks_completed) VALUES
+                            ('daily', (SELECT date FROM entries WHERE id = NEW.entry_id), +1, +(NEW.status = 'done')),
+                            ('weekly', strftime('%Y-W%W', (SELECT date FROM entries WHERE id = NEW.entry_id)), +1, +(NEW.status = 'done')),
+                            ('monthly', strftime('%Y-%m', (SELECT date FROM entries WHERE id = NEW.entry_id)), +1, +(NEW.status = 'done'))
+                        ON CONFLICT(period, bucket) DO UPDATE SET
+                            task_count = task_count + excluded.task_count,
+                            tasks_completed = tasks_completed + excluded.tasks_completed;
+                    END''')
+    conn.execute('''CREATE TRIGGER rollups_task_delete AFTER DELETE ON tasks WHEN OLD.entry_id IN (SELECT id FROM entries)
+                    BEGIN
+                        INSERT INTO rollups (period, bucket, task_count, tasks_completed) VALUES
+                            ('daily', (SELECT date FROM entries WHERE id = OLD.entry_id), -1, -(OLD.status = 'done')),
+                            ('weekly', strftime('%Y-W%W', (SELECT date FROM entries WHERE id = OLD.entry_id)), -1, -(OLD.status = 'done')),
+                            ('monthly', strftime('%Y-%m', (SELECT date FROM entries WHERE id = OLD.entry_id)), -1, -(OLD.status = 'done'))
+                        ON CONFLICT(period, bucket) DO UPDATE SET
+                            task_count = task_count + excluded.task_count,
+                            tasks_completed = tasks_completed + excluded.tasks_completed;
+                    END''')
+    conn.execute('''CREATE TRIGGER rollups_task_status AFTER UPDATE OF status ON tasks WHEN NEW.status != OLD.status AND NEW.entry_id IN (SELECT id FROM entries)
+                    BEGIN
+                        INSERT INTO rollups (period, bucket, tasks_completed) VALUES
+                            ('daily', (SELECT date FROM entries WHERE id = NEW.entry_id), (NEW.status = 'done') - (OLD.status = 'done')),
+                            ('weekly', strftime('%Y-W%W', (SELECT date FROM entries WHERE id = NEW.entry_id)), (NEW.status = 'done') - (OLD.status = 'done')),
+                            ('monthly', strftime('%Y-%m', (SELECT date FROM entries WHERE id = NEW.entry_id)), (NEW.status = 'done') - (OLD.status = 'done'))
+                        ON CONFLICT(period, bucket) DO UPDATE SET
+                            tasks_completed = tasks_completed + excluded.tasks_completed;
+                    END''')
+    return {'rollups'}
+
+
+def _add_task_dedup(conn):
+    # Duplicate open tasks point at the first occurrence; task_lsh holds the
+    # MinHash band hashes of canonical tasks (see task_index.py). Existing
+    # tasks are linked here.
+    conn.execute("ALTER TABLE tasks ADD COLUMN canonical_id INTEGER REFERENCES tasks(id) ON DELETE SET NULL")
+    conn.execute('CREATE INDEX idx_tasks_canonical ON tasks(canonical_id, status)')
+    conn.execute('''CREATE TABLE task_lsh (
+                    band INTEGER NOT NULL,
+                    hash INTEGER NOT NULL,
+                    task_id INTEGER NOT NULL REFERENCES tasks(id) ON DELETE CASCADE,
+                    PRIMARY KEY (band, hash, task_id)
+                ) WITHOUT ROWID''')
+    conn.execute('CREATE INDEX idx_task_lsh_task ON task_lsh(task_id)')
+    return {'task_index'}
+
+
+def _add_entries_date_id_index(conn):
+    # Listings page and stream in (date, id) order (see listing.py);
+    # idx_entries_date has mood and productivity between date and id
+    conn.execute('CREATE INDEX idx_entries_date_id ON entries(date, id)')
+
+
+def _add_unknown_date_buckets(conn):
+    # Rollup buckets of dates that don't parse were NULL, which failed the
+    # insert; the re-created triggers put them in rollups.UNKNOWN_BUCKET
+    for name in ('rollups_entry_insert', 'rollups_entry_delete', 'rollups_entry_update_old',
+                 'rollups_entry_update_new', 'rollups_entry_tasks_delete', 'rollups_task_insert',
+                 'rollups_task_delete', 'rollups_task_status'):
+        conn.execute(f"DROP TRIGGER {name}")
+    conn.execute('''CREATE TRIGGER rollups_entry_insert AFTER INSERT ON entries WHEN NEW.mood IS NOT NULL
+                    BEGIN
+                        INSERT INTO rollups (period, bucket, entry_count, productivity_sum, mood_sum) VALUES
+                            ('daily', IFNULL(date(NEW.date), 'unknown'), +1, +IFNULL(NEW.productivity, 0), +(CASE NEW.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END)),
+                            ('weekly', IFNULL(strftime('%Y-W%W', NEW.date), 'unknown'), +1, +IFNULL(NEW.productivity, 0), +(CASE NEW.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END)),
+                            ('monthly', IFNULL(strftime('%Y-%m', NEW.date), 'unknown'), +1, +IFNULL(NEW.productivity, 0), +(CASE NEW.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END))
+                        ON CONFLICT(period, bucket) DO UPDATE SET
+                            entry_count = entry_count + excluded.entry_count,
+                            productivity_sum = productivity_sum + excluded.productivity_sum,
+                            mood_sum = mood_sum + excluded.mood_sum;
+                    END''')
+    conn.execute('''CREATE TRIGGER rollups_entry_delete AFTER DELETE ON entries WHEN OLD.mood IS NOT NULL
+                    BEGIN
+                        INSERT INTO rollups (period, bucket, entry_count, productivity_sum, mood_sum) VALUES
+                            ('daily', IFNULL(date(OLD.date), 'unknown'), -1, -IFNULL(OLD.productivity, 0), -(CASE OLD.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END)),
+                            ('weekly', IFNULL(strftime('%Y-W%W', OLD.date), 'unknown'), -1, -IFNULL(OLD.productivity, 0), -(CASE OLD.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END)),
+                            ('monthly', IFNULL(strftime('%Y-%m', OLD.date), 'unknown'), -1, -IFNULL(OLD.productivity, 0), -(CASE OLD.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END))
+                        ON CONFLICT(period, bucket) DO UPDATE SET
+                            entry_count = entry_count + excluded.entry_count,
+                            productivity_sum = productivity_sum + excluded.productivity_sum,
+                            mood_sum = mood_sum + excluded.mood_sum;
+                    END''')
+    conn.execute('''CREATE TRIGGER rollups_entry_update_old AFTER UPDATE OF date, mood, productivity ON entries WHEN OLD.mood IS NOT NULL
+                    BEGIN
+                        INSERT INTO rollups (period, bucket, entry_count, productivity_sum, mood_sum) VALUES
+                            ('daily', IFNULL(date(OLD.date), 'unknown'), -1, -IFNULL(OLD.productivity, 0), -(CASE OLD.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END)),
+                            ('weekly', IFNULL(strftime('%Y-W%W', OLD.date), 'unknown'), -1, -IFNULL(OLD.productivity, 0), -(CASE OLD.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END)),
+                            ('monthly', IFNULL(strftime('%Y-%m', OLD.date), 'unknown'), -1, -IFNULL(OLD.productivity, 0), -(CASE OLD.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END))
+                        ON CONFLICT(period, bucket) DO UPDATE SET
+                            entry_count = entry_count + excluded.entry_count,
+                            productivity_sum = productivity_sum + excluded.productivity_sum,
+                            mood_sum = mood_sum + excluded.mood_sum;
+                    END''')
+    conn.execute('''CREATE TRIGGER rollups_entry_update_new AFTER UPDATE OF date, mood, productivity ON entries WHEN NEW.mood IS NOT NULL
+                    BEGIN
+                        INSERT INTO rollups (period, bucket, entry_count, productivity_sum, mood_sum) VALUES
+                            ('daily', IFNULL(date(NEW.date), 'unknown'), +1, +IFNULL(NEW.productivity, 0), +(CASE NEW.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END)),
+                            ('weekly', IFNULL(strftime('%Y-W%W', NEW.date), 'unknown'), +1, +IFNULL(NEW.productivity, 0), +(CASE NEW.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END)),
+                            ('monthly', IFNULL(strftime('%Y-%m', NEW.date), 'unknown'), +1, +IFNULL(NEW.productivity, 0), +(CASE NEW.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END))
+                        ON CONFLICT(period, bucket) DO UPDATE SET
+                            entry_count = entry_count + excluded.entry_count,
+                            productivity_sum = productivity_sum + excluded.productivity_sum,
+                            mood_sum = mood_sum + excluded.mood_sum;
+                    END''')
+    conn.execute('''CREATE TRIGGER rollups_entry_tasks_delete BEFORE DELETE ON entries WHEN EXISTS (SELECT 1 FROM tasks WHERE entry_id = OLD.id)
+                    BEGIN
+                        INSERT INTO rollups (period, bucket, task_count, tasks_completed) VALUES
+                            ('daily', IFNULL(date(OLD.date), 'unknown'), -(SELECT COUNT(*) FROM tasks WHERE entry_id = OLD.id), -(SELECT IFNULL(SUM(status = 'done'), 0) FROM tasks WHERE entry_id = OLD.id)),
+                            ('weekly', IFNULL(strftime('%Y-W%W', OLD.date), 'unknown'), -(SELECT COUNT(*) FROM tasks WHERE entry_id = OLD.id), -(SELECT IFNULL(SUM(status = 'done'), 0) FROM tasks WHERE entry_id = OLD.id)),
+                            ('monthly', IFNULL(strftime('%Y-%m', OLD.date), 'unknown'), -(SELECT COUNT(*) FROM tasks WHERE entry_id = OLD.id), -(SELECT IFNULL(SUM(status = 'done'), 0) FROM tasks WHERE entry_id = OLD.id))
+                        ON CONFLICT(period, bucket) DO UPDATE SET
+                            task_count = task_count + excluded.task_count,
+                            tasks_completed = tasks_completed + excluded.tasks_completed;
+                    END''')
+    conn.execute('''CREATE TRIGGER rollups_task_insert AFTER INSERT ON tasks WHEN NEW.entry_id IN (SELECT id FROM entries)
+                    BEGIN
+                        INSERT INTO rollups (period, bucket, task_count, tasks_completed) VALUES
+                            ('daily', IFNULL(date((SELECT date FROM entries WHERE id = NEW.entry_id)), 'unknown'), +1, +(NEW.status = 'done')),
+                            ('weekly', IFNULL(strftime('%Y-W%W', (SELECT date FROM entries WHERE id = NEW.entry_id)), 'unknown'), +1, +(NEW.status = 'done')),
+                            ('monthly', IFNULL(strftime('%Y-%m', (SELECT date FROM entries WHERE id = NEW.entry_id)), 'unknown'), +1, +(NEW.status = 'done'))
+                        ON CONFLICT(period, bucket) DO UPDATE SET
+                            task_count = task_count + excluded.task_count,
+                            tasks_completed = tasks_completed + excluded.tasks_completed;
+                    END''')
+    conn.execute('''CREATE TRIGGER rollups_task_delete AFTER DELETE ON tasks WHEN OLD.entry_id IN (SELECT id FROM entries)
+                    BEGIN
+                        INSERT INTO rollups (period, bucket, task_count, tasks_completed) VALUES
+                            ('daily', IFNULL(date((SELECT date FROM entries WHERE id = OLD.entry_id)), 'unknown'), -1, -(OLD.status = 'done')),
+                            ('weekly', IFNULL(strftime('%Y-W%W', (SELECT date FROM entries WHERE id = OLD.entry_id)), 'unknown'), -1, -(OLD.status = 'done')),
+                            ('monthly', IFNULL(strftime('%Y-%m', (SELECT date FROM entries WHERE id = OLD.entry_id)), 'unknown'), -1, -(OLD.status = 'done'))
+                        ON CONFLICT(period, bucket) DO UPDATE SET
+                            task_count = task_count + excluded.task_count,
+                            tasks_completed = tasks_completed + excluded.tasks_completed;
+                    END''')
+    conn.execute('''CREATE TRIGGER rollups_task_status AFTER UPDATE OF status ON tasks WHEN NEW.status != OLD.status AND NEW.entry_id IN (SELECT id FROM entries)
+                    BEGIN
+                        INSERT INTO rollups (period, bucket, tasks_completed) VALUES
+                            ('daily', IFNULL(date((SELECT date FROM entries WHERE id = NEW.entry_id)), 'unknown'), (NEW.status = 'done') - (OLD.status = 'done')),
+                            ('weekly', IFNULL(strftime('%Y-W%W', (SELECT date FROM entries WHERE id = NEW.entry_id)), 'unknown'), (NEW.status = 'done') - (OLD.status = 'done')),
+                            ('monthly', IFNULL(strftime('%Y-%m', (SELECT date FROM entries WHERE id = NEW.entry_id)), 'unknown'), (NEW.status = 'done') - (OLD.status = 'done'))
+                        ON CONFLICT(period, bucket) DO UPDATE SET
+                            tasks_completed = tasks_completed + excluded.tasks_completed;
+                    END''')
+    return {'rollups'}
+
+
+MIGRATIONS = [
+    _create_base_tables,
+    _add_indexes_and_normalize_dates,
+    _add_term_index,
+    _add_rollups,
+    _add_analysis_status,
+    _add_import_progress,
+    _add_bigram_index,
+    _add_full_text_search,
+    _add_tasks_version,
+    _add_task_cascade,
+    _add_task_lifecycle,
+    _add_task_dedup,
+    _add_entries_date_id_index,
+    _add_unknown_date_buckets,
+]
+
+
+# Derived data a migration can ask to be recomputed from the raw tables,
+# by the module's rebuild()
+REBUILDS = {
+    'term_index': term_index,
+    'rollups': rollups,
+    'task_index': task_index,
+}
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Applies every migration newer than the database's user_version, then the
+    rebuilds they asked for, all in one transaction with the version bump.
+    The version is read after taking the write lock, so processes opening the
+    same new file at once migrate it only once.
+    """
+    if schema_version(conn) >= len(MIGRATIONS):
+        return schema_version(conn)
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        current = schema_version(conn)
+        if current >= len(MIGRATIONS):  # another process got there first
+            conn.rollback()
+            return current
+        rebuilds = set()
+        for migration in MIGRATIONS[current:]:
+            rebuilds |= migration(conn) or set()
+        for name, module in REBUILDS.items():
+            if name in rebuilds:
+                module.rebuild(conn)
+        conn.execute(f'PRAGMA user_version = {len(MIGRATIONS)}')
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+    return schema_version(conn)
+
+
+# --- Connections ---
+
+def connect(db_path=DB_PATH):
+    """
+    Opens a connection configured for concurrent use: WAL so readers never
+    wait on the writer, synchronous=NORMAL (durable enough with WAL), a busy
+    timeout instead of immediate 'database is locked' errors, a larger prepared
+    statement cache since pooled connections live as long as the process, and
+    foreign keys enforced so deleting an entry cascades to its tasks. New
+    database files are created in incremental auto-vacuum mode (see deletion.py).
+    Statements are timed into metrics.py unless instrumentation is disabled.
+    """
+    factory = metrics.InstrumentedConnection if metrics.ENABLED else sqlite3.Connection
+    conn = sqlite3.connect(db_path,
+                           timeout=BUSY_TIMEOUT_MS / 1000,
+                           cached_statements=STATEMENT_CACHE_SIZE,
+                           check_same_thread=False,
+                           factory=factory)
+    # Only has an effect before the first table is created, and on an existing
+    # file it waits for the write lock, so opening a connection would stall
+    # behind a long write transaction
+    if conn.execute('PRAGMA page_count').fetchone()[0] == 0:
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+    conn.execute('PRAGMA foreign_keys = ON')
+    return conn
+
+
+class ConnectionPool:
+    """Keeps up to `size` idle connections to one database file for reuse."""
+
+    def __init__(self, db_path, size=POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        # Most recently released last. deque's append and pop are atomic and
+        # take no lock: release() can run from a garbage-collected streaming
+        # generator in the middle of acquire() on the same thread, where
+        # queue.Queue's mutex would deadlock.
+        self._idle = deque()
+        self.closed = False
+
+    def acquire(self):
+        try:
+            return self._idle.pop()
+        except IndexError:
+            return connect(self.db_path)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        # A pool evicted while the connection was borrowed doesn't keep it
+        if not self.closed and len(self._idle) < self.size:
+            self._idle.append(conn)
+        else:
+            conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.pop().close()
+            except IndexError:
+                return
+
+    def close(self):
+        """Closes idle connections now and borrowed ones as they are released."""
+        self.closed = True
+        self.close_all()
+
+
+# --- Routing ---
+# Code that doesn't pass a db_path uses the current database: DB_PATH, or
+# the user's shard while a request or job runs under shards.use().
+
+_current_path = contextvars.ContextVar('mindsync_db_path', default=None)
+
+
+def current_path():
+    return _current_path.get() or DB_PATH
+
+
+def set_current_path(db_path):
+    """
+    Routes this thread's (or context's) connections to db_path; None
+    restores DB_PATH. Returns the previous setting.
+    """
+    previous = _current_path.get()
+    _current_path.set(db_path)
+    return previous
+
+
+# Pools by database path, least recently used first
+_pools = OrderedDict()
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path=None):
+    db_path = db_path or current_path()
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = _pools[db_path] = ConnectionPool(db_path)
+            while len(_pools) > MAX_OPEN_POOLS:
+                _pools.popitem(last=False)[1].close()
+        else:
+            _pools.move_to_end(db_path)
+    return pool
+
+
+@contextmanager
+def connection(db_path=None):
+    """Borrows a pooled connection to db_path (default: the current database) for the block."""
+    pool = get_pool(db_path)
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+@contextmanager
+def transaction(db_path=None, immediate=False):
+    """
+    Like connection(), but commits on success and rolls back on error.
+    immediate=True takes the write lock up front (BEGIN IMMEDIATE) for
+    read-then-write sequences that must not interleave with other writers.
+    """
+    with connection(db_path) as conn:
+        if immediate:
+            conn.execute('BEGIN IMMEDIATE')
+        with conn:
+            yield conn
+
+
+def init_db(db_path=None):
+    db_path = db_path or current_path()
+    directory = os.path.dirname(db_path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    with connection(db_path) as conn:
+        migrate(conn)
+
+
+if __name__ == "__main__":
+    init_db()
+    with connection() as conn:
+        print(f"{DB_PATH} is at schema version {schema_version(conn)}")
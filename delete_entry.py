@@ -1,38 +1,86 @@
-import sqlite3
+"""
+Deletes journal entries (and their tasks) without prompting.
+
+Usage:
+  python delete_entry.py 12 15 18              delete entries by id
+  python delete_entry.py --from 2023-01-01 --to 2023-12-31
+  python delete_entry.py --older-than 365      retention: keep the last year
+Add --vacuum and/or --analyze to compact the database afterwards, and
+--dry-run to only count what a date or retention delete would remove.
+--user works on that user's database (see shards.py) instead of the
+single-user one.
+"""
+import argparse
 import os
+import time
+from datetime import date
 
-def delete_entry_and_tasks(entry_id, db_path='database/journal.db'):
-    if not os.path.exists(db_path):
-        print("Database file not found.")
-        return
+from db import init_db, get_pool
+import deletion
+import shards
 
+
+def iso_date(value):
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date (expected YYYY-MM-DD): {value!r}") from None
 
-        # Check if the entry exists
-        cursor.execute("SELECT * FROM entries WHERE id = ?", (entry_id,))
-        entry = cursor.fetchone()
-        if not entry:
-            print(f"No entry found with ID {entry_id}")
-            return
 
-        # Delete associated tasks first
-        cursor.execute("DELETE FROM tasks WHERE entry_id = ?", (entry_id,))
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('entry_ids', nargs='*', type=int, help="ids of the entries to delete")
+    parser.add_argument('--from', dest='start_date', type=iso_date, help="delete entries on or after this date (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='end_date', type=iso_date, help="delete entries on or before this date (YYYY-MM-DD)")
+    parser.add_argument('--older-than', type=int, metavar='DAYS', help="delete entries older than DAYS days")
+    parser.add_argument('--chunk-size', type=int, default=deletion.DELETE_CHUNK_SIZE,
+                        help="entries deleted per transaction")
+    parser.add_argument('--vacuum', action='store_true', help="release freed space afterwards")
+    parser.add_argument('--analyze', action='store_true', help="refresh query planner statistics afterwards")
+    parser.add_argument('--dry-run', action='store_true', help="only count matching entries")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--user', help="delete from this user's database")
+    target.add_argument('--db', help="database file (default: the single-user database)")
+    args = parser.parse_args()
+    try:
+        args.db = args.db or shards.shard_path(args.user)
+    except ValueError as e:
+        parser.error(str(e))
 
-        # Then delete the entry
-        cursor.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+    by_range = args.start_date or args.end_date
+    modes = sum(bool(mode) for mode in (args.entry_ids, by_range, args.older_than is not None))
+    if modes != 1:
+        parser.error("give entry ids, a --from/--to range or --older-than (exactly one)")
+    if args.older_than is not None and args.older_than < 0:
+        parser.error("--older-than must not be negative")
+    if not os.path.exists(args.db):
+        parser.error(f"Database file not found: {args.db}")
+    init_db(args.db)
+
+    if args.older_than is not None:
+        args.start_date, args.end_date = None, deletion.retention_cutoff(args.older_than)
+        print(f"Retention: entries dated {args.end_date} or earlier")
+
+    if args.dry_run:
+        if args.entry_ids:
+            parser.error("--dry-run works with --from/--to or --older-than")
+        print(f"{deletion.count_range(args.start_date, args.end_date, db_path=args.db)} entries would be deleted")
+        return
 
-        conn.commit()
-        print(f"Entry (ID {entry_id}) and its tasks deleted successfully.")
+    start = time.perf_counter()
+    if args.entry_ids:
+        deleted = deletion.delete_ids(args.entry_ids, args.chunk_size, db_path=args.db)
+    else:
+        deleted = deletion.delete_range(args.start_date, args.end_date, args.chunk_size, db_path=args.db)
+    seconds = time.perf_counter() - start
+    print(f"Deleted {deleted} entries and their tasks in {seconds:.2f}s "
+          f"({deleted / seconds if seconds else 0:.0f} entries/s)")
 
-    except sqlite3.Error as e:
-        print("SQLite error:", e)
+    if args.vacuum or args.analyze:
+        for step, seconds in deletion.compact(args.vacuum, args.analyze, db_path=args.db).items():
+            print(f"{step}: {seconds:.2f}s")
+    get_pool(args.db).close_all()
 
-    finally:
-        conn.close()
 
-# Example usage
 if __name__ == "__main__":
-    entry_id_to_delete = int(input("Enter the entry ID to delete: "))
-    delete_entry_and_tasks(entry_id_to_delete)
+    main()
@@ -0,0 +1,122 @@
+"""
+Bulk deletion and retention.
+
+Entries can be removed by id, by date range or by age ("older than N
+days"). Work is split into transactions of at most `chunk_size` entries, so
+the write lock is released between chunks and dashboard reads and new
+submissions are never blocked for the whole job. Tasks are removed by
+ON DELETE CASCADE; the term index is updated by store.delete_entries and
+the FTS table and rollups by triggers.
+
+compact() then gives the space back and refreshes planner statistics.
+"""
+import time
+from datetime import date, timedelta
+
+from db import connection, transaction
+import store
+
+DELETE_CHUNK_SIZE = 1000
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def delete_ids(entry_ids, chunk_size=DELETE_CHUNK_SIZE, db_path=None):
+    """Deletes the given entries; returns how many existed."""
+    entry_ids = [int(entry_id) for entry_id in entry_ids]
+    deleted = 0
+    for chunk in _chunks(entry_ids, chunk_size):
+        with transaction(db_path, immediate=True) as conn:
+            deleted += store.delete_entries(conn, chunk)
+    return deleted
+
+
+def _check_date(value):
+    try:
+        date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid date (expected YYYY-MM-DD): {value!r}") from None
+
+
+def _range_filter(start_date, end_date):
+    clauses, params = [], []
+    for value in (start_date, end_date):
+        if value:
+            _check_date(value)
+    if start_date:
+        clauses.append("date >= ?")
+        params.append(start_date)
+    if end_date:
+        clauses.append("date <= ?")
+        params.append(end_date)
+    if not clauses:
+        raise ValueError("A date range needs a start date, an end date or both")
+    return ' AND '.join(clauses), params
+
+
+def count_range(start_date=None, end_date=None, db_path=None):
+    where, params = _range_filter(start_date, end_date)
+    with connection(db_path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM entries WHERE {where}", params).fetchone()[0]
+
+
+def delete_range(start_date=None, end_date=None, chunk_size=DELETE_CHUNK_SIZE, db_path=None):
+    """
+    Deletes entries dated between start_date and end_date (inclusive, either
+    may be open). Ids are selected chunk by chunk inside each transaction,
+    so the full selection is never held in memory. Returns the count deleted.
+    """
+    where, params = _range_filter(start_date, end_date)
+    deleted = 0
+    while True:
+        with transaction(db_path, immediate=True) as conn:
+            ids = [row[0] for row in conn.execute(f"SELECT id FROM entries WHERE {where} LIMIT ?",
+                                                  params + [chunk_size])]
+            deleted += store.delete_entries(conn, ids)
+        if len(ids) < chunk_size:
+            return deleted
+
+
+def retention_cutoff(days, today=None):
+    """Last date that counts as older than `days` days."""
+    if days < 0:
+        raise ValueError(f"Retention days must not be negative: {days}")
+    return ((today or date.today()) - timedelta(days=days + 1)).isoformat()
+
+
+def delete_older_than(days, chunk_size=DELETE_CHUNK_SIZE, db_path=None):
+    """Retention policy: deletes entries dated more than `days` days ago."""
+    return delete_range(end_date=retention_cutoff(days), chunk_size=chunk_size, db_path=db_path)
+
+
+def compact(vacuum=True, analyze=True, db_path=None):
+    """
+    Post-delete maintenance; returns {step: seconds}.
+
+    vacuum: drops empty rollup buckets, merges the FTS index and returns free
+    pages to the OS. Databases created before incremental auto-vacuum was
+    enabled get one full VACUUM to switch modes; after that only the free
+    pages are released. analyze: refreshes the query planner's statistics.
+    """
+    timings = {}
+    with connection(db_path) as conn:
+        if vacuum:
+            start = time.perf_counter()
+            with conn:
+                conn.execute("DELETE FROM rollups WHERE entry_count = 0 AND task_count = 0")
+                conn.execute("INSERT INTO entries_fts (entries_fts) VALUES ('optimize')")
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                conn.execute("PRAGMA incremental_vacuum").fetchall()
+            else:
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+            timings['vacuum'] = time.perf_counter() - start
+        if analyze:
+            start = time.perf_counter()
+            conn.execute("ANALYZE")
+            conn.commit()
+            timings['analyze'] = time.perf_counter() - start
+    return timings
@@ -0,0 +1,104 @@
+"""
+In-process cache of rendered read-only responses with conditional GET.
+
+Responses are keyed on (database, path, query string, data version,
+today's date); the database is the requesting user's shard (shards.py).
+The data version comes from the trigger-maintained entries_version and
+tasks_version counters, so any write to entries or tasks, from a route, the
+ingest workers or the import CLI, makes older cache keys and ETags stale
+without explicit invalidation. Today's date is part of the key because the
+weekly/monthly views are relative to it.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+
+from flask import request, make_response
+
+from db import connection, current_path
+
+MAX_ENTRIES = 256
+MAX_BYTES = 32 * 1024 * 1024
+
+
+class ResponseCache:
+    """LRU of (body, mimetype) bounded by entry count and total body size."""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item
+
+    def put(self, key, body, mimetype):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._items[key] = (body, mimetype)
+            self._bytes += len(body)
+            while len(self._items) > self.max_entries or self._bytes > self.max_bytes:
+                _, (evicted, _) = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+
+cache = ResponseCache()
+
+
+def data_version():
+    with connection() as conn:
+        rows = conn.execute("SELECT key, value FROM meta WHERE key IN ('entries_version', 'tasks_version')")
+        versions = dict(rows.fetchall())
+    return f"{versions.get('entries_version', 0)}.{versions.get('tasks_version', 0)}"
+
+
+def cached_view(view):
+    """Serves GET views from the cache and answers If-None-Match with 304."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = (current_path(), request.path, request.query_string, data_version(), date.today().isoformat())
+        etag = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:20]
+
+        if etag in request.if_none_match:
+            response = make_response('', 304)
+        else:
+            item = cache.get(key)
+            if item is not None:
+                body, mimetype = item
+                response = make_response(body)
+                response.mimetype = mimetype
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                # Streamed pages keep their ETag but aren't buffered into the cache
+                if not response.is_streamed:
+                    cache.put(key, response.get_data(), response.mimetype)
+
+        response.set_etag(etag)
+        # Browsers may keep the copy but must revalidate it on every load
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
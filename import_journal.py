@@ -0,0 +1,193 @@
+"""
+Bulk import of historical journal entries.
+
+Streams a file of entries, analyzes them in chunks across a process pool and
+writes each chunk (entries, tasks and index rows) with executemany in a
+single transaction. The number of records committed so far is saved with
+every chunk, so an interrupted import resumes where it stopped.
+
+Supported formats (picked from the file extension unless --format is given):
+  numbered  one entry per line, optionally prefixed "1." (testing_task.txt)
+  emotion   "text;label" lines (Datasets/Emotion/*.txt), the label is ignored
+  csv       a header with a `text` column and optional `date` column
+  jsonl     one object per line with `text` (or `journal`) and optional `date`
+
+Usage: python import_journal.py FILE [--format csv] [--chunk-size 500] [--workers 4]
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from db import DB_PATH, init_db, connection, transaction
+import store
+
+NUMBER_PREFIX_RE = re.compile(r'^\s*\d+[.)]\s*')
+
+
+def read_numbered(f):
+    for line in f:
+        text = NUMBER_PREFIX_RE.sub('', line).strip()
+        yield text, None
+
+
+def read_emotion(f):
+    for line in f:
+        line = line.strip()
+        if ';' in line:
+            yield line.rsplit(';', 1)[0].strip(), None
+
+
+def read_csv(f):
+    for row in csv.DictReader(f):
+        yield (row.get('text') or '').strip(), row.get('date') or None
+
+
+def read_jsonl(f):
+    for line in f:
+        if line.strip():
+            record = json.loads(line)
+            yield (record.get('text') or record.get('journal') or '').strip(), record.get('date')
+
+
+READERS = {
+    'numbered': read_numbered,
+    'emotion': read_emotion,
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+}
+
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return 'csv'
+    if ext in ('.jsonl', '.json'):
+        return 'jsonl'
+    with open(path, encoding='utf-8') as f:
+        first = f.readline()
+    return 'emotion' if ';' in first and not NUMBER_PREFIX_RE.match(first) else 'numbered'
+
+
+def read_records(path, fmt, skip=0):
+    """Yields (offset, text, date) for every record after the first `skip`."""
+    with open(path, encoding='utf-8', newline='' if fmt == 'csv' else None) as f:
+        offset = 0
+        for text, date in READERS[fmt](f):
+            if not text:
+                continue
+            offset += 1
+            if offset > skip:
+                yield offset, text, date
+
+
+def chunked(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def analyze_chunk(texts):
+    # Runs in a worker process; the NLP stack is loaded once per worker.
+    from ingest import analyze_entries
+    return analyze_entries(texts)
+
+
+def saved_offset(source, db_path):
+    with connection(db_path) as conn:
+        row = conn.execute("SELECT offset FROM import_progress WHERE source = ?", (source,)).fetchone()
+    return row[0] if row else 0
+
+
+def normalize_date(date, default, offset=None):
+    """ISO date of a record; records without a usable date get `default`."""
+    if not date:
+        return default
+    try:
+        return datetime.fromisoformat(str(date).strip()).date().isoformat()
+    except ValueError:
+        # One bad record must not stop the import, or every resume would
+        # stop on it again
+        print(f"  record {offset}: unparseable date {date!r}, using {default}")
+        return default
+
+
+def iso_date(value):
+    try:
+        return datetime.fromisoformat(value.strip()).date().isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date (expected YYYY-MM-DD): {value!r}") from None
+
+
+def write_chunk(chunk, results, source, default_date, db_path):
+    rows = [(normalize_date(date, default_date, offset), text, mood, productivity, tasks)
+            for (offset, text, date), (mood, productivity, tasks) in zip(chunk, results)]
+    with transaction(db_path, immediate=True) as conn:
+        store.add_entries(conn, rows)
+        conn.execute('''INSERT INTO import_progress (source, offset) VALUES (?, ?)
+                        ON CONFLICT(source) DO UPDATE SET offset = excluded.offset''',
+                     (source, chunk[-1][0]))
+
+
+def import_file(path, fmt=None, chunk_size=500, workers=None, date=None,
+                resume=True, db_path=None):
+    fmt = fmt or detect_format(path)
+    source = os.path.abspath(path)
+    default_date = date or datetime.now().date().isoformat()
+    workers = workers or os.cpu_count() or 1
+
+    init_db(db_path)
+    skip = saved_offset(source, db_path) if resume else 0
+    if skip:
+        print(f"Resuming {path} after record {skip}")
+
+    imported = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Keep a bounded number of chunks in flight so large files stream
+        in_flight = deque()
+        chunks = chunked(read_records(path, fmt, skip), chunk_size)
+        for chunk in chunks:
+            in_flight.append((chunk, executor.submit(analyze_chunk, [text for _, text, _ in chunk])))
+            if len(in_flight) < workers * 2:
+                continue
+            done_chunk, future = in_flight.popleft()
+            write_chunk(done_chunk, future.result(), source, default_date, db_path)
+            imported += len(done_chunk)
+            elapsed = time.perf_counter() - start
+            print(f"  {imported} entries ({imported / elapsed:.0f} entries/s)")
+
+        while in_flight:
+            done_chunk, future = in_flight.popleft()
+            write_chunk(done_chunk, future.result(), source, default_date, db_path)
+            imported += len(done_chunk)
+
+    elapsed = time.perf_counter() - start
+    rate = imported / elapsed if elapsed else 0
+    print(f"Imported {imported} entries from {path} in {elapsed:.1f}s ({rate:.0f} entries/s)")
+    return imported
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import journal entries.")
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=sorted(READERS), help="input format (default: detect)")
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--workers', type=int, help="analysis processes (default: CPU count)")
+    parser.add_argument('--date', type=iso_date, help="YYYY-MM-DD for records without a date (default: today)")
+    parser.add_argument('--restart', action='store_true', help="ignore the saved offset and start over")
+    parser.add_argument('--db', default=DB_PATH)
+    args = parser.parse_args()
+
+    import_file(args.path, fmt=args.format, chunk_size=args.chunk_size, workers=args.workers,
+                date=args.date, resume=not args.restart, db_path=args.db)
@@ -0,0 +1,104 @@
+"""
+Background NLP ingestion. An entry is stored straight away with
+analysis_status='pending'; a small worker pool then runs sentiment,
+productivity scoring and task extraction and back-fills the row, in the
+database (user shard) the entry was submitted to.
+"""
+import atexit
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from db import connection, current_path, transaction
+from nlp.analysis import analyze_text, analyze_many
+from nlp.task_extractor import extract_tasks, extract_tasks_batch
+from scorer import custom_productivity_score, score_many
+import store
+
+INGEST_WORKERS = int(os.environ.get('MINDSYNC_INGEST_WORKERS', 2))
+
+
+def analyze_entry(text):
+    """Runs the full NLP stack on one entry: (mood, productivity, tasks)."""
+    analysis = analyze_text(text)
+    return analysis['mood'], custom_productivity_score(text), extract_tasks(text)
+
+
+def analyze_entries(texts):
+    """Batch form of analyze_entry using each stage's batch API."""
+    moods = [analysis['mood'] for analysis in analyze_many(texts)]
+    return list(zip(moods, score_many(texts), extract_tasks_batch(texts)))
+
+
+class IngestPipeline:
+
+    def __init__(self, workers=INGEST_WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='ingest')
+                atexit.register(self.shutdown)
+            return self._executor
+
+    def submit(self, text):
+        """Persists `text` as a pending entry, queues its analysis and returns the entry id."""
+        # Workers don't see the submitting thread's shard routing
+        db_path = current_path()
+        with transaction(db_path) as conn:
+            entry_id = store.add_pending_entry(conn, text)
+        self._get_executor().submit(self._analyze, db_path, entry_id, text)
+        return entry_id
+
+    def resume(self, db_path=None):
+        """Re-queues entries of one database left pending by a previous process."""
+        db_path = db_path or current_path()
+        with connection(db_path) as conn:
+            rows = conn.execute("SELECT id, text FROM entries WHERE analysis_status = 'pending'").fetchall()
+        for entry_id, text in rows:
+            self._get_executor().submit(self._analyze, db_path, entry_id, text)
+        return len(rows)
+
+    def _analyze(self, db_path, entry_id, text):
+        try:
+            mood, productivity, tasks = analyze_entry(text)
+            with transaction(db_path) as conn:
+                store.record_analysis(conn, entry_id, mood, productivity, tasks)
+        except Exception as e:
+            print(f"Analysis of entry {entry_id} in {db_path} failed: {e}")
+            with transaction(db_path) as conn:
+                store.mark_analysis_failed(conn, entry_id)
+
+    def shutdown(self, wait=True):
+        """Stops accepting work and, by default, drains every queued analysis."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+pipeline = IngestPipeline()
+
+
+def entry_status(entry_id):
+    """Analysis state of one entry for the polling endpoint, or None if it doesn't exist."""
+    with connection() as conn:
+        row = conn.execute("SELECT date, mood, productivity, analysis_status FROM entries WHERE id = ?",
+                           (entry_id,)).fetchone()
+        if row is None:
+            return None
+        tasks = [t[0] for t in conn.execute("SELECT task_text FROM tasks WHERE entry_id = ? ORDER BY id",
+                                            (entry_id,))]
+    date, mood, productivity, status = row
+    return {
+        "entry_id": entry_id,
+        "status": status,
+        "date": date,
+        "mood": mood,
+        "productivity": productivity,
+        "tasks": tasks
+    }
@@ -0,0 +1,129 @@
+"""
+Entry listings with their tasks, newest first.
+
+Pages are cut with a keyset on (date, id) rather than OFFSET, so fetching
+page 1000 costs the same as page 1 (it seeks idx_entries_date_id to the
+cursor). Tasks for a whole page are loaded in one query.
+"""
+import base64
+import binascii
+
+MAX_PAGE_SIZE = 200
+# Entries read per query when streaming a listing
+STREAM_BATCH_SIZE = 200
+
+
+def encode_cursor(date, entry_id):
+    return base64.urlsafe_b64encode(f"{date}|{entry_id}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(date, entry_id) from a cursor returned by list_entries; ValueError if malformed."""
+    try:
+        date, entry_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return date, int(entry_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+
+# Tasks of a page of entries, formatted with the entry id placeholders
+PAGE_TASKS_SQL = '''SELECT entry_id, id, task_text, status, completed_at, canonical_id FROM tasks
+                    WHERE entry_id IN ({placeholders})
+                    ORDER BY entry_id, id'''
+
+
+def _attach_tasks(conn, entries):
+    if not entries:
+        return entries
+    by_id = {entry['id']: entry for entry in entries}
+    placeholders = ','.join('?' * len(by_id))
+    rows = conn.execute(PAGE_TASKS_SQL.format(placeholders=placeholders), list(by_id))
+    for entry_id, task_id, task_text, status, completed_at, canonical_id in rows:
+        by_id[entry_id]['tasks'].append({
+            'id': task_id,
+            'text': task_text,
+            'status': status,
+            'completed': status == 'done',
+            'completed_at': completed_at,
+            'canonical_id': canonical_id
+        })
+    return entries
+
+
+def page_query(clauses, newest_first=True):
+    """SELECT for one page of entries matching all `clauses`, in (date, id) order."""
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    order = 'DESC' if newest_first else 'ASC'
+    return f'''SELECT id, date, text, mood, productivity, analysis_status
+              FROM entries INDEXED BY idx_entries_date_id
+              {where}
+              ORDER BY date {order}, id {order}
+              LIMIT ?'''
+
+
+def _fetch_page(conn, limit, after=None, start_date=None, end_date=None, newest_first=True):
+    clauses, params = [], []
+    if start_date:
+        clauses.append("date >= ?")
+        params.append(start_date)
+    if end_date:
+        clauses.append("date <= ?")
+        params.append(end_date)
+    if after:
+        # Rest of the cursor's day, then the following days: two seeks on
+        # idx_entries_date_id. SQLite bounds a row-value (date, id) < (?, ?)
+        # on date only, which walks the whole day up to the cursor. The day
+        # itself is checked against the range here, so the planner seeks on
+        # (date, id) rather than on the range.
+        op = '<' if newest_first else '>'
+        day = after[0]
+        in_range = (not start_date or day >= start_date) and (not end_date or day <= end_date)
+        ranges = [(["date = ?", f"id {op} ?"], list(after))] if in_range else []
+        ranges.append((clauses + [f"date {op} ?"], params + [day]))
+    else:
+        ranges = [(clauses, params)]
+    rows = []
+    for range_clauses, range_params in ranges:
+        if len(rows) < limit:
+            rows += conn.execute(page_query(range_clauses, newest_first),
+                                 range_params + [limit - len(rows)]).fetchall()
+    entries = [{
+        'id': entry_id,
+        'date': date,
+        'text': text,
+        'mood': mood,
+        'productivity': productivity,
+        'status': status,
+        'tasks': []
+    } for entry_id, date, text, mood, productivity, status in rows]
+    return _attach_tasks(conn, entries)
+
+
+def list_entries(conn, cursor=None, limit=50, start_date=None, end_date=None):
+    """
+    One page of entries (with tasks) and the cursor for the next page, or
+    None when this is the last one.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = decode_cursor(cursor) if cursor else None
+    entries = _fetch_page(conn, limit + 1, after, start_date, end_date)
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = encode_cursor(entries[-1]['date'], entries[-1]['id'])
+    return entries, next_cursor
+
+
+def iter_entries(conn, start_date=None, end_date=None, newest_first=True, batch_size=STREAM_BATCH_SIZE):
+    """
+    Yields every matching entry (newest first unless newest_first=False),
+    reading `batch_size` entries at a time so memory stays bounded however
+    long the history is.
+    """
+    after = None
+    while True:
+        entries = _fetch_page(conn, batch_size, after, start_date, end_date, newest_first)
+        yield from entries
+        if len(entries) < batch_size:
+            return
+        after = (entries[-1]['date'], entries[-1]['id'])
@@ -0,0 +1,223 @@
+"""
+Lightweight latency instrumentation for the app.
+
+Named spans (NLP stages, insights, prompts, template rendering) and every SQL
+statement are recorded into fixed-bucket histograms, exposed in Prometheus
+text format by the /metrics route. Spans taken during a request are also
+summed per request so app.py can report them in a Server-Timing header.
+
+Set MINDSYNC_METRICS=0 to turn instrumentation off entirely; decorated
+functions and connections are then left unwrapped.
+"""
+import bisect
+import cProfile
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+ENABLED = os.environ.get('MINDSYNC_METRICS', '1') != '0'
+
+# Upper bounds in seconds; SQL statements land in the sub-millisecond buckets,
+# NLP stages and page renders in the upper ones.
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+           0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    'mindsync_span_seconds': 'Time spent in instrumented functions.',
+    'mindsync_sql_seconds': 'Time spent executing SQL statements, by statement type.',
+    'mindsync_request_seconds': 'Request latency by endpoint.',
+}
+
+
+class Histogram:
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+_histograms = {}
+_registry_lock = threading.Lock()
+_local = threading.local()
+
+
+def histogram(metric, **labels):
+    key = (metric, tuple(sorted(labels.items())))
+    hist = _histograms.get(key)
+    if hist is None:
+        with _registry_lock:
+            hist = _histograms.setdefault(key, Histogram())
+    return hist
+
+
+def observe(metric, seconds, **labels):
+    histogram(metric, **labels).observe(seconds)
+
+
+def _add_to_request(name, seconds):
+    totals = getattr(_local, 'totals', None)
+    if totals is not None:
+        totals[name] = totals.get(name, 0.0) + seconds
+
+
+@contextmanager
+def span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe('mindsync_span_seconds', elapsed, span=name)
+        _add_to_request(name, elapsed)
+
+
+def timed(name):
+    """Decorator form of span(); a no-op when instrumentation is disabled."""
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def begin_request():
+    _local.totals = {}
+
+
+def end_request():
+    """Per-span totals for the current thread's request, in seconds."""
+    totals = getattr(_local, 'totals', None)
+    _local.totals = None
+    return totals or {}
+
+
+# --- SQL ---
+
+def _statement_type(sql):
+    words = sql.split(None, 1)
+    return words[0].upper() if words else ''
+
+
+def _timed_sql(method):
+    def wrapper(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return method(self, sql, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            observe('mindsync_sql_seconds', elapsed, statement=_statement_type(sql))
+            _add_to_request('sql', elapsed)
+    return wrapper
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    execute = _timed_sql(sqlite3.Cursor.execute)
+    executemany = _timed_sql(sqlite3.Cursor.executemany)
+    executescript = _timed_sql(sqlite3.Cursor.executescript)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    Times statements run through the connection or its cursors. Only the
+    execute call is measured: rows fetched lazily afterwards are not.
+    """
+    execute = _timed_sql(sqlite3.Connection.execute)
+    executemany = _timed_sql(sqlite3.Connection.executemany)
+    executescript = _timed_sql(sqlite3.Connection.executescript)
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+
+# --- Prometheus exposition ---
+
+def _format_labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in items) + '}'
+
+
+def render():
+    """All histograms in the Prometheus text exposition format."""
+    # Other threads may register histograms while this renders
+    with _registry_lock:
+        items = list(_histograms.items())
+    by_metric = {}
+    for (metric, labels), hist in sorted(items):
+        by_metric.setdefault(metric, []).append((labels, hist))
+
+    lines = []
+    for metric, series in by_metric.items():
+        lines.append(f'# HELP {metric} {HELP.get(metric, metric)}')
+        lines.append(f'# TYPE {metric} histogram')
+        for labels, hist in series:
+            counts, total, count = hist.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(hist.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{metric}_bucket{_format_labels(labels, le=repr(bound))} {cumulative}')
+            lines.append(f'{metric}_bucket{_format_labels(labels, le="+Inf")} {count}')
+            lines.append(f'{metric}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{metric}_count{_format_labels(labels)} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+# --- Sampling profiler ---
+
+class RequestProfiler:
+    """
+    Profiles a random sample of requests with cProfile and dumps each one to
+    `<directory>/<timestamp>-<name>.prof` (open with pstats or snakeviz).
+    Only one request is profiled at a time, since cProfile can't be active on
+    several threads at once.
+    """
+
+    def __init__(self):
+        self._busy = threading.Lock()
+
+    def start(self, rate):
+        """Starts profiling with probability `rate`; returns the profile or None."""
+        if rate <= 0 or random.random() >= rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # another profiler is already active
+            self._busy.release()
+            return None
+        return profile
+
+    def stop(self, profile, directory, name):
+        try:
+            profile.disable()
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}.prof")
+            profile.dump_stats(path)
+        finally:
+            self._busy.release()
@@ -1,14 +1,104 @@
-from textblob import TextBlob
-import nltk
-nltk.download('vader_lexicon')
-from nltk.sentiment import SentimentIntensityAnalyzer
+import os
+import threading
 
+from metrics import timed
+
+# Lexicons are read from a local nltk_data folder instead of being downloaded
+# at import time. Populate it once with:
+#   python -m nltk.downloader -d nltk_data vader_lexicon
+NLTK_DATA_DIR = os.environ.get(
+    'MINDSYNC_NLTK_DATA',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nltk_data')
+)
+
+
+class SentimentEngine:
+    """
+    Long-lived sentiment analyzer. TextBlob's pattern lexicon and the VADER
+    lexicon are loaded once and then shared by every request thread.
+    """
+
+    def __init__(self, nltk_data_dir=NLTK_DATA_DIR):
+        self.nltk_data_dir = nltk_data_dir
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._polarity = None
+        self._vader = None
+
+    def load(self):
+        if self._loaded:
+            return self
+        with self._lock:
+            if self._loaded:
+                return self
+
+            import nltk
+            from nltk.sentiment import SentimentIntensityAnalyzer
+            from textblob.sentiments import PatternAnalyzer
+
+            if self.nltk_data_dir not in nltk.data.path:
+                nltk.data.path.insert(0, self.nltk_data_dir)
+
+            polarity = PatternAnalyzer()
+            # The pattern lexicon is parsed lazily on first use, so warm it up
+            # here while we hold the lock instead of racing on the first request.
+            polarity.analyze("warm up")
+
+            try:
+                vader = SentimentIntensityAnalyzer()
+            except LookupError:
+                print(f"VADER lexicon not found under {self.nltk_data_dir}; "
+                      "vader scores will be empty.")
+                vader = None
+
+            self._polarity = polarity
+            self._vader = vader
+            self._loaded = True
+        return self
+
+    def analyze(self, text):
+        self.load()
+        polarity = self._polarity.analyze(text).polarity
+        vader_score = self._vader.polarity_scores(text) if self._vader else None
+
+        mood = 'positive' if polarity > 0.2 else 'negative' if polarity < -0.2 else 'neutral'
+        return {'polarity': polarity, 'vader': vader_score, 'mood': mood}
+
+    def analyze_many(self, texts):
+        self.load()
+        return [self.analyze(text) for text in texts]
+
+    def vader_mood(self, text):
+        """Mood from VADER's compound score alone; None without the lexicon."""
+        self.load()
+        if self._vader is None:
+            return None
+        compound = self._vader.polarity_scores(text)['compound']
+        return 'positive' if compound >= 0.05 else 'negative' if compound <= -0.05 else 'neutral'
+
+
+# Shared by every request handler in the process.
+engine = SentimentEngine()
+
+# Which mood backend labels entries: 'textblob' (the engine above) or
+# 'linear' (the trained model in nlp/mood_model.py).
+MOOD_BACKEND = os.environ.get('MINDSYNC_MOOD_BACKEND', 'textblob')
+
+
+def get_backend(name=None):
+    name = name or MOOD_BACKEND
+    if name == 'textblob':
+        return engine
+    if name == 'linear':
+        from nlp.mood_model import get_model
+        return get_model()
+    raise ValueError(f"Unknown mood backend: {name}")
+
+
+@timed('analyze_text')
 def analyze_text(text):
-    blob = TextBlob(text)
-    polarity = blob.sentiment.polarity
+    return get_backend().analyze(text)
 
-    sia = SentimentIntensityAnalyzer()
-    vader_score = sia.polarity_scores(text)
 
-    mood = 'positive' if polarity > 0.2 else 'negative' if polarity < -0.2 else 'neutral'
-    return {'polarity': polarity, 'vader': vader_score, 'mood': mood}
+def analyze_many(texts):
+    return get_backend().analyze_many(texts)
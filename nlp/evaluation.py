@@ -0,0 +1,280 @@
+"""
+Evaluation of the mood backends on the Emotion dataset.
+
+Splits are read from the converted CSVs (Datasets/Emotion/convert.py) in
+chunks with the csv module; a split without one (val) is converted first.
+Hashed features (nlp.mood_model.batch_features) and the label array of
+each split are cached in a .npz file next to the data and reused until the
+CSV changes.
+
+Backends:
+  textblob - analyze_text with the TextBlob engine, as the app labels moods
+  vader    - VADER's compound score alone (needs the lexicon, see README)
+  linear   - the shipped hashed linear model (models/mood_linear)
+  logreg   - logistic regression fitted on the cached train features
+             (needs scikit-learn and scipy)
+  scorer   - the productivity scorer; not a mood classifier, so it gets a
+             mood x score-band table instead of an accuracy
+Text backends run chunk by chunk on a process pool, timing every sample.
+Each backend reports accuracy, a confusion matrix and p50/p95/p99 latency.
+
+Usage: python -m nlp.evaluation [--split test] [--backends textblob linear] [--workers 4] [--json out.json]
+"""
+import argparse
+import csv
+import json
+import os
+import runpy
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from nlp.mood_model import N_FEATURES, ROOT, batch_features
+
+DATA_DIR = os.path.join(ROOT, 'Datasets', 'Emotion')
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+MOODS = ('negative', 'neutral', 'positive')
+CHUNK_SIZE = 1000
+
+# Productivity score bands used for the scorer's table
+SCORE_BANDS = ('low', 'medium', 'high')
+SCORE_BAND_LIMITS = (0.15, 0.25)
+
+BACKENDS = ('textblob', 'vader', 'linear', 'logreg', 'scorer')
+
+
+def split_path(split):
+    """The split's converted CSV, written from {split}.txt by convert.py if missing."""
+    path = os.path.join(DATA_DIR, f'{split}_converted.csv')
+    if not os.path.exists(path):
+        convert = runpy.run_path(os.path.join(DATA_DIR, 'convert.py'))['convert']
+        convert(split, DATA_DIR)
+    return path
+
+
+def iter_chunks(path, chunk_size=CHUNK_SIZE):
+    """Yields (texts, moods) lists of up to chunk_size rows from a text,mood CSV."""
+    with open(path, encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # header
+        texts, moods = [], []
+        for text, mood in reader:
+            texts.append(text)
+            moods.append(mood)
+            if len(texts) == chunk_size:
+                yield texts, moods
+                texts, moods = [], []
+        if texts:
+            yield texts, moods
+
+
+def read_split(split):
+    texts, moods = [], []
+    for chunk_texts, chunk_moods in iter_chunks(split_path(split)):
+        texts.extend(chunk_texts)
+        moods.extend(chunk_moods)
+    return texts, moods
+
+
+# --- Feature cache ---
+
+def _source_key(path):
+    stat = os.stat(path)
+    return np.array([stat.st_size, stat.st_mtime_ns, N_FEATURES], dtype=np.int64)
+
+
+def load_features(path, cache_dir=CACHE_DIR):
+    """
+    Hashed features of a text,mood CSV as (n_docs, docs, ids, values,
+    labels), with labels as indexes into MOODS. Built chunk by chunk on the
+    first call and read back from {cache_dir}/{file name}.npz afterwards.
+    """
+    key = _source_key(path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    cache_path = os.path.join(cache_dir, f'{name}.npz')
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            if np.array_equal(cached['key'], key):
+                return (len(cached['labels']), cached['docs'].astype(np.int64), cached['ids'].astype(np.int64),
+                        cached['values'], cached['labels'])
+
+    docs, ids, values, labels = [], [], [], []
+    n_docs = 0
+    for texts, moods in iter_chunks(path):
+        chunk_docs, chunk_ids, chunk_values = batch_features(texts)
+        docs.append(chunk_docs + n_docs)
+        ids.append(chunk_ids)
+        values.append(chunk_values)
+        labels.extend(MOODS.index(mood) for mood in moods)
+        n_docs += len(texts)
+    docs, ids, values = np.concatenate(docs), np.concatenate(ids), np.concatenate(values)
+    labels = np.array(labels, dtype=np.int8)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Doc indexes and hashed ids both fit in 32 bits
+    np.savez(cache_path, key=key, docs=docs.astype(np.uint32), ids=ids.astype(np.uint32),
+             values=values, labels=labels)
+    return n_docs, docs, ids, values, labels
+
+
+# --- Backends ---
+
+def _score_band(score):
+    for band, limit in zip(SCORE_BANDS, SCORE_BAND_LIMITS):
+        if score < limit:
+            return band
+    return SCORE_BANDS[-1]
+
+
+def _load_backend(name):
+    """A function text -> label for one of the text backends."""
+    if name == 'textblob':
+        from nlp.analysis import engine
+        engine.load()
+        return lambda text: engine.analyze(text)['mood']
+    if name == 'vader':
+        from nlp.analysis import engine
+        if engine.load().vader_mood('warm up') is None:
+            raise LookupError("VADER lexicon not installed")
+        return engine.vader_mood
+    if name == 'linear':
+        from nlp.mood_model import get_model
+        model = get_model()
+        return lambda text: model.analyze(text)['mood']
+    if name == 'scorer':
+        from scorer import get_scorer
+        scorer = get_scorer()
+        return lambda text: _score_band(scorer.score(text))
+    raise ValueError(f"Unknown backend: {name}")
+
+
+# Backends loaded in this (worker) process
+_loaded = {}
+
+
+def run_chunk(name, texts):
+    """Labels texts one at a time; returns (labels, per-sample seconds)."""
+    predict = _loaded.get(name)
+    if predict is None:
+        predict = _loaded[name] = _load_backend(name)
+    labels, seconds = [], []
+    for text in texts:
+        start = time.perf_counter()
+        labels.append(predict(text))
+        seconds.append(time.perf_counter() - start)
+    return labels, seconds
+
+
+def run_logreg(split, train_split='train', C=4.0):
+    """
+    Fits logistic regression on the cached train features and labels the
+    split from its cached features. Latency is per single-row prediction.
+    """
+    from scipy.sparse import csr_matrix
+    from sklearn.linear_model import LogisticRegression
+
+    train = load_features(split_path(train_split))
+    # Columns only for features seen in training; lbfgs on all 2**20 hashed
+    # columns is several times slower for the same model
+    seen = np.unique(train[2])
+
+    def matrix(features):
+        n_docs, docs, ids, values, labels = features
+        cols = np.searchsorted(seen, ids)
+        known = (cols < len(seen)) & (seen[np.minimum(cols, len(seen) - 1)] == ids)
+        return csr_matrix((values[known], (docs[known], cols[known])), shape=(n_docs, len(seen))), labels
+
+    X_train, y_train = matrix(train)
+    X, _ = matrix(load_features(split_path(split)))
+    clf = LogisticRegression(C=C, max_iter=1000).fit(X_train, y_train)
+
+    labels = [MOODS[i] for i in clf.predict(X)]
+    seconds = []
+    for i in range(X.shape[0]):
+        start = time.perf_counter()
+        clf.predict(X[i])
+        seconds.append(time.perf_counter() - start)
+    return labels, seconds
+
+
+# --- Report ---
+
+def summarize(labels, truth, seconds):
+    classes = MOODS if set(labels) <= set(MOODS) else SCORE_BANDS
+    confusion = {mood: {label: 0 for label in classes} for mood in MOODS}
+    for label, mood in zip(labels, truth):
+        confusion[mood][label] += 1
+    ms = np.array(seconds) * 1000
+    result = {
+        'samples': len(labels),
+        'confusion': confusion,
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+    }
+    if classes is MOODS:
+        result['accuracy'] = sum(label == mood for label, mood in zip(labels, truth)) / len(truth)
+    return result
+
+
+def evaluate(split='test', backends=BACKENDS, workers=None, chunk_size=CHUNK_SIZE):
+    """{backend: summary} for the split; backends that cannot load get {'skipped': reason}."""
+    texts, truth = read_split(split)
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for name in backends:
+            if name == 'logreg':
+                futures[name] = [pool.submit(run_logreg, split)]
+            else:
+                futures[name] = [pool.submit(run_chunk, name, chunk) for chunk in chunks]
+        for name, parts in futures.items():
+            labels, seconds = [], []
+            try:
+                for part in parts:
+                    part_labels, part_seconds = part.result()
+                    labels.extend(part_labels)
+                    seconds.extend(part_seconds)
+            except (ImportError, LookupError, OSError) as e:
+                results[name] = {'skipped': str(e)}
+                continue
+            results[name] = summarize(labels, truth, seconds)
+    return results
+
+
+def print_report(results):
+    for name, result in results.items():
+        if 'skipped' in result:
+            print(f"{name}: skipped ({result['skipped']})")
+            continue
+        accuracy = f"accuracy {result['accuracy']:.4f}" if 'accuracy' in result else "no accuracy (score bands)"
+        print(f"{name}: {accuracy}, latency p50 {result['p50_ms']:.3f} ms, "
+              f"p95 {result['p95_ms']:.3f} ms, p99 {result['p99_ms']:.3f} ms")
+        labels = list(next(iter(result['confusion'].values())))
+        print(f"  {'true / predicted':>18} " + ' '.join(f'{label:>9}' for label in labels))
+        for mood, row in result['confusion'].items():
+            print(f"  {mood:>18} " + ' '.join(f'{row[label]:>9}' for label in labels))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--split', default='test')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument('--workers', type=int, default=None, help="processes (default: one per CPU)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = evaluate(args.split, args.backends, args.workers, args.chunk_size)
+    print(f"{args.split}: evaluated in {time.perf_counter() - start:.1f}s")
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
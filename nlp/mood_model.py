@@ -0,0 +1,206 @@
+"""
+Fast linear mood classifier, an alternative to the TextBlob/VADER backend.
+
+Text is turned into hashed unigram + bigram features (L2-normalized counts),
+and a multinomial logistic regression trained offline on the Emotion dataset
+scores them. Only the weight rows of features seen in training are stored,
+as plain .npy files that are memory-mapped at load time, so inference is a
+vectorized NumPy gather + sum over a whole batch.
+
+Train (needs scikit-learn and scipy):
+    python -m nlp.mood_model train
+Compare with the current backend on test_converted.csv:
+    python -m nlp.mood_model report
+"""
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+from nlp.tokens import word_tokens
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.environ.get('MINDSYNC_MOOD_MODEL', os.path.join(ROOT, 'models', 'mood_linear'))
+TRAIN_PATH = os.path.join(ROOT, 'Datasets', 'Emotion', 'train_converted.csv')
+TEST_PATH = os.path.join(ROOT, 'Datasets', 'Emotion', 'test_converted.csv')
+
+N_FEATURES = 2 ** 20
+
+
+@lru_cache(maxsize=200000)
+def feature_id(token):
+    return zlib.crc32(token.encode('utf-8')) & (N_FEATURES - 1)
+
+
+def text_features(text):
+    """Hashed unigram and bigram features of one text: {feature id: weight}."""
+    words = list(word_tokens(text))
+    tokens = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    counts = {}
+    for token in tokens:
+        fid = feature_id(token)
+        counts[fid] = counts.get(fid, 0) + 1
+    norm = sum(c * c for c in counts.values()) ** 0.5 or 1.0
+    return {fid: c / norm for fid, c in counts.items()}
+
+
+def batch_features(texts):
+    """Flattened features for a batch: (doc index, feature id, value) arrays."""
+    docs, ids, values = [], [], []
+    for i, text in enumerate(texts):
+        features = text_features(text)
+        docs.extend([i] * len(features))
+        ids.extend(features.keys())
+        values.extend(features.values())
+    return (np.array(docs, dtype=np.int64),
+            np.array(ids, dtype=np.int64),
+            np.array(values, dtype=np.float32))
+
+
+def read_labeled(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        rows = [(row['text'], row['mood']) for row in csv.DictReader(f)]
+    return [r[0] for r in rows], [r[1] for r in rows]
+
+
+class LinearMoodModel:
+
+    def __init__(self, feature_ids, weights, bias, classes):
+        self.feature_ids = feature_ids    # sorted, one per stored weight row
+        self.weights = weights            # (len(feature_ids), n_classes)
+        self.bias = bias                  # (n_classes,)
+        self.classes = classes
+
+    @classmethod
+    def load(cls, model_dir=MODEL_DIR):
+        with open(os.path.join(model_dir, 'classes.json'), encoding='utf-8') as f:
+            classes = json.load(f)
+        return cls(np.load(os.path.join(model_dir, 'feature_ids.npy'), mmap_mode='r'),
+                   np.load(os.path.join(model_dir, 'weights.npy'), mmap_mode='r'),
+                   np.load(os.path.join(model_dir, 'bias.npy')),
+                   classes)
+
+    def save(self, model_dir=MODEL_DIR):
+        os.makedirs(model_dir, exist_ok=True)
+        np.save(os.path.join(model_dir, 'feature_ids.npy'), self.feature_ids)
+        np.save(os.path.join(model_dir, 'weights.npy'), self.weights)
+        np.save(os.path.join(model_dir, 'bias.npy'), self.bias)
+        with open(os.path.join(model_dir, 'classes.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.classes, f)
+
+    def predict_proba(self, texts):
+        docs, ids, values = batch_features(texts)
+        rows = np.searchsorted(self.feature_ids, ids)
+        rows[rows == len(self.feature_ids)] = 0
+        known = self.feature_ids[rows] == ids
+
+        scores = np.zeros((len(texts), len(self.classes)), dtype=np.float32)
+        np.add.at(scores, docs[known], self.weights[rows[known]] * values[known, None])
+        scores += self.bias
+        scores -= scores.max(axis=1, keepdims=True)
+        probs = np.exp(scores)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    def predict(self, texts):
+        return [self.classes[i] for i in self.predict_proba(texts).argmax(axis=1)]
+
+    # Same interface as nlp.analysis.SentimentEngine
+    def analyze_many(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        probs = self.predict_proba(texts)
+        return [{'polarity': None, 'vader': None,
+                 'mood': self.classes[row.argmax()], 'confidence': float(row.max())}
+                for row in probs]
+
+    def analyze(self, text):
+        return self.analyze_many([text])[0]
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model(model_dir=MODEL_DIR):
+    """The shared model, loaded on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = LinearMoodModel.load(model_dir)
+    return _model
+
+
+def train(train_path=TRAIN_PATH, model_dir=MODEL_DIR, C=4.0):
+    from scipy.sparse import csr_matrix
+    from sklearn.linear_model import LogisticRegression
+
+    from nlp.evaluation import MOODS, load_features
+
+    # Features come from the evaluation cache, so retraining skips hashing
+    n_docs, docs, ids, values, label_ids = load_features(train_path)
+    labels = np.array(MOODS)[label_ids]
+    X = csr_matrix((values, (docs, ids)), shape=(n_docs, N_FEATURES))
+
+    start = time.perf_counter()
+    clf = LogisticRegression(C=C, max_iter=1000)
+    clf.fit(X, labels)
+    print(f"Trained on {n_docs} texts in {time.perf_counter() - start:.1f}s")
+
+    # Keep only the rows of features that occurred in training
+    seen = np.unique(ids)
+    coef = clf.coef_
+    if coef.shape[0] == 1:  # binary problems store a single row
+        coef = np.vstack([-coef, coef])
+        intercept = np.array([-clf.intercept_[0], clf.intercept_[0]])
+    else:
+        intercept = clf.intercept_
+    model = LinearMoodModel(seen.astype(np.int64),
+                            np.ascontiguousarray(coef[:, seen].T, dtype=np.float32),
+                            intercept.astype(np.float32),
+                            [str(c) for c in clf.classes_])
+    model.save(model_dir)
+    print(f"Saved {len(seen)} weight rows to {model_dir}")
+    return model
+
+
+def report(test_path=TEST_PATH, model_dir=MODEL_DIR):
+    from nlp.analysis import SentimentEngine
+
+    texts, labels = read_labeled(test_path)
+    backends = {
+        'textblob': SentimentEngine().load(),
+        'linear': LinearMoodModel.load(model_dir),
+    }
+    for name, backend in backends.items():
+        start = time.perf_counter()
+        per_text = [backend.analyze(text)['mood'] for text in texts]
+        single_ms = (time.perf_counter() - start) * 1000 / len(texts)
+
+        start = time.perf_counter()
+        batch = [r['mood'] for r in backend.analyze_many(texts)]
+        batch_ms = (time.perf_counter() - start) * 1000 / len(texts)
+
+        assert batch == per_text
+        accuracy = sum(p == y for p, y in zip(batch, labels)) / len(labels)
+        print(f"{name:>8}: accuracy {accuracy:.4f}  "
+              f"{single_ms:.4f} ms/text single, {batch_ms:.4f} ms/text batched")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train or evaluate the linear mood model.")
+    parser.add_argument('command', choices=['train', 'report'])
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    args = parser.parse_args()
+
+    if args.command == 'train':
+        train(model_dir=args.model_dir)
+    else:
+        report(model_dir=args.model_dir)
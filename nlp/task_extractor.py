@@ -1,15 +1,60 @@
 import re
+from collections import namedtuple
 
+from metrics import timed
+
+# One compiled pattern covering both trigger styles, so each text is scanned
+# once and a task is never reported twice by overlapping patterns.
+#   intent: "need to call mom", "planning to fix the car"
+#   todo:   "todo: buy milk", "to-do - book tickets"
+TASK_RE = re.compile(
+    r"\b(?:"
+    r"(?P<intent>need to|have to|must|should|want to|planning to|plan to|aim to|try to)\s+"
+    r"|(?P<todo>to[- ]do|todo)[^\w]*"
+    r")"
+    r"(?P<task>.*?)(?:[.!\n]|$)",
+    re.IGNORECASE
+)
+
+TaskSpan = namedtuple('TaskSpan', ['text', 'start', 'end', 'trigger', 'kind'])
+
+
+def extract_task_spans(text):
+    """
+    Returns a TaskSpan for each task in `text`: the task text, its character
+    span in `text`, the trigger phrase that introduced it and the trigger kind
+    ('intent' or 'todo'). Repeated tasks (ignoring case) are reported once.
+    """
+    spans = []
+    seen = set()
+    for match in TASK_RE.finditer(text):
+        raw = match.group('task')
+        task = raw.strip().rstrip('.!')
+        if not task:
+            continue
+        key = task.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+
+        start = match.start('task') + (len(raw) - len(raw.lstrip()))
+        kind = 'intent' if match.group('intent') else 'todo'
+        trigger = match.group(kind).lower()
+        spans.append(TaskSpan(task, start, start + len(task), trigger, kind))
+    return spans
+
+
+@timed('extract_tasks')
 def extract_tasks(text):
-    task_patterns = [
-        r"\b(?:need to|have to|must|should|want to|planning to|plan to|aim to|try to)\s+(.*?)(?:[.!\n]|$)",
-        r"\b(?:to[- ]do|todo)[^\w]*(.*?)(?:[.!\n]|$)"
-    ]
-    tasks = []
-    for pattern in task_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        for match in matches:
-            task = match.strip().rstrip('.!')
-            if task:
-                tasks.append(task)
-    return tasks
+    return [span.text for span in extract_task_spans(text)]
+
+
+@timed('extract_tasks_batch')
+def extract_tasks_batch(texts, spans=False):
+    """
+    Extracts tasks for many texts; returns one list per text (TaskSpans if
+    spans=True). Timed as one span, not one per text.
+    """
+    if spans:
+        return [extract_task_spans(text) for text in texts]
+    return [[span.text for span in extract_task_spans(text)] for text in texts]
@@ -0,0 +1,65 @@
+"""
+Text normalization and tokenization shared by the term index, prompts,
+the productivity scorer and the linear mood model.
+
+There are two tokenizations, kept as they were so stored postings and the
+trained mood model stay valid:
+  entry_tokens - punctuation stripped, lowercased, split on whitespace;
+                 what term_postings and entry_bigrams are built from
+  word_tokens  - lowercased \\w+ runs; what scoring and mood features use
+Both are memoized on the text in bounded LRU caches, so an entry that is
+scored, labeled and then indexed during ingestion is tokenized once per form.
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# Words too common to be useful as topics.
+STOP_WORDS = frozenset([
+    'a', 'about', 'am', 'an', 'and', 'are', 'as', 'at', 'be', 'been',
+    'being', 'but', 'by', 'can', 'did', 'do', 'does', 'doing', 'don',
+    'for', 'from', 'had', 'has', 'have', 'having', 'he', 'her', 'him',
+    'his', 'i', 'if', 'in', 'is', 'it', 'its', 'just', 'me', 'my', 'myself',
+    'now', 'of', 'off', 'on', 'or', 'our', 'ours', 's', 'she', 'should',
+    'so', 't', 'that', 'the', 'their', 'them', 'then', 'these', 'they',
+    'this', 'those', 'to', 'too', 'was', 'we', 'were', 'what', 'which',
+    'who', 'whom', 'will', 'with', 'you', 'your', 'yours'
+])
+
+PUNCTUATION_RE = re.compile(r'[^\w\s]')
+WORD_RE = re.compile(r'\w+')
+
+# Texts whose tokens are kept; ingestion only needs the few entries in flight
+TOKEN_CACHE_SIZE = 4096
+
+# words: every word; terms: words minus stop words; bigrams: adjacent word
+# pairs ("a b"), stop words included
+EntryTokens = namedtuple('EntryTokens', 'words terms bigrams')
+
+
+def bigrams(words):
+    return [f"{words[i]} {words[i + 1]}" for i in range(len(words) - 1)]
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def entry_tokens(text):
+    """Index tokens of `text`. Returns tuples; callers must not modify them."""
+    words = tuple(PUNCTUATION_RE.sub('', text).lower().split())
+    return EntryTokens(words,
+                       tuple(word for word in words if word not in STOP_WORDS),
+                       tuple(bigrams(words)))
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def word_tokens(text):
+    """Lowercased \\w+ runs of `text`, as a tuple."""
+    return tuple(WORD_RE.findall(text.lower()))
+
+
+def normalize(text):
+    """All words of `text`, lowercased and without punctuation."""
+    return list(entry_tokens(text).words)
+
+
+def tokenize(text):
+    return list(entry_tokens(text).terms)
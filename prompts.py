@@ -1,114 +1,78 @@
-import sqlite3
-import re
-from collections import Counter, defaultdict
 import random
 import math
+import threading
+from collections import OrderedDict
+from db import MAX_OPEN_POOLS, connection, current_path
+from metrics import timed
+from search import topic_stats
+from nlp import tokens
 
-# A more comprehensive list of words to ignore for better topic detection.
-STOP_WORDS = [
-    'a', 'about', 'am', 'an', 'and', 'are', 'as', 'at', 'be', 'been', 'being', 'but', 
-    'by', 'can', 'did', 'do', 'does', 'doing', 'don', 'for', 'from', 'had', 'has', 
-    'have', 'having', 'he', 'her', 'him', 'his', 'i', 'if', 'in', 'is', 'it', 'its', 
-    'just', 'me', 'my', 'myself', 'now', 'of', 'off', 'on', 'or', 'our', 'ours', 
-    's', 'she', 'should', 'so', 't', 'that', 'the', 'their', 'them', 'then', 
-    'these', 'they', 'this', 'those', 'to', 'too', 'was', 'we', 'were', 'what', 
-    'which', 'who', 'whom', 'will', 'with', 'you', 'your', 'yours', 'it', 'was',
-    'today', 'yesterday', 'tomorrow'
-]
-
-def find_phrases(text, phrase_length=2):
-    # This helper function remains the same.
-    words = text.split()
-    if len(words) < phrase_length: return []
-    return [' '.join(words[i:i+phrase_length]) for i in range(len(words) - phrase_length + 1)]
-
-def get_top_tf_idf_phrases(docs):
-    # Helper to find important phrases using TF-IDF
-    tf_scores = []
-    for doc in docs:
-        doc_tf = Counter(find_phrases(doc, 2))
-        for phrase, count in doc_tf.items():
-            doc_tf[phrase] = count / len(doc.split())
-        tf_scores.append(doc_tf)
+# The index stop words, plus day words that make poor prompt topics.
+STOP_WORDS = tokens.STOP_WORDS | {'today', 'yesterday', 'tomorrow'}
 
-    doc_count = len(docs)
-    phrase_doc_counts = Counter()
-    all_phrases = set(p for doc_tf in tf_scores for p in doc_tf)
-    
-    for phrase in all_phrases:
-        for doc_tf in tf_scores:
-            if phrase in doc_tf:
-                phrase_doc_counts[phrase] += 1
+ENCOURAGING_THOUGHTS = [
+    "What is one small thing you can do today that your future self will thank you for?",
+    "Think of a challenge you overcame. What strength did you discover in yourself?",
+    "What's a simple pleasure you are grateful for today?",
+    "Today is a new opportunity to move closer to your goals.",
+    "Celebrate your progress, no matter how small it may seem.",
+    "What is one thing you are genuinely curious about right now?",
+    "Describe a small moment today that made you smile.",
+    "What is one positive change, no matter how minor, you could make tomorrow?",
+    "If you had an extra hour today, how would you spend it to recharge?",
+    "What's one thing you're looking forward to in the coming week?",
+    "Who is someone you could reach out to today to share a positive thought?",
+    "What's a skill you have that you are proud of?",
+    "Reflect on a past success. What key lesson can you apply to a current challenge?"
+]
 
-    idf_scores = {phrase: math.log(doc_count / (1 + count)) for phrase, count in phrase_doc_counts.items()}
-    
-    tfidf_scores = Counter()
-    for i, doc_tf in enumerate(tf_scores):
-        for phrase, tf in doc_tf.items():
-            tfidf_scores[phrase] += tf * idf_scores[phrase]
-            
-    return [phrase for phrase, score in tfidf_scores.most_common(5)]
+RECENT_ENTRIES = 30
 
-def generate_prompt():
+def get_top_tf_idf_phrases(conn, entry_ids, limit=5):
     """
-    Generates a highly varied, intelligent, and positive prompt using a refined multi-layered analysis.
+    Most important two-word phrases across `entry_ids` by TF-IDF, read from the
+    entry_bigrams index.
     """
-    conn = sqlite3.connect('database/journal.db')
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT text, mood FROM entries ORDER BY id DESC LIMIT 30")
-    recent_entries = cursor.fetchall()
-    
-    encouraging_thoughts = [
-        "What is one small thing you can do today that your future self will thank you for?",
-        "Think of a challenge you overcame. What strength did you discover in yourself?",
-        "What's a simple pleasure you are grateful for today?",
-        "Today is a new opportunity to move closer to your goals.",
-        "Celebrate your progress, no matter how small it may seem.",
-        "What is one thing you are genuinely curious about right now?",
-        "Describe a small moment today that made you smile.",
-        "What is one positive change, no matter how minor, you could make tomorrow?",
-        "If you had an extra hour today, how would you spend it to recharge?",
-        "What's one thing you're looking forward to in the coming week?",
-        "Who is someone you could reach out to today to share a positive thought?",
-        "What's a skill you have that you are proud of?",
-        "Reflect on a past success. What key lesson can you apply to a current challenge?"
-    ]
+    placeholders = ','.join('?' * len(entry_ids))
+    rows = conn.execute(f'''SELECT b.phrase, SUM(CAST(b.count AS REAL) / e.token_count), COUNT(*)
+                            FROM entry_bigrams b JOIN entries e ON e.id = b.entry_id
+                            WHERE b.entry_id IN ({placeholders})
+                            GROUP BY b.phrase''', entry_ids).fetchall()
 
-    if not recent_entries:
-        conn.close()
-        return random.choice(encouraging_thoughts)
+    doc_count = len(entry_ids)
+    scored = [(tf_sum * math.log(doc_count / (1 + df)), phrase) for phrase, tf_sum, df in rows]
+    scored.sort(key=lambda row: row[0], reverse=True)
+    return [phrase for _, phrase in scored[:limit]]
 
-    possible_prompts = list(encouraging_thoughts)
-    all_docs = [re.sub(r'[^\w\s]', '', entry[0]).lower() for entry in recent_entries]
+def build_candidate_pool(conn):
+    """
+    Runs the multi-layered analysis over the recent entries once and returns
+    (prompts, latest-entry topics) for generate_prompt to pick from.
+    """
+    entry_ids = [row[0] for row in conn.execute("SELECT id FROM entries ORDER BY id DESC LIMIT ?",
+                                                (RECENT_ENTRIES,))]
+    possible_prompts = list(ENCOURAGING_THOUGHTS)
+    latest_topics = []
 
     # --- LAYER 1: Immediate reaction to the latest entry's main topic ---
-    if len(all_docs) > 1:
-        latest_entry_doc = all_docs[0]
-        historical_docs = all_docs[1:]
-        
-        # Find phrases in the latest entry that are rare in older entries
-        latest_phrases = set(p for p in find_phrases(latest_entry_doc, 2) if not any(w in STOP_WORDS for w in p.split()))
-        historical_phrases = set(p for doc in historical_docs for p in find_phrases(doc, 2))
-        
-        unique_latest_phrases = latest_phrases - historical_phrases
-        if unique_latest_phrases:
-            topic = random.choice(list(unique_latest_phrases))
-            possible_prompts.append(f"In your last entry, you mentioned '{topic}'. Could you explore that thought a bit more?")
+    if len(entry_ids) > 1:
+        # Find phrases in the latest entry that don't appear in older entries
+        placeholders = ','.join('?' * (len(entry_ids) - 1))
+        rows = conn.execute(f'''SELECT phrase FROM entry_bigrams
+                                WHERE entry_id = ? AND phrase NOT IN (
+                                    SELECT phrase FROM entry_bigrams WHERE entry_id IN ({placeholders}))''',
+                            entry_ids).fetchall()
+        latest_topics = [phrase for (phrase,) in rows
+                         if not any(w in STOP_WORDS for w in phrase.split())]
 
     # --- LAYER 2: Analyze historical trends with better topic filtering ---
-    if len(recent_entries) > 2:
-        top_historical_phrases = get_top_tf_idf_phrases(all_docs)
-        
-        for topic in top_historical_phrases:
+    if len(entry_ids) > 2:
+        for topic in get_top_tf_idf_phrases(conn, entry_ids):
             word1, word2 = topic.split()
             if word1 in STOP_WORDS and word2 in STOP_WORDS: continue
 
-            topic_entries = [entry for entry in recent_entries if topic in entry[0].lower()]
-            if len(topic_entries) < 2: continue
-
-            mood_map = {'positive': 1, 'neutral': 0, 'negative': -1}
-            avg_mood = sum(mood_map.get(entry[1], 0) for entry in topic_entries) / len(topic_entries)
+            mention_count, avg_mood, _ = topic_stats(conn, topic, entry_ids=entry_ids, phrase=True)
+            if mention_count < 2: continue
 
             if avg_mood > 0.2:
                 prompt = f"The topic of '{topic}' seems to be a source of positivity for you. How can you cultivate more of that?"
@@ -116,9 +80,40 @@ def generate_prompt():
                 prompt = f"Regarding '{topic}', which has been on your mind, what's one positive outcome you'd like to work towards?"
             else:
                 prompt = f"'{topic}' has been a consistent theme. What is your next intended step regarding this?"
-            
+
             possible_prompts.append(prompt)
 
-    conn.close()
-    return random.choice(possible_prompts)
+    return possible_prompts, latest_topics
+
+# The candidate pool is rebuilt only when the journal changes: it is keyed on
+# the latest entry id plus the trigger-maintained entries_version counter.
+# One pool per database (user shard), for the most recently used ones.
+_pool_cache = OrderedDict()
+_pool_lock = threading.Lock()
 
+def get_candidate_pool():
+    db_path = current_path()
+    with connection(db_path) as conn:
+        key = conn.execute('''SELECT (SELECT MAX(id) FROM entries),
+                                     (SELECT value FROM meta WHERE key = 'entries_version')''').fetchone()
+        with _pool_lock:
+            cached = _pool_cache.get(db_path)
+            if cached is None or cached[0] != key:
+                cached = _pool_cache[db_path] = (key, build_candidate_pool(conn))
+                if len(_pool_cache) > MAX_OPEN_POOLS:
+                    _pool_cache.popitem(last=False)
+            _pool_cache.move_to_end(db_path)
+            return cached[1]
+
+@timed('generate_prompt')
+def generate_prompt():
+    """
+    Generates a highly varied, intelligent, and positive prompt using a refined multi-layered analysis.
+    """
+    possible_prompts, latest_topics = get_candidate_pool()
+    if latest_topics:
+        topic = random.choice(latest_topics)
+        possible_prompts = possible_prompts + [
+            f"In your last entry, you mentioned '{topic}'. Could you explore that thought a bit more?"
+        ]
+    return random.choice(possible_prompts)
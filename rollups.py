@@ -0,0 +1,111 @@
+"""
+Materialized daily / weekly / monthly rollups behind the mood & productivity
+charts. The rollups table is kept current by triggers on `entries` and `tasks`
+(created by the schema migrations in db.py), so every insert, delete, re-score
+and task completion updates it in the same transaction. Entries only count
+once they have a mood.
+
+Run `python rollups.py` to compare the stored rollups with a fresh computation
+from the raw tables, or `python rollups.py --rebuild` to replace them.
+"""
+import argparse
+
+# Bucket of entries whose date doesn't parse; left out of the charts
+UNKNOWN_BUCKET = 'unknown'
+
+# SQL producing each period's bucket label from a date expression; the
+# triggers use the same expressions
+BUCKETS = {
+    'daily': f"IFNULL(date({{date}}), '{UNKNOWN_BUCKET}')",
+    'weekly': f"IFNULL(strftime('%Y-W%W', {{date}}), '{UNKNOWN_BUCKET}')",
+    'monthly': f"IFNULL(strftime('%Y-%m', {{date}}), '{UNKNOWN_BUCKET}')",
+}
+
+COLUMNS = ('entry_count', 'productivity_sum', 'mood_sum', 'task_count', 'tasks_completed')
+
+
+def _mood_score(row):
+    return f"(CASE {row}.mood WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END)"
+
+
+def compute(conn):
+    """Rollups recomputed from the raw entries and tasks: {(period, bucket): [COLUMNS...]}."""
+    expected = {}
+    for period, bucket in BUCKETS.items():
+        rows = conn.execute(f'''SELECT {bucket.format(date='date')}, COUNT(*),
+                                       SUM(IFNULL(productivity, 0)), SUM({_mood_score('entries')})
+                                FROM entries WHERE mood IS NOT NULL
+                                GROUP BY 1''').fetchall()
+        for label, count, prod_sum, mood_sum in rows:
+            expected[(period, label)] = [count, prod_sum, mood_sum, 0, 0]
+
+        rows = conn.execute(f'''SELECT {bucket.format(date='e.date')}, COUNT(*), SUM(t.status = 'done')
+                                FROM tasks t JOIN entries e ON e.id = t.entry_id
+                                GROUP BY 1''').fetchall()
+        for label, task_count, completed in rows:
+            values = expected.setdefault((period, label), [0, 0.0, 0, 0, 0])
+            values[3:] = [task_count, completed]
+    return expected
+
+
+def stored(conn):
+    rows = conn.execute(f"SELECT period, bucket, {', '.join(COLUMNS)} FROM rollups").fetchall()
+    # Buckets whose entries were all deleted linger as zero rows; they are not differences.
+    return {(row[0], row[1]): list(row[2:]) for row in rows if any(abs(v) > 1e-9 for v in row[2:])}
+
+
+def diff(conn, tolerance=1e-6):
+    """Returns [(period, bucket, stored values, expected values)] for every mismatching bucket."""
+    expected = compute(conn)
+    actual = stored(conn)
+    mismatches = []
+    for key in sorted(set(expected) | set(actual)):
+        want = expected.get(key, [0] * len(COLUMNS))
+        have = actual.get(key, [0] * len(COLUMNS))
+        if any(abs(a - b) > tolerance for a, b in zip(have, want)):
+            mismatches.append((key[0], key[1], have, want))
+    return mismatches
+
+
+def rebuild(conn):
+    conn.execute("DELETE FROM rollups")
+    conn.executemany(f"INSERT INTO rollups (period, bucket, {', '.join(COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     [(period, bucket, *values) for (period, bucket), values in compute(conn).items()])
+
+
+CHART_SQL = '''SELECT bucket, productivity_sum / entry_count, mood_sum / entry_count
+               FROM rollups
+               WHERE period = ? AND entry_count > 0 AND bucket != ?
+               ORDER BY bucket DESC
+               LIMIT ?'''
+
+
+def chart_rows(conn, period, limit):
+    """(label, avg productivity, avg mood) for the latest `limit` buckets, newest first."""
+    return conn.execute(CHART_SQL, (period, UNKNOWN_BUCKET, limit)).fetchall()
+
+
+def task_rows(conn, period, limit):
+    """(label, task count, tasks completed) for the latest `limit` buckets with tasks, newest first."""
+    return conn.execute('''SELECT bucket, task_count, tasks_completed
+                           FROM rollups
+                           WHERE period = ? AND task_count > 0 AND bucket != ?
+                           ORDER BY bucket DESC
+                           LIMIT ?''', (period, UNKNOWN_BUCKET, limit)).fetchall()
+
+
+if __name__ == "__main__":
+    from db import transaction
+
+    parser = argparse.ArgumentParser(description="Check or rebuild the chart rollup tables.")
+    parser.add_argument('--rebuild', action='store_true', help="replace rollups with a fresh computation")
+    args = parser.parse_args()
+
+    with transaction() as conn:
+        mismatches = diff(conn)
+        for period, bucket, have, want in mismatches:
+            print(f"{period:>7} {bucket}: stored {have} expected {want}")
+        print(f"{len(mismatches)} mismatching bucket(s)")
+        if args.rebuild:
+            rebuild(conn)
+            print("Rollups rebuilt.")
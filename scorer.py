@@ -1,18 +1,75 @@
+import ast
+import os
 import re
+import threading
 
+from metrics import timed
+from nlp.tokens import word_tokens
+
+KEYWORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'Datasets', 'productivity', 'productivity.csv')
+
+
+def load_keywords(path=KEYWORDS_PATH):
+    """
+    Reads the productivity lexicon. The file holds either a Python-style list
+    literal (the shipped productivity.csv) or plain comma/newline separated words.
+    """
+    with open(path, encoding='utf-8') as f:
+        content = f.read()
+    try:
+        words = ast.literal_eval(content)
+    except (ValueError, SyntaxError):
+        words = re.split(r'[,\n]', content)
+    return frozenset(w.strip().strip('\'"').lower() for w in words if w.strip())
+
+
+class ProductivityScorer:
+    """
+    Scores text against a keyword lexicon compiled once into a set. Each text
+    is tokenized once (nlp.tokens.word_tokens, shared with the mood model) and
+    every token is checked against the set, so keywords only match whole
+    words ('completed' no longer also counts as 'complete').
+    """
+
+    def __init__(self, keywords):
+        self.keywords = frozenset(keywords)
+
+    def score(self, text):
+        words = word_tokens(text)
+        word_count = len(words)
+        if word_count == 0:
+            return 0.0
+        keywords = self.keywords
+        keyword_count = sum(1 for word in words if word in keywords)
+        keyword_density = keyword_count / word_count
+        length_bonus = min(word_count / 100, 0.3)
+        score = min(keyword_density + length_bonus, 1.0)
+        return round(score, 3)
+
+    def score_many(self, texts):
+        score = self.score
+        return [score(text) for text in texts]
+
+
+_default_scorer = None
+_scorer_lock = threading.Lock()
+
+
+def get_scorer():
+    """The shared scorer; the lexicon is read on first use."""
+    global _default_scorer
+    if _default_scorer is None:
+        with _scorer_lock:
+            if _default_scorer is None:
+                _default_scorer = ProductivityScorer(load_keywords())
+    return _default_scorer
+
+
+@timed('custom_productivity_score')
 def custom_productivity_score(text):
-    text = text.lower()
-    productivity_keywords = [
-        'complete', 'completed', 'finished', 'done', 'achieved', 'accomplished', 'organized',
-        'planned', 'worked', 'progress', 'improve', 'improved', 'fixed', 'solved', 'resolved',
-        'created', 'built', 'started', 'developed', 'designed', 'reviewed', 'prepared', 'submitted'
-    ]
-    keyword_count = sum(text.count(word) for word in productivity_keywords)
-    words = re.findall(r'\w+', text)
-    word_count = len(words)
-    if word_count == 0:
-        return 0.0
-    keyword_density = keyword_count / word_count
-    length_bonus = min(word_count / 100, 0.3)
-    score = min(keyword_density + length_bonus, 1.0)
-    return round(score, 3)
+    return get_scorer().score(text)
+
+
+def score_many(texts):
+    return get_scorer().score_many(texts)
@@ -0,0 +1,85 @@
+"""
+Full-text search over journal entries, backed by the entries_fts FTS5 table
+(porter-stemmed, kept in sync with `entries` by triggers).
+"""
+from db import MOOD_SCORE_SQL
+from nlp.tokens import WORD_RE
+
+
+def match_query(text, phrase=False):
+    """
+    Turns user input into a safe FTS5 MATCH expression: every word is quoted,
+    so punctuation or FTS operators in the input can't cause syntax errors.
+    Words are ANDed together, or matched as one phrase if phrase=True.
+    """
+    words = WORD_RE.findall(text)
+    if not words:
+        return None
+    if phrase:
+        return '"' + ' '.join(words) + '"'
+    return ' '.join(f'"{word}"' for word in words)
+
+
+def _filters(start_date=None, end_date=None, mood=None):
+    clauses, params = [], []
+    if start_date:
+        clauses.append("e.date >= ?")
+        params.append(start_date)
+    if end_date:
+        clauses.append("e.date <= ?")
+        params.append(end_date)
+    if mood:
+        clauses.append("e.mood = ?")
+        params.append(mood)
+    return ''.join(f" AND {c}" for c in clauses), params
+
+
+def search_entries(conn, query, start_date=None, end_date=None, mood=None, page=1, per_page=20):
+    """
+    Entries matching `query`, best bm25 match first, with a highlighted
+    snippet ([matched words] in brackets). Returns (results, total matches).
+    """
+    expression = match_query(query)
+    if expression is None:
+        return [], 0
+    extra, params = _filters(start_date, end_date, mood)
+
+    total = conn.execute(f'''SELECT COUNT(*) FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid
+                             WHERE entries_fts MATCH ?{extra}''', [expression] + params).fetchone()[0]
+    rows = conn.execute(f'''SELECT e.id, e.date, e.mood, e.productivity,
+                                   snippet(entries_fts, 0, '[', ']', '...', 16), bm25(entries_fts)
+                            FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid
+                            WHERE entries_fts MATCH ?{extra}
+                            ORDER BY bm25(entries_fts)
+                            LIMIT ? OFFSET ?''',
+                        [expression] + params + [per_page, (page - 1) * per_page]).fetchall()
+    results = [{
+        'entry_id': entry_id,
+        'date': date,
+        'mood': mood,
+        'productivity': productivity,
+        'snippet': snippet,
+        'score': -rank  # bm25() is lower-is-better; flip it so higher means more relevant
+    } for entry_id, date, mood, productivity, snippet, rank in rows]
+    return results, total
+
+
+def topic_stats(conn, topic, start_date=None, entry_ids=None, phrase=False):
+    """
+    (matching entries, average mood score, average productivity) for entries
+    mentioning `topic`, optionally limited to entries on/after `start_date`
+    (a SQL date expression) or to a list of entry ids.
+    """
+    expression = match_query(topic, phrase=phrase)
+    if expression is None:
+        return 0, None, None
+    sql = f'''SELECT COUNT(*), AVG({MOOD_SCORE_SQL}), AVG(productivity)
+              FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid
+              WHERE entries_fts MATCH ?'''
+    params = [expression]
+    if start_date:
+        sql += f" AND e.date >= {start_date}"
+    if entry_ids is not None:
+        sql += f" AND e.id IN ({','.join('?' * len(entry_ids))})"
+        params += list(entry_ids)
+    return conn.execute(sql, params).fetchone()
@@ -0,0 +1,109 @@
+"""
+Per-user databases. Every user's journal is its own SQLite file under
+SHARD_DIR, so each user has their own write lock: a user importing or
+deleting thousands of entries never makes another user's submission wait.
+Requests without a user keep using the single-user database (db.DB_PATH).
+
+use(user_id) routes every db.connection()/db.transaction() call made
+without an explicit path, in the current thread, to that user's file,
+migrating it on first use. Shards are only created by create(), so a
+request naming an unknown user can't add files to SHARD_DIR. Pools of
+recently used shards stay open, up to db.MAX_OPEN_POOLS.
+
+Run `python shards.py` to list the shards, `python shards.py --create alice`
+to add a user, or `python shards.py --migrate` to bring every shard to the
+latest schema version.
+"""
+import argparse
+import glob
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+import db
+
+SHARD_DIR = os.environ.get('MINDSYNC_SHARD_DIR', os.path.join('database', 'users'))
+# User ids become file names
+USER_ID_RE = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+# Shard files already migrated by this process
+_ready = set()
+_ready_lock = threading.Lock()
+
+
+def shard_path(user_id):
+    """Database file of a user; None is the single-user database."""
+    if user_id is None:
+        return db.DB_PATH
+    if not USER_ID_RE.fullmatch(user_id):
+        raise ValueError(f"Invalid user id: {user_id!r}")
+    return os.path.join(SHARD_DIR, f'{user_id}.db')
+
+
+def ensure(db_path):
+    """Creates and migrates a shard the first time this process uses it."""
+    if db_path not in _ready:
+        with _ready_lock:
+            if db_path not in _ready:
+                db.init_db(db_path)
+                _ready.add(db_path)
+    return db_path
+
+
+def create(user_id):
+    """Creates (or migrates) a user's shard; returns its path."""
+    return ensure(shard_path(user_id))
+
+
+def existing(user_id):
+    """Path of a user's shard, migrated; LookupError if the user has none."""
+    db_path = shard_path(user_id)
+    if user_id is not None and db_path not in _ready and not os.path.exists(db_path):
+        raise LookupError(f"Unknown user: {user_id}")
+    return ensure(db_path)
+
+
+def route(user_id):
+    """Sends this thread's database calls to the user's shard; returns its path."""
+    db_path = existing(user_id)
+    db.set_current_path(db_path)
+    return db_path
+
+
+@contextmanager
+def use(user_id):
+    """route() for the duration of the block."""
+    db_path = existing(user_id)
+    previous = db.set_current_path(db_path)
+    try:
+        yield db_path
+    finally:
+        db.set_current_path(previous)
+
+
+def all_paths():
+    """The single-user database, if it exists, and every user shard."""
+    paths = [db.DB_PATH] if os.path.exists(db.DB_PATH) else []
+    return paths + sorted(glob.glob(os.path.join(SHARD_DIR, '*.db')))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List the user shards.")
+    parser.add_argument('--create', metavar='USER', action='append', default=[], help="add a user's shard")
+    parser.add_argument('--migrate', action='store_true', help="upgrade every shard's schema")
+    args = parser.parse_args()
+
+    for user_id in args.create:
+        try:
+            create(user_id)
+        except ValueError as e:
+            parser.error(str(e))
+
+    for path in all_paths():
+        if args.migrate:
+            db.init_db(path)
+        with db.connection(path) as conn:
+            version = db.schema_version(conn)
+            entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] if version else 0
+        print(f"{path}: schema version {version}, {entries} entries")
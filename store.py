@@ -0,0 +1,87 @@
+"""
+Write path for journal entries. Every insert and delete goes through here so
+the derived tables (term index, ...) stay in step with `entries` inside the
+caller's transaction.
+"""
+from datetime import date as date_type, datetime
+
+import db
+import task_index
+import term_index
+
+
+def _check_date(date):
+    """ISO date of an entry; ValueError for anything date() would not read as one."""
+    try:
+        return date_type.fromisoformat(date).isoformat()
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid entry date (expected YYYY-MM-DD): {date!r}") from None
+
+
+def add_entry(conn, text, mood, productivity, tasks, date=None, status='done'):
+    date = datetime.now().date().isoformat() if date is None else _check_date(date)
+
+    c = conn.cursor()
+    c.execute("INSERT INTO entries (date, text, mood, productivity, analysis_status) VALUES (?, ?, ?, ?, ?)",
+              (date, text, mood, productivity, status))
+    entry_id = c.lastrowid
+    task_index.add_tasks(conn, [(entry_id, task) for task in tasks])
+    term_index.index_entry(conn, entry_id, text)
+    return entry_id
+
+
+def add_entries(conn, rows):
+    """
+    Bulk version of add_entry for (date, text, mood, productivity, tasks) rows,
+    written with executemany. Ids are assigned here, so the caller must hold
+    the write lock (db.transaction(immediate=True)). Returns the new ids.
+    """
+    last_id = conn.execute('''SELECT MAX(IFNULL((SELECT MAX(id) FROM entries), 0),
+                                     IFNULL((SELECT seq FROM sqlite_sequence WHERE name = 'entries'), 0))''').fetchone()[0]
+    entry_ids = list(range(last_id + 1, last_id + 1 + len(rows)))
+
+    conn.executemany('''INSERT INTO entries (id, date, text, mood, productivity, analysis_status)
+                        VALUES (?, ?, ?, ?, ?, 'done')''',
+                     [(entry_id, _check_date(date), text, mood, productivity)
+                      for entry_id, (date, text, mood, productivity, _) in zip(entry_ids, rows)])
+    task_index.add_tasks(conn, [(entry_id, task) for entry_id, row in zip(entry_ids, rows) for task in row[4]])
+    term_index.index_entries(conn, [(entry_id, row[1]) for entry_id, row in zip(entry_ids, rows)])
+    return entry_ids
+
+
+def add_pending_entry(conn, text, date=None):
+    """Stores an entry before NLP analysis has run; see ingest.py."""
+    return add_entry(conn, text, None, None, [], date=date, status='pending')
+
+
+def record_analysis(conn, entry_id, mood, productivity, tasks):
+    """
+    Back-fills the analysis of a pending entry. Returns False without writing
+    anything if the entry was deleted or already analyzed in the meantime.
+    """
+    c = conn.execute("""UPDATE entries SET mood = ?, productivity = ?, analysis_status = 'done'
+                        WHERE id = ? AND analysis_status != 'done'""",
+                     (mood, productivity, entry_id))
+    if c.rowcount == 0:
+        return False
+    task_index.add_tasks(conn, [(entry_id, task) for task in tasks])
+    return True
+
+
+def mark_analysis_failed(conn, entry_id):
+    conn.execute("UPDATE entries SET analysis_status = 'failed' WHERE id = ?", (entry_id,))
+
+
+def delete_entries(conn, entry_ids):
+    """
+    Deletes entries along with their index postings; their tasks go with
+    them through ON DELETE CASCADE. Returns the number of entries deleted.
+    For large selections use deletion.py, which also bounds transaction size.
+    """
+    entry_ids = [int(entry_id) for entry_id in entry_ids]
+    deleted = 0
+    for batch, placeholders in db.in_batches(entry_ids):
+        term_index.unindex_entries(conn, batch)
+        task_index.unindex_entries(conn, batch)
+        deleted += conn.execute(f"DELETE FROM entries WHERE id IN ({placeholders})", batch).rowcount
+    return deleted
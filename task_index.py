@@ -0,0 +1,266 @@
+"""
+Task similarity index. The same intent written on several days ("finish
+testing the backup feature", "Finish testing backup feature!") is stored
+once per entry, but only the first open occurrence is shown: later ones
+point at it through tasks.canonical_id.
+
+Tasks are compared on character 3-shingles of their normalized text
+(lowercased, no punctuation or stop words). Every canonical task's MinHash
+signature is split into BANDS bands of ROWS values, and each band's hash
+is stored in task_lsh. A new task is only compared with the open canonical
+tasks sharing at least one band hash with it (locality-sensitive hashing),
+so the cost of a lookup does not grow with the number of tasks; candidates
+are then checked with their exact Jaccard similarity, those sharing the
+most bands first.
+
+Links are fuzzy, so status changes only follow them for exact repeats:
+completing a task also completes the open duplicates with the same
+normalized text (exact_duplicates), and the others are handed to a new
+canonical task (detach_completed). Reopened tasks are matched again
+(relink).
+
+Run `python task_index.py` for statistics, or `python task_index.py
+--rebuild` to recompute every link and band (backfill for existing data).
+"""
+import argparse
+import random
+import zlib
+from collections import Counter
+
+import db
+from nlp.tokens import entry_tokens
+
+BANDS = 10
+ROWS = 3
+# Shingle-set Jaccard similarity from which two tasks count as the same
+SIMILARITY = 0.8
+
+# MinHash permutations h -> (a * h + b) mod _PRIME, fixed so stored band
+# hashes stay valid across processes
+_PRIME = (1 << 31) - 1
+_rng = random.Random(20240501)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(BANDS * ROWS)]
+
+
+
+def normalized(text):
+    """Lowercased task text without punctuation or stop words."""
+    words, terms, _ = entry_tokens(text or '')
+    return ' '.join(terms or words)
+
+
+def shingles(text):
+    """Character 3-shingles of the task's normalized text."""
+    norm = normalized(text)
+    if len(norm) <= 3:
+        return frozenset([norm])
+    return frozenset(norm[i:i + 3] for i in range(len(norm) - 2))
+
+
+def signatures(shingle_sets):
+    """MinHash signatures of several shingle sets, as a (sets, BANDS * ROWS) array."""
+    import numpy as np  # only needed once tasks are written
+
+    hashes = np.array([zlib.crc32(s.encode('utf-8')) for shingle_set in shingle_sets for s in shingle_set],
+                      dtype=np.uint64) % _PRIME
+    starts = np.cumsum([0] + [len(shingle_set) for shingle_set in shingle_sets[:-1]])
+    a, b = np.array(_PERMUTATIONS, dtype=np.uint64).T
+    # a * h + b stays below 2**63 for a prime below 2**31
+    permuted = (a[:, None] * hashes[None, :] + b[:, None]) % _PRIME
+    return np.minimum.reduceat(permuted, starts, axis=1).T
+
+
+def band_keys(shingle_sets):
+    """(band, hash) pairs of each shingle set's MinHash signature."""
+    return [[(band, zlib.crc32(sig[band * ROWS:(band + 1) * ROWS].tobytes())) for band in range(BANDS)]
+            for sig in signatures(shingle_sets)]
+
+
+def jaccard(a, b):
+    common = len(a & b)
+    return common / (len(a) + len(b) - common) if a or b else 1.0
+
+
+# Open canonical tasks stored under a band's hashes, formatted with the hash
+# placeholders. CROSS JOIN keeps task_lsh as the outer loop, searched by its
+# primary key.
+CANDIDATES_SQL = '''SELECT l.hash, l.task_id
+                    FROM task_lsh l CROSS JOIN tasks t ON t.id = l.task_id
+                    WHERE l.band = ? AND l.hash IN ({placeholders})
+                      AND t.status = 'pending' AND t.canonical_id IS NULL'''
+
+
+def _open_candidates(conn, keys):
+    """{(band, hash): {task id}} of open canonical tasks stored under any of `keys`."""
+    hashes_by_band = {}
+    for band, hash_ in keys:
+        hashes_by_band.setdefault(band, []).append(hash_)
+    found = {}
+    for band, hashes in hashes_by_band.items():
+        for batch, placeholders in db.in_batches(hashes):
+            rows = conn.execute(CANDIDATES_SQL.format(placeholders=placeholders), [band, *batch])
+            for hash_, task_id in rows:
+                found.setdefault((band, hash_), set()).add(task_id)
+    return found
+
+
+def _link(conn, texts, store_task):
+    """
+    Finds the canonical task of each text, in order, and calls
+    store_task(i, canonical id or None), which returns the id of the i-th
+    task. Texts without a match become canonical and are indexed, so later
+    texts in the same call can match them. Returns the task ids.
+    """
+    shingle_sets = [shingles(text) for text in texts]
+    keys = band_keys(shingle_sets)
+    candidates = _open_candidates(conn, {key for task_keys in keys for key in task_keys})
+    candidate_ids = set().union(*candidates.values()) if candidates else set()
+    known = {}
+    for batch, placeholders in db.in_batches(candidate_ids):
+        for task_id, text in conn.execute(f"SELECT id, task_text FROM tasks WHERE id IN ({placeholders})", batch):
+            known[task_id] = shingles(text)
+
+    task_ids, lsh_rows = [], []
+    for i, (shingle_set, task_keys) in enumerate(zip(shingle_sets, keys)):
+        shared = Counter(candidate for key in task_keys for candidate in candidates.get(key, ()))
+        # Candidates sharing the most bands are the likeliest matches: take
+        # the first one (oldest on ties) that is similar enough
+        best = next((candidate for candidate, _ in sorted(shared.items(), key=lambda item: (-item[1], item[0]))
+                     if jaccard(shingle_set, known[candidate]) >= SIMILARITY), None)
+        task_id = store_task(i, best)
+        if best is None:
+            known[task_id] = shingle_set
+            for key in task_keys:
+                candidates.setdefault(key, set()).add(task_id)
+                lsh_rows.append((key[0], key[1], task_id))
+        task_ids.append(task_id)
+    conn.executemany("INSERT INTO task_lsh (band, hash, task_id) VALUES (?, ?, ?)", lsh_rows)
+    return task_ids
+
+
+def add_tasks(conn, rows):
+    """Inserts (entry_id, task_text) rows, linking duplicates of open tasks. Returns the new ids."""
+    rows = list(rows)
+    if not rows:
+        return []
+
+    def insert(i, canonical_id):
+        entry_id, text = rows[i]
+        return conn.execute("INSERT INTO tasks (entry_id, task_text, canonical_id) VALUES (?, ?, ?)",
+                            (entry_id, text, canonical_id)).lastrowid
+
+    return _link(conn, [text for _, text in rows], insert)
+
+
+def _promote(conn, successors):
+    """For (old canonical id, new canonical id) pairs: the new one takes over the open group and its band hashes."""
+    for old_id, new_id in successors:
+        conn.execute("UPDATE tasks SET canonical_id = NULL WHERE id = ?", (new_id,))
+        conn.execute("UPDATE tasks SET canonical_id = ? WHERE canonical_id = ? AND status = 'pending'",
+                     (new_id, old_id))
+        conn.execute("UPDATE task_lsh SET task_id = ? WHERE task_id = ?", (new_id, old_id))
+
+
+def unindex_entries(conn, entry_ids):
+    """
+    Called before entries (and so their tasks) are deleted: open duplicates
+    of a canonical task that is going away are re-linked to the oldest
+    surviving open one, which takes over its band hashes.
+    """
+    placeholders = ','.join('?' * len(entry_ids))
+    _promote(conn, conn.execute(f'''SELECT d.canonical_id, MIN(d.id) FROM tasks d
+                                     WHERE d.canonical_id IN (SELECT id FROM tasks WHERE entry_id IN ({placeholders}))
+                                       AND d.entry_id NOT IN ({placeholders}) AND d.status = 'pending'
+                                     GROUP BY d.canonical_id''', list(entry_ids) * 2).fetchall())
+
+
+def exact_duplicates(conn, task_ids):
+    """Ids of open tasks linked to one of `task_ids` with exactly the same normalized text."""
+    placeholders = ','.join('?' * len(task_ids))
+    rows = conn.execute(f'''SELECT d.id, d.task_text, c.task_text
+                            FROM tasks d JOIN tasks c ON c.id = d.canonical_id
+                            WHERE d.canonical_id IN ({placeholders}) AND d.status = 'pending' ''', task_ids)
+    return [task_id for task_id, text, canonical_text in rows if normalized(text) == normalized(canonical_text)]
+
+
+def detach_completed(conn, task_ids):
+    """
+    Called after tasks are completed: the oldest open duplicate of each
+    becomes the canonical task of the ones still open.
+    """
+    placeholders = ','.join('?' * len(task_ids))
+    _promote(conn, conn.execute(f'''SELECT canonical_id, MIN(id) FROM tasks
+                                     WHERE canonical_id IN ({placeholders}) AND status = 'pending'
+                                     GROUP BY canonical_id''', task_ids).fetchall())
+
+
+def relink(conn, task_ids):
+    """
+    Called after tasks are reopened: each one is matched again, joining an
+    open task it duplicates or becoming canonical (and indexed) itself.
+    """
+    placeholders = ','.join('?' * len(task_ids))
+    rows = conn.execute(f"SELECT id, task_text FROM tasks WHERE id IN ({placeholders}) ORDER BY id",
+                        task_ids).fetchall()
+    if not rows:
+        return
+    conn.execute(f"DELETE FROM task_lsh WHERE task_id IN ({placeholders})", task_ids)
+    conn.execute(f"UPDATE tasks SET canonical_id = NULL WHERE id IN ({placeholders})", task_ids)
+    links = []
+
+    def link(i, canonical_id):
+        if canonical_id is not None:
+            links.append((canonical_id, rows[i][0]))
+        return rows[i][0]
+
+    _link(conn, [text for _, text in rows], link)
+    conn.executemany("UPDATE tasks SET canonical_id = ? WHERE id = ?", links)
+
+
+def rebuild(conn, chunk_size=5000):
+    """
+    Recomputes every link: open tasks are matched in id order, so the
+    oldest of each group becomes its canonical task. Completed tasks stay
+    canonical. Returns (open tasks, duplicates linked).
+    """
+    conn.execute("DELETE FROM task_lsh")
+    conn.execute("UPDATE tasks SET canonical_id = NULL WHERE canonical_id IS NOT NULL")
+    last_id, total, linked = 0, 0, 0
+    while True:
+        rows = conn.execute('''SELECT id, task_text FROM tasks
+                               WHERE status = 'pending' AND id > ?
+                               ORDER BY id LIMIT ?''', (last_id, chunk_size)).fetchall()
+        if not rows:
+            return total, linked
+        links = []
+
+        def link(i, canonical_id):
+            if canonical_id is not None:
+                links.append((canonical_id, rows[i][0]))
+            return rows[i][0]
+
+        _link(conn, [text for _, text in rows], link)
+        conn.executemany("UPDATE tasks SET canonical_id = ? WHERE id = ?", links)
+        last_id = rows[-1][0]
+        total += len(rows)
+        linked += len(links)
+
+
+def stats(conn):
+    return conn.execute('''SELECT COUNT(*), SUM(canonical_id IS NULL), SUM(canonical_id IS NOT NULL)
+                           FROM tasks WHERE status = 'pending' ''').fetchone()
+
+
+if __name__ == "__main__":
+    from db import transaction
+
+    parser = argparse.ArgumentParser(description="Show or rebuild the task similarity index.")
+    parser.add_argument('--rebuild', action='store_true', help="re-link every open task (backfill)")
+    args = parser.parse_args()
+
+    with transaction() as conn:
+        if args.rebuild:
+            total, linked = rebuild(conn)
+            print(f"Matched {total} open tasks, {linked} linked as duplicates.")
+        pending, canonical, duplicates = stats(conn)
+        print(f"{pending} open tasks: {canonical or 0} distinct, {duplicates or 0} duplicates")
@@ -0,0 +1,87 @@
+"""
+Task lifecycle. A task is 'pending' or 'done'; completed_at holds when it
+was completed (NULL while pending). Status changes go through set_status,
+which updates any number of tasks in the caller's transaction; the rollups
+and the tasks_version counter follow through triggers.
+
+Aggregates are read from idx_tasks_status (status, completed_at) or from
+the rollups table, never by scanning tasks.
+"""
+from datetime import datetime, timedelta
+
+import db
+import rollups
+import task_index
+
+PENDING = 'pending'
+DONE = 'done'
+STATUSES = (PENDING, DONE)
+
+
+def set_status(conn, task_ids, status, at=None):
+    """
+    Moves tasks to `status`; completing records `at` (default now) as the
+    completion time, reopening clears it. Tasks already in that status are
+    left alone. Completing also completes open duplicates with the same
+    normalized text (see task_index.py); other near-duplicates stay open.
+    Returns how many tasks changed.
+    """
+    if status not in STATUSES:
+        raise ValueError(f"Invalid task status: {status!r}")
+    task_ids = [int(task_id) for task_id in task_ids]
+    completed_at = (at or datetime.now()).isoformat(sep=' ', timespec='seconds') if status == DONE else None
+    changed = 0
+    for batch, _ in db.in_batches(task_ids):
+        if status == DONE:
+            batch = batch + task_index.exact_duplicates(conn, batch)
+        # Duplicates can make the batch longer than one IN list
+        for batch, placeholders in db.in_batches(batch):
+            ids = [row[0] for row in conn.execute(f"SELECT id FROM tasks WHERE id IN ({placeholders}) AND status != ?",
+                                                  [*batch, status])]
+            if not ids:
+                continue
+            placeholders = ','.join('?' * len(ids))
+            conn.execute(f"UPDATE tasks SET status = ?, completed_at = ? WHERE id IN ({placeholders})",
+                         [status, completed_at, *ids])
+            if status == DONE:
+                task_index.detach_completed(conn, ids)
+            else:
+                task_index.relink(conn, ids)
+            changed += len(ids)
+    return changed
+
+
+def complete(conn, task_ids, at=None):
+    return set_status(conn, task_ids, DONE, at)
+
+
+def reopen(conn, task_ids):
+    return set_status(conn, task_ids, PENDING)
+
+
+def pending_count(conn):
+    """Open tasks, counting each group of duplicates once."""
+    return conn.execute("SELECT COUNT(*) FROM tasks WHERE canonical_id IS NULL AND status = 'pending'").fetchone()[0]
+
+
+COMPLETIONS_BY_DAY_SQL = '''SELECT substr(completed_at, 1, 10), COUNT(*)
+                            FROM tasks
+                            WHERE status = 'done' AND completed_at >= ?
+                            GROUP BY 1
+                            ORDER BY 1 DESC'''
+
+
+def completions_by_day(conn, days=30, today=None):
+    """(day, tasks completed that day) for the last `days` days with completions, newest first."""
+    since = ((today or datetime.now().date()) - timedelta(days=days - 1)).isoformat()
+    return conn.execute(COMPLETIONS_BY_DAY_SQL, (since,)).fetchall()
+
+
+def completion_rates(conn, period, limit):
+    """
+    (bucket, tasks, completed, completion rate) for the latest `limit`
+    daily/weekly/monthly buckets of task creation (their entry's date), from
+    the rollups table.
+    """
+    return [(bucket, task_count, completed, round(completed / task_count, 3))
+            for bucket, task_count, completed in rollups.task_rows(conn, period, limit)]
@@ -0,0 +1,62 @@
+from collections import Counter
+
+from nlp.tokens import entry_tokens
+
+
+# --- Inverted index ---
+# term_postings holds one row per (term, entry) with the term's count in that
+# entry; term_stats keeps the document frequency and summed term frequency of
+# every term across the whole journal. entry_bigrams holds every two-word
+# phrase (stop words included) per entry for the prompt generator. All are
+# updated in the same transaction as the entry insert/delete, so they never
+# need rebuilding.
+
+def index_entry(conn, entry_id, text):
+    index_entries(conn, [(entry_id, text)])
+
+
+def index_entries(conn, entries):
+    """Indexes (entry_id, text) pairs with one batched statement per table."""
+    word_counts = []
+    postings = []
+    phrase_postings = []
+    stats = Counter()
+    doc_freqs = Counter()
+    for entry_id, text in entries:
+        all_words, words, phrases = entry_tokens(text)
+        counts = Counter(words)
+        word_counts.append((len(words), len(all_words), entry_id))
+        for term, count in counts.items():
+            postings.append((term, entry_id, count))
+            stats[term] += count / len(words)
+            doc_freqs[term] += 1
+        for phrase, count in Counter(phrases).items():
+            phrase_postings.append((entry_id, phrase, count))
+
+    conn.executemany("UPDATE entries SET word_count = ?, token_count = ? WHERE id = ?", word_counts)
+    conn.executemany("INSERT INTO term_postings (term, entry_id, count) VALUES (?, ?, ?)", postings)
+    conn.executemany("INSERT INTO entry_bigrams (entry_id, phrase, count) VALUES (?, ?, ?)", phrase_postings)
+    conn.executemany('''INSERT INTO term_stats (term, df, tf_sum) VALUES (?, ?, ?)
+                        ON CONFLICT(term) DO UPDATE SET df = df + excluded.df, tf_sum = tf_sum + excluded.tf_sum''',
+                     [(term, doc_freqs[term], tf_sum) for term, tf_sum in stats.items()])
+
+
+def unindex_entries(conn, entry_ids):
+    placeholders = ','.join('?' * len(entry_ids))
+    rows = conn.execute(f'''SELECT p.term, COUNT(*), SUM(CAST(p.count AS REAL) / e.word_count)
+                            FROM term_postings p JOIN entries e ON e.id = p.entry_id
+                            WHERE p.entry_id IN ({placeholders})
+                            GROUP BY p.term''', list(entry_ids)).fetchall()
+    conn.executemany("UPDATE term_stats SET df = df - ?, tf_sum = tf_sum - ? WHERE term = ?",
+                     [(df, tf_sum, term) for term, df, tf_sum in rows])
+    conn.executemany("DELETE FROM term_stats WHERE term = ? AND df <= 0", [(row[0],) for row in rows])
+    conn.execute(f"DELETE FROM term_postings WHERE entry_id IN ({placeholders})", list(entry_ids))
+    conn.execute(f"DELETE FROM entry_bigrams WHERE entry_id IN ({placeholders})", list(entry_ids))
+
+
+def rebuild(conn):
+    conn.execute("DELETE FROM term_postings")
+    conn.execute("DELETE FROM term_stats")
+    conn.execute("DELETE FROM entry_bigrams")
+    index_entries(conn, [(entry_id, text or '') for entry_id, text in
+                         conn.execute("SELECT id, text FROM entries").fetchall()])
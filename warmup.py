@@ -0,0 +1,84 @@
+"""
+Loads the NLP stack and the in-memory journal caches ahead of the first
+request that needs them.
+
+app.py does not import the NLP or analytics modules at module level, so the
+server starts listening (and pre-fork workers spawn) straight away. Models
+are loaded either on first use, by a background thread once the server is
+listening, or up front with preload() in a pre-fork master so that workers
+share them copy-on-write.
+"""
+import os
+import socket
+import threading
+import time
+
+from db import DB_PATH, get_pool
+
+
+def load_models():
+    """Imports the NLP modules and loads the mood backend and productivity lexicon."""
+    import ingest  # noqa: F401  (sentiment, scorer and task extractor modules)
+    from nlp import analysis
+    from scorer import get_scorer
+
+    backend = analysis.get_backend()  # the linear model loads here
+    if backend is analysis.engine:
+        backend.load()
+    get_scorer()
+
+
+def load_caches():
+    """Builds the insights frame and the prompt candidate pool from the journal."""
+    import analytics
+    import prompts
+
+    analytics.get_frame()
+    prompts.get_candidate_pool()
+
+
+def preload(caches=True):
+    """Loads everything a first request could need; returns the seconds taken."""
+    start = time.perf_counter()
+    load_models()
+    # A missing database is created by init_db(); there is nothing to cache yet
+    if caches and os.path.exists(DB_PATH):
+        load_caches()
+    return time.perf_counter() - start
+
+
+def preload_for_fork():
+    """
+    preload() for a process that is about to fork its workers. SQLite
+    connections must not be used across a fork, so pooled connections
+    opened while loading are closed; each worker opens its own.
+    """
+    seconds = preload()
+    get_pool().close_all()
+    return seconds
+
+
+def wait_until_listening(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+def preload_in_background(host='127.0.0.1', port=5000):
+    """
+    Starts a daemon thread that waits until the server accepts connections
+    and then preloads. A request arriving earlier loads what it needs itself
+    (the loaders are locked, so the work is never done twice).
+    """
+    def run():
+        wait_until_listening('127.0.0.1' if host in ('0.0.0.0', '') else host, port)
+        print(f"Preloaded the NLP stack in {preload():.2f}s")
+
+    thread = threading.Thread(target=run, name='preload', daemon=True)
+    thread.start()
+    return thread